@@ -19,15 +19,36 @@ logger = logging.getLogger(__name__)
 # 添加 src 目录到 Python 导入路径
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
 
-from fastapi import FastAPI, HTTPException, Query
+import asyncio
+import anyio
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, aclosing
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
+from starlette.concurrency import iterate_in_threadpool
 from chotbot.core.chatbot import Chatbot
+from chotbot.mcp.context_manager import compression_stats
+from chotbot.core.llm_client import LLMClient
+from chotbot.utils.config import Config
 from fastapi.responses import StreamingResponse
 import json
-from typing import List, Dict
+from typing import List, Dict, Optional
 
-app = FastAPI(title="Chotbot API", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 同步的 ReAct 循环在线程池中运行，线程数决定可同时处理的请求数
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=Config.BACKEND_THREADPOOL_SIZE, thread_name_prefix="chotbot")
+    )
+    anyio.to_thread.current_default_thread_limiter().total_tokens = Config.BACKEND_THREADPOOL_SIZE
+    yield
+    await LLMClient.aclose()
+    if chatbot:
+        # 配置了 SESSION_SPILL_DIR 时保存所有会话，重启后可继续对话
+        chatbot.sessions.spill_all()
+
+app = FastAPI(title="Chotbot API", version="1.0.0", lifespan=lifespan)
 
 # 配置 CORS
 app.add_middleware(
@@ -51,6 +72,8 @@ except Exception as e:
 class ChatRequest(BaseModel):
     message: str
     history: List[Dict[str, str]] = []
+    # 会话 ID，不同会话的对话上下文相互隔离；为空时使用共享上下文
+    session_id: Optional[str] = None
 
 class ChatResponse(BaseModel):
     response: str
@@ -60,6 +83,34 @@ async def root():
     logger.info("收到根路径请求")
     return {"status": "ok", "message": "Chotbot API is running"}
 
+@app.get("/api/cache/stats")
+async def cache_stats():
+    """语义回答缓存、查询向量缓存与工具结果缓存的命中率统计"""
+    if not chatbot:
+        raise HTTPException(status_code=503, detail="聊天机器人服务暂时不可用")
+    return {
+        "response_cache": chatbot.response_cache.stats() if chatbot.response_cache else None,
+        "query_embedding_cache": chatbot.rag_manager.query_cache.stats(),
+        "search": chatbot.tool_manager.get_tool("search").stats(),
+        "weather": chatbot.tool_manager.get_tool("查询天气").cache.stats(),
+        "fund": chatbot.tool_manager.get_tool("查询基金信息").cache.stats()
+    }
+
+@app.get("/api/sessions/stats")
+async def session_stats():
+    """会话数量及创建/恢复/淘汰/落盘统计，以及后台历史压缩的延迟统计"""
+    if not chatbot:
+        raise HTTPException(status_code=503, detail="聊天机器人服务暂时不可用")
+    return {**chatbot.sessions.stats(), "compression": compression_stats()}
+
+@app.delete("/api/sessions/{session_id}")
+async def delete_session(session_id: str):
+    """删除会话及其上下文"""
+    if not chatbot:
+        raise HTTPException(status_code=503, detail="聊天机器人服务暂时不可用")
+    chatbot.sessions.drop(session_id)
+    return {"status": "ok"}
+
 @app.post("/api/chat", response_model=ChatResponse)
 async def chat(request: ChatRequest):
     """普通聊天接口"""
@@ -70,8 +121,8 @@ async def chat(request: ChatRequest):
         return ChatResponse(response="抱歉，聊天机器人服务暂时不可用")
     
     try:
-        logger.info("开始调用 chatbot.chat...")
-        response = chatbot.chat(request.message, use_rag=False)  # 暂时关闭 RAG
+        logger.info("开始调用 chatbot.achat...")
+        response = await chatbot.achat(request.message, use_rag=False, session_id=request.session_id)  # 暂时关闭 RAG
         logger.info(f"chatbot 返回: {response}")
         return ChatResponse(response=response)
     except Exception as e:
@@ -80,32 +131,33 @@ async def chat(request: ChatRequest):
         return ChatResponse(response=f"抱歉，发生错误：{str(e)}")
 
 @app.post("/api/chat/stream")
-async def chat_stream(request: ChatRequest):
-    """流式聊天接口 - 简化版"""
+async def chat_stream(request: ChatRequest, http_request: Request):
+    """流式聊天接口 - 运行 ReAct 循环（可调用工具），逐 token 返回最终答案，客户端断开时停止生成"""
     logger.info(f"收到流式聊天请求: {request.message}")
     
     if not chatbot:
         logger.error("Chatbot 未初始化")
         return StreamingResponse("抱歉，聊天机器人服务暂时不可用", media_type="text/plain")
     
-    try:
-        # 先获取完整响应
-        logger.info("开始调用 chatbot.chat (流式)...")
-        response = chatbot.chat(request.message, use_rag=False)
-        logger.info(f"chatbot 流式返回: {response}")
-        
-        # 模拟流式返回（因为原始 chat_stream 可能有问题）
-        async def generate():
-            yield response
-        
-        return StreamingResponse(generate(), media_type="text/plain")
-    except Exception as e:
-        logger.error(f"流式聊天处理失败: {str(e)}")
-        logger.error(traceback.format_exc())
-        return StreamingResponse(f"错误：{str(e)}", media_type="text/plain")
+    async def generate():
+        # aclosing 保证提前退出时关闭生成器，从而停止 ReAct 循环并中止对 LLM 的流式请求
+        async with aclosing(chatbot.achat_stream(request.message, use_rag=False, session_id=request.session_id)) as chunks:  # 暂时关闭 RAG
+            try:
+                async for chunk in chunks:
+                    if await http_request.is_disconnected():
+                        logger.info("客户端已断开，停止生成")
+                        break
+                    yield chunk
+            except Exception as e:
+                logger.error(f"流式聊天处理失败: {str(e)}")
+                logger.error(traceback.format_exc())
+                yield f"错误：{str(e)}"
+    
+    return StreamingResponse(generate(), media_type="text/plain",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 @app.get("/api/chat/react-stream")
-async def chat_react_stream(message: str = Query(..., description="用户查询消息"), history: str = Query("[]", description="聊天历史")):
+async def chat_react_stream(http_request: Request, message: str = Query(..., description="用户查询消息"), history: str = Query("[]", description="聊天历史")):
     """ReAct Agent 流式接口 - 实时展示思考过程"""
     logger.info(f"收到 ReAct 流式聊天请求: {message}")
     
@@ -124,16 +176,29 @@ async def chat_react_stream(message: str = Query(..., description="用户查询
         logger.info("开始调用 ReAct Agent 流式处理...")
         
         async def generate():
+            steps = chatbot.react_agent.run_stream(message, history=history_list)
             try:
-                # 使用 ReAct Agent 的流式方法
-                for step_data in chatbot.react_agent.run_stream(message, history=history_list):
+                # 使用 ReAct Agent 的流式方法（在线程池中迭代，不阻塞事件循环）
+                async for step_data in iterate_in_threadpool(steps):
+                    if await http_request.is_disconnected():
+                        logger.info("客户端已断开，停止 ReAct 循环")
+                        break
                     # 发送每个步骤的数据
                     yield f"data: {json.dumps(step_data, ensure_ascii=False)}\n\n"
             except Exception as e:
                 logger.error(f"流式生成失败: {str(e)}")
                 yield f"data: {json.dumps({"type": "error", "content": f"处理失败: {str(e)}"})}\n\n"
+            finally:
+                # 关闭生成器会中止正在进行的 LLM 流式请求，不再为无人接收的输出付费
+                try:
+                    steps.close()
+                except ValueError:
+                    # 仍在工作线程中执行，结束后由垃圾回收关闭
+                    pass
         
-        return StreamingResponse(generate(), media_type="text/event-stream")
+        # 禁止代理缓冲，保证 token 事件立即送达
+        return StreamingResponse(generate(), media_type="text/event-stream",
+                                 headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
     except Exception as e:
         logger.error(f"ReAct 流式聊天处理失败: {str(e)}")
         logger.error(traceback.format_exc())
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+向量索引召回率/延迟基准测试
+
+使用方法:
+    python evaluation/benchmark_ann.py [--num-vectors N] [--dim D] [--k K]
+
+将 IVF-Flat / HNSW 的检索结果与精确检索（SimpleVectorStore）对比，
+输出不同 nprobe / efSearch 下的 recall@k 与平均查询延迟。
+"""
+
+import os
+import sys
+import time
+import argparse
+import numpy as np
+from typing import List
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from chotbot.rag.vector_store import SimpleVectorStore
+from chotbot.rag.ann_index import IVFFlatVectorStore, HNSWVectorStore
+
+
+def make_dataset(num_vectors: int, dim: int, num_queries: int, seed: int = 0):
+    """生成带簇结构的随机向量（比均匀分布更接近真实的 embedding 分布）"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(num_vectors // 100, 1), dim))
+    data = centers[rng.integers(0, centers.shape[0], num_vectors)] + 0.3 * rng.normal(size=(num_vectors, dim))
+    queries = centers[rng.integers(0, centers.shape[0], num_queries)] + 0.3 * rng.normal(size=(num_queries, dim))
+    return data.astype(np.float32), queries.astype(np.float32)
+
+
+def recall_at_k(exact: List[List[str]], approx: List[List[str]]) -> float:
+    """近似结果中命中精确 top-k 的比例"""
+    hits = sum(len(set(e) & set(a)) for e, a in zip(exact, approx))
+    total = sum(len(e) for e in exact)
+    return hits / total if total else 0.0
+
+
+def run_queries(store, queries: np.ndarray, k: int, **search_kwargs):
+    start = time.perf_counter()
+    results = [
+        [r["document"] for r in store.similarity_search(q, k=k, **search_kwargs)]
+        for q in queries
+    ]
+    latency_ms = (time.perf_counter() - start) * 1000 / len(queries)
+    return results, latency_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description="向量索引 recall@k 基准测试")
+    parser.add_argument("--num-vectors", type=int, default=20000, help="向量数量")
+    parser.add_argument("--dim", type=int, default=384, help="向量维度 (all-MiniLM-L6-v2 为 384)")
+    parser.add_argument("--num-queries", type=int, default=200, help="查询数量")
+    parser.add_argument("--k", type=int, default=10, help="top-k")
+    parser.add_argument("--nlist", type=int, default=128, help="IVF 倒排表数量")
+    parser.add_argument("--skip-hnsw", action="store_true", help="跳过 HNSW（构建较慢）")
+    args = parser.parse_args()
+
+    data, queries = make_dataset(args.num_vectors, args.dim, args.num_queries)
+    documents = [str(i) for i in range(args.num_vectors)]
+
+    exact_store = SimpleVectorStore()
+    exact_store.add_documents(documents, data)
+    exact, exact_latency = run_queries(exact_store, queries, args.k)
+    print(f"{'index':<24}{'recall@' + str(args.k):>12}{'latency(ms)':>14}")
+    print(f"{'flat (exact)':<24}{1.0:>12.3f}{exact_latency:>14.3f}")
+
+    start = time.perf_counter()
+    ivf_store = IVFFlatVectorStore(nlist=args.nlist)
+    ivf_store.add_documents(documents, data)
+    print(f"# IVF build: {time.perf_counter() - start:.2f}s")
+    for nprobe in (1, 4, 8, 16, 32):
+        approx, latency = run_queries(ivf_store, queries, args.k, nprobe=nprobe)
+        print(f"{'ivf nprobe=' + str(nprobe):<24}{recall_at_k(exact, approx):>12.3f}{latency:>14.3f}")
+
+    if not args.skip_hnsw:
+        start = time.perf_counter()
+        hnsw_store = HNSWVectorStore()
+        hnsw_store.add_documents(documents, data)
+        print(f"# HNSW build: {time.perf_counter() - start:.2f}s")
+        for ef_search in (16, 32, 64, 128):
+            approx, latency = run_queries(hnsw_store, queries, args.k, ef_search=ef_search)
+            print(f"{'hnsw ef=' + str(ef_search):<24}{recall_at_k(exact, approx):>12.3f}{latency:>14.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -51,6 +51,8 @@ function App() {
   const [currentThinkingSteps, setCurrentThinkingSteps] = useState([]);
   const [currentPlan, setCurrentPlan] = useState(null);
   const [clarification, setClarification] = useState(null);
+  // 正在流式生成的回答（token 级增量）
+  const [streamingAnswer, setStreamingAnswer] = useState('');
   const messagesEndRef = useRef(null);
 
   const scrollToBottom = () => {
@@ -59,7 +61,7 @@ function App() {
 
   useEffect(() => {
     scrollToBottom();
-  }, [conversations, currentThinkingSteps, isLoading]);
+  }, [conversations, currentThinkingSteps, isLoading, streamingAnswer]);
 
   const handleSend = async () => {
     if (!inputValue.trim() || isLoading) return;
@@ -75,6 +77,7 @@ function App() {
     setCurrentThinkingSteps([]); // 清空当前思考过程
     setCurrentPlan(null); // 清空当前计划
     setClarification(null); // 清空追问
+    setStreamingAnswer(''); // 清空流式回答
 
     try {
       console.log('正在发送请求到后端...');
@@ -89,6 +92,9 @@ function App() {
       let assistantMessage = { role: 'assistant', content: '' };
       let currentSteps = [];
       let hasFinalAnswer = false;
+      // 本轮模型输出的文本（可能是思考，也可能是直接回答）和 end_tool 中正在生成的最终答案
+      let draftText = '';
+      let answerText = '';
 
       eventSource.onmessage = (event) => {
         const data = JSON.parse(event.data);
@@ -98,6 +104,12 @@ function App() {
           setClarification(data.content);
           setIsLoading(false);
           eventSource.close();
+        } else if (data.type === 'content_delta') {
+          draftText += data.content;
+          if (!answerText) setStreamingAnswer(draftText);
+        } else if (data.type === 'answer_delta') {
+          answerText += data.content;
+          setStreamingAnswer(answerText);
         } else if (data.type === 'plan') {
           setCurrentPlan(data.content);
         } else if (data.type === 'thought') {
@@ -126,6 +138,10 @@ function App() {
             console.log("Observation is not a JSON string, using as is.");
           }
 
+          // 本轮输出的文本是工具调用前的思考，不再作为回答显示
+          draftText = '';
+          setStreamingAnswer(answerText);
+
           // 步骤更新
           currentSteps.push({
             step: data.step,
@@ -153,6 +169,7 @@ function App() {
           
           // 清空当前思考过程
           setCurrentThinkingSteps([]);
+          setStreamingAnswer('');
           setIsLoading(false);
           eventSource.close();
         } else if (data.type === 'error') {
@@ -171,6 +188,7 @@ function App() {
           
           // 清空当前思考过程
           setCurrentThinkingSteps([]);
+          setStreamingAnswer('');
           setIsLoading(false);
           eventSource.close();
         }
@@ -352,7 +370,15 @@ function App() {
             </div>
           )}
           
-          {isLoading && (
+          {isLoading && streamingAnswer && (
+            <div className="message assistant">
+              <div className="message-content">
+                <MarkdownContent content={streamingAnswer} />
+              </div>
+            </div>
+          )}
+
+          {isLoading && !streamingAnswer && (
             <div className="message assistant">
               <div className="message-content loading">正在思考...</div>
             </div>
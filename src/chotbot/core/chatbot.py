@@ -1,10 +1,14 @@
+import asyncio
 from chotbot.core.llm_client import LLMClient
 from chotbot.rag.rag_manager import RAGManager
 from chotbot.mcp.processor import MCPProcessor
+from chotbot.mcp.session_store import SessionStore
 from chotbot.intent.intent_recognizer import IntentRecognizer
 from chotbot.mcp.tools.tool_manager import ToolManager
 from chotbot.core.react_agent import ReActAgent
 from chotbot.core.history_compressor import HistoryCompressor
+from chotbot.core.response_cache import SemanticResponseCache
+from chotbot.utils.config import Config
 
 class Chatbot:
     """
@@ -14,6 +18,8 @@ class Chatbot:
         self.llm_client = LLMClient()
         self.rag_manager = RAGManager(self.llm_client)
         self.mcp_processor = MCPProcessor(self.llm_client)
+        # 每个会话各自的对话上下文（Web 后端按会话 ID 访问）
+        self.sessions = SessionStore(lambda: MCPProcessor(self.llm_client))
         
         # 初始化意图识别模块
         self.intent_recognizer = IntentRecognizer(intent_config_path)
@@ -21,8 +27,11 @@ class Chatbot:
         # 初始化工具管理器
         self.tool_manager = ToolManager()
     
+        # 初始化语义回答缓存（相似问题直接复用答案）
+        self.response_cache = SemanticResponseCache(self.rag_manager.embed_query) if Config.RESPONSE_CACHE_ENABLED else None
+    
         # 初始化 ReAct 代理
-        self.react_agent = ReActAgent(self.llm_client, self.tool_manager)
+        self.react_agent = ReActAgent(self.llm_client, self.tool_manager, response_cache=self.response_cache)
         
         # 初始化 HistoryCompressor
         self.history_compressor = HistoryCompressor(self.llm_client)
@@ -36,7 +45,7 @@ class Chatbot:
         """
         self.rag_manager.add_documents(documents)
     
-    def chat(self, user_input: str, use_rag: bool = True, system_prompt: str = None, user_id: str = None) -> str:
+    def chat(self, user_input: str, use_rag: bool = True, system_prompt: str = None, user_id: str = None, session_id: str = None) -> str:
         """
         Process a user input and generate a response.
         
@@ -44,10 +53,12 @@ class Chatbot:
             user_input (str): User's input message
             use_rag (bool): Whether to use RAG for retrieval
             system_prompt (str): Optional system prompt
+            session_id (str): Optional session ID; each session has its own context
             
         Returns:
             str: Generated response
         """
+        processor = self._processor(session_id)
         # 意图识别
         # intent_result = self.intent_recognizer.recognize(user_input)
         # intent = intent_result['intent']
@@ -63,6 +74,9 @@ class Chatbot:
         # 尝试使用工具调用
         response = None
         
+        # 语义缓存的查找由 ReAct Agent 完成，命中时不运行 ReAct 循环（追问不走缓存）
+        history = processor.context_manager.get_history()
+        
         # if intent == "查询天气":
         #     response = self._handle_weather_query(slots)
         # elif intent == "查询股票":
@@ -70,13 +84,13 @@ class Chatbot:
         # elif intent == "查询基金":
         #     response = self._handle_fund_query(slots)
         # elif intent == "search":
-        response = self._handle_deep_search(user_input, user_id=user_id)
+        # 干净的最终答案由 ReAct Agent 写入缓存，这里的返回值带有思考过程，不缓存
+        response = self._handle_deep_search(user_input, user_id=user_id, history=history)
         
         # 如果工具调用成功，直接返回结果
         if response:
             # Add to MCP context
-            self.mcp_processor.context_manager.add_message("user", user_input)
-            self.mcp_processor.context_manager.add_message("assistant", response)
+            processor.record_turn(user_input, response)
             return response
         
         # 继续原有逻辑
@@ -84,14 +98,46 @@ class Chatbot:
             # Use RAG for response generation
             response = self.rag_manager.query(user_input)
             # Add to MCP context
-            self.mcp_processor.context_manager.add_message("user", user_input)
-            self.mcp_processor.context_manager.add_message("assistant", response)
+            processor.record_turn(user_input, response)
             return response
         else:
             # Use MCP for context-aware generation
-            return self.mcp_processor.interact(user_input, system_prompt=system_prompt)
+            return processor.interact(user_input, system_prompt=system_prompt)
+    
+    async def achat(self, user_input: str, use_rag: bool = True, system_prompt: str = None, user_id: str = None, session_id: str = None) -> str:
+        """
+        Asynchronous ``chat`` that never blocks the event loop.
+        
+        The multi-step ReAct run and RAG retrieval (local embedding, tool HTTP
+        calls) run on a worker thread; the plain context-aware path uses the
+        async LLM client directly.
+        
+        Args:
+            user_input (str): User's input message
+            use_rag (bool): Whether to use RAG for retrieval
+            system_prompt (str): Optional system prompt
+            user_id (str): Optional user ID
+            session_id (str): Optional session ID; each session has its own context
+            
+        Returns:
+            str: Generated response
+        """
+        processor = self._processor(session_id)
+        history = processor.context_manager.get_history()
+        
+        # 语义缓存的查找（需要本地模型计算查询向量）在 ReAct Agent 中随工作线程一起执行
+        response = await asyncio.to_thread(self._handle_deep_search, user_input, user_id, history)
+        if response:
+            processor.record_turn(user_input, response)
+            return response
+        
+        if use_rag:
+            response = await asyncio.to_thread(self.rag_manager.query, user_input)
+            processor.record_turn(user_input, response)
+            return response
+        return await processor.ainteract(user_input, system_prompt=system_prompt)
     
-    def chat_stream(self, user_input: str, use_rag: bool = True, system_prompt: str = None, user_id: str = None):
+    def chat_stream(self, user_input: str, use_rag: bool = True, system_prompt: str = None, user_id: str = None, session_id: str = None):
         """
         Process a user input and generate a streaming response.
         
@@ -99,10 +145,12 @@ class Chatbot:
             user_input (str): User's input message
             use_rag (bool): Whether to use RAG for retrieval
             system_prompt (str): Optional system prompt
+            session_id (str): Optional session ID; each session has its own context
             
         Yields:
             str: Chunks of the generated response
         """
+        processor = self._processor(session_id)
         # 意图识别
         intent_result = self.intent_recognizer.recognize(user_input)
         intent = intent_result['intent']
@@ -128,39 +176,107 @@ class Chatbot:
         # 如果工具调用成功，直接返回结果
         if response:
             # Add to MCP context
-            self.mcp_processor.context_manager.add_message("user", user_input)
-            self.mcp_processor.context_manager.add_message("assistant", response)
+            processor.record_turn(user_input, response)
             yield response
             return
         
-        # 继续原有逻辑
+        # 继续原有逻辑：流式输出的同时累积回答，只调用一次 LLM
         if use_rag:
-            # For streaming, use the LLM client directly with retrieved context
-            context_docs = self.rag_manager.retrieve_context(user_input)
-            context = "\n".join([doc.page_content for doc in context_docs])
-            
-            # Create messages
-            messages = []
-            if system_prompt:
-                messages.append({"role": "system", "content": system_prompt})
-            messages.append({"role": "user", "content": f"上下文：{context}\n\n问题：{user_input}"})
-            
-            # Get streaming response
-            for chunk in self.llm_client.generate_stream(messages):
+            chunks = []
+            for chunk in self.rag_manager.query_stream(user_input):
+                chunks.append(chunk)
                 yield chunk
-            
-            # Combine response for context
-            full_response = ""
-            for chunk in self.llm_client.generate(messages):
-                full_response += chunk
-            
-            # Add to MCP context
-            self.mcp_processor.context_manager.add_message("user", user_input)
-            self.mcp_processor.context_manager.add_message("assistant", full_response)
+            processor.record_turn(user_input, "".join(chunks))
         else:
             # Use MCP for context-aware streaming generation
-            response = self.mcp_processor.interact(user_input, system_prompt=system_prompt)
-            yield response
+            yield from processor.interact_stream(user_input, system_prompt=system_prompt)
+    
+    async def achat_stream(self, user_input: str, use_rag: bool = True, system_prompt: str = None, user_id: str = None, session_id: str = None):
+        """
+        Asynchronously stream a response token by token.
+        
+        Like ``achat`` this runs the ReAct loop (search, weather and fund
+        tools) on worker threads; the final answer is forwarded as the model
+        generates it and recorded in the MCP context: ``end_tool`` answers
+        as ``answer_delta`` events, direct answers as ``content_delta``
+        events. Text the model writes in a turn is forwarded until that turn
+        starts a tool call, so a short preamble before a tool call may appear;
+        tool steps are not included. Only if the agent produces no answer
+        does it fall back to RAG or a plain LLM stream.
+        Closing the generator (e.g. when the client disconnects) stops the
+        ReAct loop and cancels the LLM request.
+        
+        Args:
+            user_input (str): User's input message
+            use_rag (bool): Whether to use RAG for retrieval
+            system_prompt (str): Optional system prompt
+            user_id (str): Optional user ID
+            session_id (str): Optional session ID; each session has its own context
+            
+        Yields:
+            str: Chunks of the generated response
+        """
+        processor = self._processor(session_id)
+        history = processor.context_manager.get_history()
+        
+        # 语义缓存的查找与回放由 ReAct Agent 完成（追问不走缓存）
+        steps = self.react_agent.run_stream(user_input, history=history, stream=True, user_id=user_id, plan_mode="off")
+        # end_tool 答案的增量；当前轮的直接回答增量；调用了工具的轮次
+        answer, content, content_step, tool_steps = [], [], None, set()
+        final_answer = None
+        try:
+            async for event in _iterate_in_thread(steps):
+                if event["type"] == "answer_delta":
+                    tool_steps.add(event["step"])
+                    answer.append(event["content"])
+                    yield event["content"]
+                elif event["type"] == "content_delta":
+                    # 本轮开始调用工具后不再转发正文
+                    if event["step"] in tool_steps:
+                        continue
+                    if event["step"] != content_step:
+                        content, content_step = [], event["step"]
+                    content.append(event["content"])
+                    yield event["content"]
+                elif event["type"] == "step":
+                    tool_steps.add(event["step"])
+                elif event["type"] in ("final_answer", "error"):
+                    final_answer = event["content"]
+        finally:
+            try:
+                steps.close()
+            except ValueError:
+                # 仍在工作线程中执行，结束后由垃圾回收关闭
+                pass
+        
+        if final_answer:
+            # 补发尚未发送的部分：end_tool 的引用来源在答案生成后追加，追问和错误没有增量事件
+            sent = "".join(answer) or "".join(content)
+            if final_answer.startswith(sent):
+                tail = final_answer[len(sent):]
+            else:
+                tail = ("\n\n" if answer or content else "") + final_answer
+            if tail:
+                yield tail
+            processor.record_turn(user_input, final_answer)
+            return
+        
+        use_cache = self.react_agent.cache_usable(history)
+        if use_rag:
+            # 检索需要本地模型计算向量，放到线程中执行
+            context_docs = await asyncio.to_thread(self.rag_manager.retrieve, user_input)
+            messages = self.rag_manager.generator.build_messages(user_input, context_docs)
+            chunks = []
+            async for chunk in self.llm_client.agenerate_stream(messages):
+                chunks.append(chunk)
+                yield chunk
+            response = "".join(chunks)
+            processor.record_turn(user_input, response)
+            if use_cache:
+                await asyncio.to_thread(self.response_cache.put, user_input, response)
+        else:
+            async for chunk in processor.ainteract_stream(user_input, system_prompt=system_prompt):
+                yield chunk
     
     def _handle_weather_query(self, slots: dict) -> str:
         """
@@ -234,18 +350,24 @@ class Chatbot:
         
         return "\n".join(fund_info)
 
-    def _handle_deep_search(self, user_input: str, user_id: str = None) -> str:
+    def _handle_deep_search(self, user_input: str, user_id: str = None, history: list = None) -> str:
         """
         处理深度搜索意图
         
         Args:
             user_input (str): 用户输入
+            user_id (str): 用户 ID
+            history (list): 当前会话之前的消息（非空时不使用回答缓存）
             
         Returns:
             str: 搜索结果
         """
         # 运行 ReAct Agent 并获取思考步骤
-        final_answer, thinking_steps = self.react_agent.run(user_input, user_id=user_id)
+        final_answer, thinking_steps = self.react_agent.run(user_input, user_id=user_id, history=history)
+        
+        # 命中语义缓存时没有思考过程，只返回答案
+        if thinking_steps and thinking_steps[-1].get("cached"):
+            return final_answer
         
         # 格式化思考过程为字符串
         if thinking_steps:
@@ -265,17 +387,39 @@ class Chatbot:
         # 返回最终答案和思考过程
         return final_answer + thinking_process
     
-    def clear_context(self):
+    def clear_context(self, session_id: str = None):
         """
         Clear the chat context.
+        
+        Args:
+            session_id (str): Optional session ID
         """
-        self.mcp_processor.clear_context()
+        self._processor(session_id).clear_context()
     
-    def get_context(self) -> list:
+    def get_context(self, session_id: str = None) -> list:
         """
         Get the current chat context.
         
+        Args:
+            session_id (str): Optional session ID
+            
         Returns:
             list: Current context messages
         """
-        return self.mcp_processor.get_context()
+        return self._processor(session_id).get_context()
+    
+    def _processor(self, session_id: str = None) -> MCPProcessor:
+        """The MCP processor of a session; without a session ID the shared one (CLI)."""
+        if session_id is None:
+            return self.mcp_processor
+        return self.sessions.get(session_id)
+
+
+async def _iterate_in_thread(iterator):
+    """Iterate a blocking iterator on worker threads without blocking the event loop."""
+    done = object()
+    while True:
+        item = await asyncio.to_thread(next, iterator, done)
+        if item is done:
+            return
+        yield item
@@ -0,0 +1,327 @@
+"""
+对话日志：按用户记录每轮对话，追加写入分段 JSONL 文件，由后台线程批量写入并定期 fsync，
+按用户 ID 建立索引，读取某个用户的历史时只需按偏移量读取对应记录
+"""
+
+import os
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+from chotbot.utils.config import Config
+
+logger = logging.getLogger(__name__)
+
+_SEGMENT_PREFIX = "segment-"
+_SEGMENT_SUFFIX = ".jsonl"
+_INDEX_SUFFIX = ".idx.json"
+# 写入线程每批最多处理的记录数
+_BATCH_SIZE = 256
+
+_shared_log = None
+_shared_log_lock = threading.Lock()
+
+
+def shared_conversation_log() -> "ConversationLog":
+    """The process-wide conversation log (flushed and closed at exit)."""
+    global _shared_log
+    with _shared_log_lock:
+        if _shared_log is None:
+            _shared_log = ConversationLog()
+            atexit.register(_shared_log.close)
+        return _shared_log
+
+
+class ConversationLog:
+    """
+    Append-only, segmented log of conversation turns indexed by user ID.
+
+    Each record is one JSON line ``{"user_id", "ts", "messages"}`` in the
+    active segment file; once a segment exceeds ``segment_bytes`` it is
+    sealed, its per-user index (record offsets and lengths) is written next
+    to it and a new segment is started. On startup sealed segments are
+    indexed from their index files and only the active segment is scanned.
+
+    ``append`` only enqueues the record; a background thread writes queued
+    records in batches and fsyncs at most once per ``fsync_interval``
+    seconds, and at most ``fsync_interval`` seconds after the last write
+    even if the log goes idle (and on ``flush``/``close``). ``read`` returns written records
+    only; call ``flush`` first to include records still queued.
+    """
+
+    def __init__(self, directory: str = None, segment_bytes: int = None, fsync_interval: float = None):
+        self.directory = directory or Config.CONVERSATION_LOG_DIR
+        self.segment_bytes = segment_bytes or Config.CONVERSATION_LOG_SEGMENT_BYTES
+        self.fsync_interval = Config.CONVERSATION_LOG_FSYNC_INTERVAL if fsync_interval is None else fsync_interval
+        # user_id -> [(segment, offset, length)]，按写入顺序
+        self._index: Dict[str, List[Tuple[int, int, int]]] = defaultdict(list)
+        # 当前分段的索引，封存时写入索引文件
+        self._segment_index: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        # user_id -> 已追加的轮数（包括仍在队列中的）
+        self._turns: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+        self._queue: "queue.Queue[Optional[dict]]" = queue.Queue()
+        self._file = None
+        self._segment = 0
+        self._offset = 0
+        self._last_fsync = time.monotonic()
+        self._stats = {"records": 0, "batches": 0, "fsyncs": 0, "segments": 0, "errors": 0}
+        self._closed = False
+        self._load()
+        self._writer = threading.Thread(target=self._run, name="conversation-log", daemon=True)
+        self._writer.start()
+
+    def append(self, user_id: str, messages: List[Dict[str, Any]]):
+        """
+        Queue one conversation turn for writing (does not block on disk I/O).
+
+        Args:
+            user_id (str): User ID
+            messages (List[Dict[str, Any]]): Messages of the turn
+        """
+        if self._closed:
+            raise RuntimeError("Conversation log is closed")
+        record = {"user_id": user_id, "ts": time.time(), "messages": messages}
+        with self._lock:
+            self._turns[user_id] += 1
+        self._queue.put(record)
+
+    def turn_count(self, user_id: str) -> int:
+        """Number of turns logged for a user, including queued ones."""
+        with self._lock:
+            return self._turns.get(user_id, 0)
+
+    def read(self, user_id: str, limit: int = None) -> List[Dict[str, Any]]:
+        """
+        Read a user's logged turns, oldest first.
+
+        Args:
+            user_id (str): User ID
+            limit (int): Only the most recent ``limit`` turns
+
+        Returns:
+            List[Dict[str, Any]]: Records with ``user_id``, ``ts`` and ``messages``
+        """
+        with self._lock:
+            entries = list(self._index.get(user_id, ()))
+        if limit is not None:
+            entries = entries[-limit:] if limit > 0 else []
+
+        records = []
+        handles = {}
+        try:
+            for segment, offset, length in entries:
+                if segment not in handles:
+                    handles[segment] = open(self._segment_path(segment), "rb")
+                handle = handles[segment]
+                handle.seek(offset)
+                records.append(json.loads(handle.read(length)))
+        finally:
+            for handle in handles.values():
+                handle.close()
+        return records
+
+    def read_messages(self, user_id: str, limit: int = None) -> List[Dict[str, Any]]:
+        """
+        A user's logged messages, oldest first, flattened across turns.
+
+        Args:
+            user_id (str): User ID
+            limit (int): Only the messages of the most recent ``limit`` turns
+
+        Returns:
+            List[Dict[str, Any]]: Messages
+        """
+        return [message for record in self.read(user_id, limit) for message in record["messages"]]
+
+    def flush(self, timeout: float = None) -> bool:
+        """
+        Wait until every queued record is written and fsynced.
+
+        Args:
+            timeout (float): Maximum seconds to wait (default: no limit)
+
+        Returns:
+            bool: True if the queue was drained in time
+        """
+        if self._closed:
+            return True
+        done = threading.Event()
+        self._queue.put({"_flush": done})
+        return done.wait(timeout)
+
+    def close(self):
+        """Write the remaining records, fsync and stop the writer."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._writer.join()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get log statistics.
+
+        Returns:
+            Dict[str, Any]: Written records, write batches, fsyncs, sealed
+                segments, write errors, queued records and indexed users
+        """
+        with self._lock:
+            return {**self._stats, "queued": self._queue.qsize(), "users": len(self._index)}
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"{_SEGMENT_PREFIX}{segment:08d}{_SEGMENT_SUFFIX}")
+
+    def _load(self):
+        """Index existing segments: sealed ones from their index files, the last one by scanning."""
+        if not os.path.isdir(self.directory):
+            return
+        segments = sorted(
+            int(name[len(_SEGMENT_PREFIX):-len(_SEGMENT_SUFFIX)])
+            for name in os.listdir(self.directory)
+            if name.startswith(_SEGMENT_PREFIX) and name.endswith(_SEGMENT_SUFFIX)
+        )
+        for segment in segments:
+            path = self._segment_path(segment)
+            index_path = path[:-len(_SEGMENT_SUFFIX)] + _INDEX_SUFFIX
+            sealed = os.path.exists(index_path)
+            if sealed:
+                with open(index_path, "r", encoding="utf-8") as f:
+                    segment_index = json.load(f)
+            else:
+                segment_index, end = self._scan(path)
+                if end < os.path.getsize(path):
+                    # 去掉崩溃时写了一半的最后一行，新记录从完整行之后开始
+                    os.truncate(path, end)
+            for user_id, entries in segment_index.items():
+                self._index[user_id].extend((segment, offset, length) for offset, length in entries)
+                self._turns[user_id] += len(entries)
+            if sealed:
+                self._segment, self._offset = segment + 1, 0
+            else:
+                # 未封存的分段（最后一个）继续追加
+                self._segment, self._offset = segment, end
+                self._segment_index = defaultdict(list, segment_index)
+
+    @staticmethod
+    def _scan(path: str) -> Tuple[Dict[str, List[Tuple[int, int]]], int]:
+        """
+        Index a segment by reading it.
+
+        Returns:
+            tuple: (user_id -> [(offset, length)], end offset of the last complete line)
+        """
+        segment_index = defaultdict(list)
+        offset = 0
+        with open(path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    segment_index[json.loads(line)["user_id"]].append((offset, len(line)))
+                except (ValueError, KeyError):
+                    logger.warning(f"Skipping corrupt record at {path}:{offset}")
+                offset += len(line)
+        return segment_index, offset
+
+    def _run(self):
+        """Writer thread: write queued records in batches."""
+        unsynced = False
+        while True:
+            if unsynced:
+                # 有未 fsync 的写入时最多等到下一次 fsync 时间点，空闲时也能按时落盘
+                remaining = self._last_fsync + self.fsync_interval - time.monotonic()
+                try:
+                    batch = [self._queue.get(timeout=max(remaining, 0))]
+                except queue.Empty:
+                    try:
+                        if self._file is not None:
+                            self._fsync()
+                    except OSError as e:
+                        logger.error(f"Failed to fsync conversation log: {e}")
+                        with self._lock:
+                            self._stats["errors"] += 1
+                    unsynced = False
+                    continue
+            else:
+                batch = [self._queue.get()]
+            while len(batch) < _BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = None in batch
+            waiters = [item["_flush"] for item in batch if item is not None and "_flush" in item]
+            records = [item for item in batch if item is not None and "_flush" not in item]
+            try:
+                if records:
+                    self._write(records)
+                    unsynced = True
+                if self._file is not None and (stop or waiters or time.monotonic() - self._last_fsync >= self.fsync_interval):
+                    self._fsync()
+                    unsynced = False
+            except OSError as e:
+                logger.error(f"Failed to write conversation log: {e}")
+                with self._lock:
+                    self._stats["errors"] += 1
+            for waiter in waiters:
+                waiter.set()
+            if stop:
+                if self._file is not None:
+                    self._file.close()
+                    self._file = None
+                return
+
+    def _write(self, records: List[dict]):
+        if self._file is None:
+            os.makedirs(self.directory, exist_ok=True)
+            self._file = open(self._segment_path(self._segment), "ab")
+        entries = []
+        chunks = []
+        offset = self._offset
+        for record in records:
+            line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+            chunks.append(line)
+            entries.append((record["user_id"], offset, len(line)))
+            offset += len(line)
+        self._file.write(b"".join(chunks))
+        self._file.flush()
+        self._offset = offset
+
+        # 写入完成后再加入索引，读取时不会读到未写完的记录
+        with self._lock:
+            for user_id, record_offset, length in entries:
+                self._index[user_id].append((self._segment, record_offset, length))
+                self._segment_index[user_id].append((record_offset, length))
+            self._stats["records"] += len(records)
+            self._stats["batches"] += 1
+
+        if self._offset >= self.segment_bytes:
+            self._seal()
+
+    def _fsync(self):
+        os.fsync(self._file.fileno())
+        self._last_fsync = time.monotonic()
+        with self._lock:
+            self._stats["fsyncs"] += 1
+
+    def _seal(self):
+        """Close the active segment, write its index and start the next one."""
+        self._fsync()
+        self._file.close()
+        self._file = None
+        index_path = self._segment_path(self._segment)[:-len(_SEGMENT_SUFFIX)] + _INDEX_SUFFIX
+        tmp_path = f"{index_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._segment_index, f, ensure_ascii=False)
+        os.replace(tmp_path, index_path)
+        with self._lock:
+            self._segment_index = defaultdict(list)
+            self._stats["segments"] += 1
+        self._segment += 1
+        self._offset = 0
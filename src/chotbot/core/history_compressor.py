@@ -1,19 +1,37 @@
+import json
+import hashlib
 import logging
-from typing import List, Dict, Any, Optional
+import threading
+from collections import OrderedDict
+from typing import Callable, List, Dict, Any, Optional
 from chotbot.core.llm_client import LLMClient
+from chotbot.utils.tokenizer import message_tokens
 
 logger = logging.getLogger(__name__)
 
+# 已摘要片段的缓存条数
+_MEMO_SIZE = 256
+_SUMMARY_PREFIX = "[History Summary] "
+
 
 class HistoryCompressor:
     """
     History compression using LLM to summarize and compress conversation history.
     This helps manage long conversations by reducing token usage while retaining
     important information.
+    
+    The "rolling" strategy keeps the previous summary and folds in only the
+    messages added since the last compression, so each compression costs
+    tokens in proportion to the new messages rather than the whole
+    conversation. Summaries of chunks already seen (by content hash) are
+    memoized and not sent to the LLM again.
     """
     
     def __init__(self, llm_client: LLMClient):
         self.llm_client = llm_client
+        self._memo: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"compressions": 0, "llm_calls": 0, "memo_hits": 0, "summarized_messages": 0}
         
     def compress(
         self, 
@@ -26,7 +44,7 @@ class HistoryCompressor:
         
         Args:
             history: Full conversation history
-            strategy: Compression strategy ("summary", "extract_key_info", "hybrid")
+            strategy: Compression strategy ("summary", "extract_key_info", "hybrid", "rolling")
             keep_last_n: Number of recent messages to keep uncompressed
             
         Returns:
@@ -52,11 +70,15 @@ class HistoryCompressor:
             compressed = self._compress_by_extraction(old_messages)
         elif strategy == "hybrid":
             compressed = self._compress_hybrid(old_messages)
+        elif strategy == "rolling":
+            compressed = self._compress_rolling(old_messages)
         else:
             raise ValueError(f"Unknown compression strategy: {strategy}")
         
         # Combine compressed old messages with recent messages
         result = compressed + recent_messages
+        with self._lock:
+            self._stats["compressions"] += 1
         
         logger.info(f"Compression reduced history from {len(history)} to {len(result)} messages")
         
@@ -80,9 +102,7 @@ Conversation:
 Provide a concise but comprehensive summary:"""
         
         try:
-            summary = self.llm_client.generate([
-                {"role": "user", "content": prompt}
-            ])
+            summary = self._generate(prompt, len(messages))
             
             # Return as a single system message containing the summary
             return [{
@@ -97,6 +117,59 @@ Provide a concise but comprehensive summary:"""
             # Fallback: return truncated history
             return messages[:3] if len(messages) > 3 else messages
     
+    def _compress_rolling(self, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Fold the messages added since the last compression into the previous
+        rolling summary (the first message, if it is one).
+        """
+        previous = messages[0] if messages and messages[0].get("strategy") == "rolling" else None
+        new_messages = messages[1:] if previous else messages
+        if not new_messages:
+            return messages
+        
+        # 只把上次摘要和新增消息发给 LLM，与对话总长度无关
+        previous_summary = previous["content"][len(_SUMMARY_PREFIX):] if previous else ""
+        if previous_summary:
+            prompt = f"""Here is a summary of the conversation so far, followed by the messages
+that came after it. Update the summary so it also covers the new messages. Keep the key
+topics, decisions, facts and user preferences; drop details that no longer matter.
+
+Current summary:
+{previous_summary}
+
+New messages:
+{self._format_conversation(new_messages)}
+
+Provide the updated summary:"""
+        else:
+            prompt = f"""Please summarize the following conversation comprehensively. 
+Extract the key topics discussed, important decisions made, and any relevant context 
+that would be important for continuing this conversation.
+
+Conversation:
+{self._format_conversation(new_messages)}
+
+Provide a concise but comprehensive summary:"""
+        
+        try:
+            summary = self._memoized(
+                self._hash([{"role": "system", "content": previous_summary}] + new_messages),
+                lambda: self._generate(prompt, len(new_messages))
+            )
+        except Exception as e:
+            logger.error(f"Failed to update rolling summary: {e}")
+            # 保留上次摘要和新增消息，下次压缩时再合并
+            return messages
+        
+        original_count = (previous.get("original_count", 0) if previous else 0) + len(new_messages)
+        return [{
+            "role": "system",
+            "content": f"{_SUMMARY_PREFIX}{summary}",
+            "compressed": True,
+            "original_count": original_count,
+            "strategy": "rolling"
+        }]
+    
     def _compress_by_extraction(self, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
         Compress by extracting only key information (facts, decisions, preferences).
@@ -116,9 +189,7 @@ Conversation:
 Extract only the essential information in a concise format:"""
         
         try:
-            key_info = self.llm_client.generate([
-                {"role": "user", "content": prompt}
-            ])
+            key_info = self._generate(prompt, len(messages))
             
             return [{
                 "role": "system",
@@ -148,9 +219,7 @@ Conversation:
 Provide your analysis in a structured format:"""
         
         try:
-            analysis = self.llm_client.generate([
-                {"role": "user", "content": prompt}
-            ])
+            analysis = self._generate(prompt, len(messages))
             
             return [{
                 "role": "system",
@@ -173,6 +242,55 @@ Provide your analysis in a structured format:"""
             formatted.append(f"{role}: {content}")
         return "\n".join(formatted)
     
+    @staticmethod
+    def _hash(messages: List[Dict[str, Any]]) -> str:
+        """Content hash of a chunk of messages (role and content only)."""
+        digest = hashlib.sha1()
+        for msg in messages:
+            digest.update(json.dumps([msg.get("role", ""), msg.get("content", "")], ensure_ascii=False).encode("utf-8"))
+        return digest.hexdigest()
+    
+    def _memoized(self, key: str, compute: Callable[[], Any], cacheable: Callable[[Any], bool] = None) -> Any:
+        """
+        Return the memoized result for ``key``, computing it on a miss.
+        
+        The computed value is stored unless ``cacheable`` rejects it.
+        """
+        with self._lock:
+            if key in self._memo:
+                self._memo.move_to_end(key)
+                self._stats["memo_hits"] += 1
+                return self._memo[key]
+        value = compute()
+        if cacheable is not None and not cacheable(value):
+            return value
+        with self._lock:
+            self._memo[key] = value
+            while len(self._memo) > _MEMO_SIZE:
+                self._memo.popitem(last=False)
+        return value
+    
+    def _generate(self, prompt: str, message_count: int) -> str:
+        """Send one summarization prompt to the LLM, counting the call."""
+        summary = self.llm_client.generate([
+            {"role": "user", "content": prompt}
+        ])
+        with self._lock:
+            self._stats["llm_calls"] += 1
+            self._stats["summarized_messages"] += message_count
+        return summary
+    
+    def get_compression_stats(self) -> Dict[str, Any]:
+        """
+        Get compression statistics.
+        
+        Returns:
+            Dict[str, Any]: Compressions run, LLM calls made, memoized chunks
+                reused and messages sent for summarization
+        """
+        with self._lock:
+            return dict(self._stats)
+    
     def should_compress(
         self, 
         history: List[Dict[str, Any]], 
@@ -194,10 +312,7 @@ Provide your analysis in a structured format:"""
             return False
         
         if threshold_tokens:
-            # Estimate token count
-            total_chars = sum(len(msg.get("content", "")) for msg in history)
-            estimated_tokens = total_chars // 4
-            if estimated_tokens > threshold_tokens:
+            if sum(message_tokens(msg) for msg in history) > threshold_tokens:
                 return True
         
         return len(history) >= threshold_messages
@@ -227,12 +342,23 @@ Provide your analysis in a structured format:"""
         recent_messages = history[-3:]
         old_messages = history[:-3]
         
+        # 之前压缩得到的摘要原样保留，只对其后新增的消息分块
+        start = 0
+        while start < len(old_messages) and old_messages[start].get("compressed"):
+            start += 1
+        compressed_chunks = old_messages[:start]
+        old_messages = old_messages[start:]
+        
         # Compress old messages in chunks
-        compressed_chunks = []
         for i in range(0, len(old_messages), chunk_size):
             chunk = old_messages[i:i + chunk_size]
             if len(chunk) > 2:
-                compressed_chunk = self._compress_by_summary(chunk)
+                compressed_chunk = self._memoized(
+                    self._hash(chunk),
+                    lambda: self._compress_by_summary(chunk),
+                    # 摘要失败时的截断结果不缓存
+                    cacheable=lambda result: bool(result) and result[0].get("compressed", False)
+                )
                 compressed_chunks.extend(compressed_chunk)
             else:
                 compressed_chunks.extend(chunk)
@@ -1,89 +1,288 @@
-from openai import OpenAI
+import asyncio
+import threading
+import weakref
+import httpx
+from openai import OpenAI, AsyncOpenAI
+from chotbot.core.tool_stream import ToolCallAccumulator
 from chotbot.utils.config import Config
 
+
+def _http_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=Config.LLM_MAX_CONNECTIONS,
+        max_keepalive_connections=Config.LLM_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=Config.LLM_KEEPALIVE_EXPIRY
+    )
+
+
 class LLMClient:
+    """
+    OpenAI-compatible chat client with synchronous and asynchronous methods.
+
+    All instances share one keep-alive connection pool for synchronous calls
+    and one per event loop for asynchronous calls, and at most
+    ``LLM_MAX_CONCURRENCY`` requests of each kind are in flight at once.
+    Streaming calls hold a slot only while the stream is being opened, not
+    while its chunks are consumed, so a slow or abandoned consumer never
+    blocks other calls; open streams are bounded by the connection pool
+    (``LLM_MAX_CONNECTIONS``).
+    """
+    _client = None
+    _client_lock = threading.Lock()
+    _semaphore = None
+    # 异步连接池与信号量绑定在事件循环上，每个循环各一份
+    _async_clients = weakref.WeakKeyDictionary()
+
     def __init__(self):
-        self.client = OpenAI(
-            api_key=Config.OPENAI_API_KEY,
-            base_url=Config.OPENAI_BASE_URL
-        )
-      
-    
+        self.client = self._shared_client()
+
+    @classmethod
+    def _shared_client(cls) -> OpenAI:
+        with cls._client_lock:
+            if cls._client is None:
+                cls._client = OpenAI(
+                    api_key=Config.OPENAI_API_KEY,
+                    base_url=Config.OPENAI_BASE_URL,
+                    http_client=httpx.Client(limits=_http_limits(), timeout=Config.LLM_TIMEOUT)
+                )
+                cls._semaphore = threading.BoundedSemaphore(Config.LLM_MAX_CONCURRENCY)
+            return cls._client
+
+    @classmethod
+    def _shared_async_client(cls):
+        """
+        The pooled async client and concurrency semaphore of the running loop.
+
+        Returns:
+            tuple: (AsyncOpenAI, asyncio.Semaphore)
+        """
+        loop = asyncio.get_running_loop()
+        with cls._client_lock:
+            shared = cls._async_clients.get(loop)
+            if shared is None:
+                client = AsyncOpenAI(
+                    api_key=Config.OPENAI_API_KEY,
+                    base_url=Config.OPENAI_BASE_URL,
+                    http_client=httpx.AsyncClient(limits=_http_limits(), timeout=Config.LLM_TIMEOUT)
+                )
+                shared = cls._async_clients[loop] = (client, asyncio.Semaphore(Config.LLM_MAX_CONCURRENCY))
+            return shared
+
+    @classmethod
+    async def aclose(cls):
+        """Close the running loop's pooled async client (call on shutdown)."""
+        with cls._client_lock:
+            shared = cls._async_clients.pop(asyncio.get_running_loop(), None)
+        if shared is not None:
+            await shared[0].close()
+
     def generate(self, messages: list, **kwargs):
         """
         Generate a response from the LLM.
-        
+
         Args:
             messages (list): List of messages in OpenAI format
             **kwargs: Additional parameters for the API call
-            
+
         Returns:
             str: Generated response
         """
         try:
-            response = self.client.chat.completions.create(
-                model=Config.MODEL_NAME,
-                messages=messages,
-                temperature=Config.TEMPERATURE,
-                **kwargs
-            )
+            with self._semaphore:
+                response = self.client.chat.completions.create(
+                    model=Config.MODEL_NAME,
+                    messages=messages,
+                    temperature=Config.TEMPERATURE,
+                    **kwargs
+                )
             return response.choices[0].message.content.strip()
         except Exception as e:
             raise RuntimeError(f"LLM API error: {str(e)}")
-    
+
     def generate_with_tools(self, messages: list, tools: list, **kwargs):
         """
         Generate a response from the LLM with tool calls.
-        
+
         Args:
             messages (list): List of messages in OpenAI format
             tools (list): List of tool definitions
             **kwargs: Additional parameters for the API call
-            
+
         Returns:
             tuple: (response, tool_calls) - response is the text response, tool_calls is a list of tool calls
         """
         try:
-            response = self.client.chat.completions.create(
-                model=Config.MODEL_NAME,
-                messages=messages,
-                temperature=Config.TEMPERATURE,
-                tools=tools,
-                tool_choice="auto",
-                **kwargs
-            )
-            
-            message = response.choices[0].message
-            
-            # Check if there are tool calls
-            if hasattr(message, 'tool_calls') and message.tool_calls:
-                return message.content, message.tool_calls
-            else:
-                return message.content, None
+            with self._semaphore:
+                response = self.client.chat.completions.create(
+                    model=Config.MODEL_NAME,
+                    messages=messages,
+                    temperature=Config.TEMPERATURE,
+                    tools=tools,
+                    tool_choice="auto",
+                    **kwargs
+                )
+            return self._split_tool_calls(response.choices[0].message)
         except Exception as e:
             raise RuntimeError(f"LLM API error: {str(e)}")
-    
+
     def generate_stream(self, messages: list, **kwargs):
         """
         Generate a streaming response from the LLM.
-        
+
+        Args:
+            messages (list): List of messages in OpenAI format
+            **kwargs: Additional parameters for the API call
+
+        Yields:
+            str: Chunks of the generated response
+        """
+        try:
+            # 只在建立流式请求时占用并发名额，消费数据块时不占用
+            with self._semaphore:
+                stream = self.client.chat.completions.create(
+                    model=Config.MODEL_NAME,
+                    messages=messages,
+                    temperature=Config.TEMPERATURE,
+                    stream=True,
+                    **kwargs
+                )
+            with stream:
+                for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content is not None:
+                        yield chunk.choices[0].delta.content
+        except Exception as e:
+            raise RuntimeError(f"LLM API error: {str(e)}")
+
+    def generate_with_tools_stream(self, messages: list, tools: list, **kwargs):
+        """
+        Stream a response that may contain tool calls.
+
+        Args:
+            messages (list): List of messages in OpenAI format
+            tools (list): List of tool definitions
+            **kwargs: Additional parameters for the API call
+
+        Yields:
+            dict: ``{"type": "content", "delta"}`` for content tokens,
+            ``{"type": "tool_call", "index", "id", "name", "arguments_delta", "arguments"}``
+            for every tool call fragment, and finally
+            ``{"type": "done", "content", "tool_calls"}`` with the assembled turn
+        """
+        accumulator = ToolCallAccumulator()
+        content = []
+        try:
+            # 只在建立流式请求时占用并发名额，消费数据块时不占用
+            with self._semaphore:
+                stream = self.client.chat.completions.create(
+                    model=Config.MODEL_NAME,
+                    messages=messages,
+                    temperature=Config.TEMPERATURE,
+                    tools=tools,
+                    tool_choice="auto",
+                    stream=True,
+                    **kwargs
+                )
+            with stream:
+                for chunk in stream:
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta
+                    if delta.content:
+                        content.append(delta.content)
+                        yield {"type": "content", "delta": delta.content}
+                    for tool_call_delta in delta.tool_calls or []:
+                        yield {"type": "tool_call", **accumulator.add(tool_call_delta)}
+        except Exception as e:
+            raise RuntimeError(f"LLM API error: {str(e)}")
+        yield {
+            "type": "done",
+            "content": "".join(content) or None,
+            "tool_calls": accumulator.tool_calls()
+        }
+
+    async def agenerate(self, messages: list, **kwargs):
+        """
+        Asynchronously generate a response from the LLM.
+
+        Args:
+            messages (list): List of messages in OpenAI format
+            **kwargs: Additional parameters for the API call
+
+        Returns:
+            str: Generated response
+        """
+        client, semaphore = self._shared_async_client()
+        try:
+            async with semaphore:
+                response = await client.chat.completions.create(
+                    model=Config.MODEL_NAME,
+                    messages=messages,
+                    temperature=Config.TEMPERATURE,
+                    **kwargs
+                )
+            return response.choices[0].message.content.strip()
+        except Exception as e:
+            raise RuntimeError(f"LLM API error: {str(e)}")
+
+    async def agenerate_with_tools(self, messages: list, tools: list, **kwargs):
+        """
+        Asynchronously generate a response from the LLM with tool calls.
+
         Args:
             messages (list): List of messages in OpenAI format
+            tools (list): List of tool definitions
             **kwargs: Additional parameters for the API call
-            
+
+        Returns:
+            tuple: (response, tool_calls) - response is the text response, tool_calls is a list of tool calls
+        """
+        client, semaphore = self._shared_async_client()
+        try:
+            async with semaphore:
+                response = await client.chat.completions.create(
+                    model=Config.MODEL_NAME,
+                    messages=messages,
+                    temperature=Config.TEMPERATURE,
+                    tools=tools,
+                    tool_choice="auto",
+                    **kwargs
+                )
+            return self._split_tool_calls(response.choices[0].message)
+        except Exception as e:
+            raise RuntimeError(f"LLM API error: {str(e)}")
+
+    async def agenerate_stream(self, messages: list, **kwargs):
+        """
+        Asynchronously stream a response from the LLM.
+
+        Args:
+            messages (list): List of messages in OpenAI format
+            **kwargs: Additional parameters for the API call
+
         Yields:
             str: Chunks of the generated response
         """
+        client, semaphore = self._shared_async_client()
         try:
-            stream = self.client.chat.completions.create(
-                model=Config.MODEL_NAME,
-                messages=messages,
-                temperature=Config.TEMPERATURE,
-                stream=True,
-                **kwargs
-            )
-            for chunk in stream:
-                if chunk.choices[0].delta.content is not None:
-                    yield chunk.choices[0].delta.content
+            # 只在建立流式请求时占用并发名额，消费数据块时不占用
+            async with semaphore:
+                stream = await client.chat.completions.create(
+                    model=Config.MODEL_NAME,
+                    messages=messages,
+                    temperature=Config.TEMPERATURE,
+                    stream=True,
+                    **kwargs
+                )
+            async with stream:
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content is not None:
+                        yield chunk.choices[0].delta.content
         except Exception as e:
             raise RuntimeError(f"LLM API error: {str(e)}")
+
+    @staticmethod
+    def _split_tool_calls(message):
+        # Check if there are tool calls
+        if hasattr(message, 'tool_calls') and message.tool_calls:
+            return message.content, message.tool_calls
+        return message.content, None
@@ -1,213 +1,154 @@
 import logging
-import pandas as pd
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
 from math import log
 import re
 import json
-from typing import Iterator, Dict, Any
+from typing import Iterator, Dict, Any, Optional
 from chotbot.core.llm_client import LLMClient
 from chotbot.mcp.tools.tool_manager import ToolManager
+from chotbot.core.response_cache import SemanticResponseCache, iter_answer_chunks
+from chotbot.core.conversation_log import ConversationLog, shared_conversation_log
+from chotbot.core.tool_stream import PartialJSONStringReader
+from chotbot.intent import quick_intent
+from chotbot.utils.config import Config
 
 
 # 配置日志
 logger = logging.getLogger(__name__)
 
+# 每累计这么多轮对话，根据最近这些轮更新一次用户画像
+PROFILE_EVERY_N_TURNS = 5
+
+
+class _PendingPlan:
+    """
+    A plan requested in the background. ``poll`` yields its ``plan`` event
+    once, as soon as the request has finished; a plan that is still pending
+    when the answer is ready is dropped with ``cancel``.
+    """
+
+    def __init__(self, future: Optional[Future] = None):
+        self._future = future
+
+    def poll(self) -> Iterator[Dict[str, Any]]:
+        if self._future is None or not self._future.done():
+            return
+        future, self._future = self._future, None
+        try:
+            plan = future.result()
+        except Exception as e:
+            logger.warning(f"Plan generation failed: {e}")
+            return
+        yield {
+            "type": "plan",
+            "content": plan
+        }
+
+    def cancel(self):
+        if self._future is not None:
+            self._future.cancel()
+            self._future = None
+
 class ReActAgent:
-    def __init__(self, llm_client: LLMClient, tool_manager: ToolManager, history_compressor: "HistoryCompressor" = None, rag_manager: "RAGManager" = None):
+    def __init__(self, llm_client: LLMClient, tool_manager: ToolManager, history_compressor: "HistoryCompressor" = None, rag_manager: "RAGManager" = None, response_cache: SemanticResponseCache = None,
+                 conversation_log: ConversationLog = None):
         self.llm_client = llm_client
         self.tool_manager = tool_manager
         self.history_compressor = history_compressor
         self.rag_manager = rag_manager
-        self.history = []
+        self.response_cache = response_cache
+        self.conversation_log = conversation_log or shared_conversation_log()
+        # 后台请求计划的线程池，与第一轮行动并行
+        self._plan_executor = ThreadPoolExecutor(max_workers=Config.LLM_MAX_CONCURRENCY, thread_name_prefix="react-plan")
 
-    def run(self, user_input: str, max_steps: int = 100, user_id: str = None) -> tuple[str, list]:
+    def run(self, user_input: str, max_steps: int = 100, user_id: str = None, history: list = None) -> tuple[str, list]:
         """
         Run the ReAct agent with Tool Calls and return the final answer and thinking steps.
         
+        This drives ``run_stream`` to completion (without token streaming or a
+        plan) and collects its events. A semantic cache hit yields a single
+        final-answer step marked ``cached``.
+        
         Returns:
             tuple: (final_answer, thinking_steps)
             - final_answer: The final answer to the user's question
             - thinking_steps: List of dictionaries containing the thinking process
         """
-        # 0. 添加用户画像
-        profile_prompt = ""
-        if self.rag_manager and user_id:
-            profile = self.rag_manager.query(f"user_profile_{user_id}")
-            if profile:
-                profile_prompt = f"The user's profile is as follows: {profile}. Please refer to this information to provide a more personalized and accurate answer."
-        # 1. 初始化思考过程和历史记录
-        current_time = datetime.now().strftime("%Y-%m-%d")
-        system_prompt_content = f"""You are a helpful assistant.
-
-**IMPORTANT INSTRUCTIONS:**
-1.  **The current date is {current_time}.** You MUST use this date for any calculations related to age or time. DO NOT use your internal knowledge about the date.
-2.  For questions about current facts or events (e.g., "who is the current president", "what is the latest news"), you MUST use the `search` tool to get real-time information. Your internal knowledge is outdated.
-3.  {profile_prompt}
-
-Use the provided tools to answer the user's question. When you have the final answer, use the `end_tool` to complete the task.
-"""
-        # 1. 生成计划
-        plan_prompt = f"""Please create a step-by-step plan to answer the following user query. The user query is: {user_input}"""
-        plan_messages = [
-            {"role": "system", "content": system_prompt_content.strip()},
-            {"role": "user", "content": plan_prompt}
-        ]
-        plan, _ = self.llm_client.generate_with_tools(plan_messages, [])
-        
-        yield {
-            "type": "plan",
-            "content": plan
-        }
-
-        # 2. 执行计划
-        messages = [
-            {"role": "system", "content": system_prompt_content.strip()},
-            {"role": "user", "content": user_input}
-        ]
-
-        # 1. 初始化
-        self.history.clear()
-        self.history.append({"role": "user", "content": user_input})
-        messages.extend(self.history)
-
-        yield {
-            "type": "thought",
-            "step": 0,
-            "content": "我正在思考如何回答你的问题..."
-        }
-
-        for i in range(max_steps):
-            # 2. 调用LLM
-            logger.info(f"--- Step {i+1} ---")
-
-            # 3. 使用Tool Calls生成响应
-            tools = self.tool_manager.get_tool_definitions()
-            response, tool_calls = self.llm_client.generate_with_tools(messages, tools)
-            
-            logger.info(f"LLM response: {response}")
-            logger.info(f"Tool calls: {tool_calls}")
+        final_answer = None
+        thinking_steps = []
+        # 非流式调用不展示计划，不必请求
+        for event in self.run_stream(user_input, max_steps=max_steps, history=history, stream=False,
+                                     user_id=user_id, plan_mode="off"):
+            if event["type"] == "step":
+                thinking_steps.append({
+                    "step": len(thinking_steps) + 1,
+                    "type": "action",
+                    "thought": event["thought"] or "",
+                    "action": event["action"],
+                    "observation": event["observation"]
+                })
+            elif event["type"] in ("final_answer", "error"):
+                final_answer = event["content"]
+                thinking_steps.append({
+                    "step": len(thinking_steps) + 1,
+                    "type": event["type"],
+                    "content": final_answer,
+                    "cached": event.get("cached", False)
+                })
 
-            # 4. 检查是否有工具调用
-            if tool_calls:
-                for tool_call in tool_calls:
-                    # 执行工具调用
-                    tool_result = self.tool_manager.execute_tool_call(tool_call)
-                    logger.info(f"Tool result: {tool_result}")
-                    
-                    # 检查是否是end_tool（任务完成）
-                    if tool_result.get("tool") == "end_tool" and tool_result.get("status") == "completed":
-                        final_answer = tool_result.get("result", "")
-                        model_citations = tool_result.get("citations", [])
-                        
-                        # 使用大模型自己提供的引用来源
-                        if model_citations:
-                            final_answer += "\n\n### 引用来源：\n"
-                            for i, citation in enumerate(model_citations, 1):
-                                final_answer += f"{i}. [{citation.get('title', '')}]({citation.get('url', '')})\n"
-                        
-                        logger.info(f"Final Answer: {final_answer}")
-                        
-                        # 添加最终答案到思考步骤
-                        thinking_steps.append({
-                            "step": len(thinking_steps) + 1,
-                            "type": "final_answer",
-                            "content": final_answer,
-                            "thought": "Final answer reached"
-                        })
-                        
-                        # 保存聊天记录和用户画像
-                        self.history.append(messages)
-                        if user_id:
-                            with open(f"history/{user_id}_{pd.Timestamp.now().strftime('%Y%m%d%H%M%S')}.json", "w") as f:
-                                json.dump(self.history, f, indent=4)
-                        if self.history_compressor and len(self.history) % 5 == 0:
-                            user_profile = self.history_compressor.extract_user_profile(self.history)
-                            if user_profile and self.rag_manager:
-                                self.rag_manager.add_documents([f"user_profile_{user_id}: {json.dumps(user_profile)}"])
-
-                        return final_answer, thinking_steps
-                    
-                    
-                    # 添加工具调用到思考步骤
-                    # 处理tool_call对象，提取工具名和参数
-                    # ChatCompletionMessageFunctionToolCall对象有function属性
-                    tool_name = tool_call.function.name
-                    arguments = tool_call.function.arguments
-                    
-                    thinking_steps.append({
-                        "step": len(thinking_steps) + 1,
-                        "type": "tool_call",
-                        "tool": tool_name,
-                        "arguments": arguments,
-                        "result": tool_result
-                    })
-                    
-                    # 将工具结果添加到消息历史
-                    messages.append({
-                        "role": "assistant",
-                        "tool_calls": [tool_call]
-                    })
-                    messages.append({
-                        "role": "tool",
-                        "tool_call_id": tool_call.id,
-                        "content": str(tool_result)
-                    })
-            else:
-                # 没有工具调用，直接返回响应作为最终答案
-                final_answer = response if response else "No response generated."
-                
-                # 如果有引用信息，将其添加到最终答案中
-                if all_citations:
-                    final_answer += "\n\n### 引用来源：\n"
-                    unique_citations = []
-                    seen_hrefs = set()
-                    for citation in all_citations:
-                        if citation['href'] not in seen_hrefs:
-                            seen_hrefs.add(citation['href'])
-                            unique_citations.append(citation)
-                    
-                    for i, citation in enumerate(unique_citations, 1):
-                        final_answer += f"{i}. [{citation['title']}]({citation['href']})"
-                        if 'source' in citation:
-                            final_answer += f" - {citation['source']}"
-                        final_answer += "\n"
-                
-                logger.info(f"Final Answer: {final_answer}")
-                
-                # 发送最终答案
-                yield {
-                    "type": "final_answer",
-                    "step": i + 1,
-                    "content": final_answer
-                }
-                
-                return
+        # 保存聊天记录和用户画像（每次运行各自的记录，不与并发请求共享）
+        history = [{"role": "user", "content": user_input}]
+        if final_answer:
+            history.append({"role": "assistant", "content": final_answer})
+        if user_id:
+            # 只放入写入队列，由后台线程追加到对话日志
+            self.conversation_log.append(user_id, history)
+            if (self.history_compressor and self.rag_manager
+                    and self.conversation_log.turn_count(user_id) % PROFILE_EVERY_N_TURNS == 0):
+                self.conversation_log.flush()
+                recent = self.conversation_log.read_messages(user_id, limit=PROFILE_EVERY_N_TURNS)
+                user_profile = self.history_compressor.extract_user_profile(recent)
+                if user_profile:
+                    self.rag_manager.add_documents(
+                        [f"user_profile_{user_id}: {json.dumps(user_profile)}"],
+                        ids=[f"user_profile_{user_id}"]
+                    )
 
-        # 7. 超出最大步数，返回错误信息
-        logger.warning("Max steps reached, unable to find an answer.")
-        error_message = "Sorry, I couldn't find an answer after several steps."
-        
-        thinking_steps.append({
-            "step": len(thinking_steps) + 1,
-            "type": "error",
-            "content": error_message,
-            "thought": "Max steps reached"
-        })
-        
-        return error_message, thinking_steps
+        return final_answer, thinking_steps
 
-    def run_stream(self, user_input: str, max_steps: int = 100, history: list = None) -> Iterator[Dict[str, Any]]:
+    def run_stream(self, user_input: str, max_steps: int = 100, history: list = None, stream: bool = None,
+                   user_id: str = None, plan_mode: str = None) -> Iterator[Dict[str, Any]]:
         """
         Stream the ReAct agent's thinking process with Tool Calls.
         
+        With ``stream`` (default: Config.REACT_STREAM_TOKENS) every turn is
+        requested as a token stream: content tokens are yielded as
+        ``content_delta`` events and the ``final_answer`` argument of
+        ``end_tool`` as ``answer_delta`` events while it is being generated.
+        
+        The plan is only shown to the user and never fed back into the action
+        loop, so with ``plan_mode`` (default: Config.REACT_PLAN_MODE)
+        ``parallel`` it is requested in the background while the first action
+        turn runs and yielded as soon as it is ready; ``blocking`` requests it
+        before the first turn and ``off`` never does. Queries whose quick
+        intent is in Config.REACT_PLAN_SKIP_INTENTS skip the plan.
+        
         Yields:
             Dict[str, Any]: Each step of the thinking process
         """
+        stream = Config.REACT_STREAM_TOKENS if stream is None else stream
+        # 命中语义缓存时直接回放之前的答案，不调用 LLM 和工具（追问和个性化回答不走缓存）
+        use_cache = self.cache_usable(history)
+        cached = self.response_cache.get(user_input) if use_cache else None
+        if cached:
+            yield from self._replay_cached_answer(cached)
+            return
 
-           # 0. 添加用户画像
+        # 0. 添加用户画像
         profile_prompt = ""
         if self.rag_manager:
-            profile = self.rag_manager.query(f"user_profile")
+            profile = self.rag_manager.query(f"user_profile_{user_id}" if user_id else "user_profile")
             if profile:
                 profile_prompt = f"The user's profile is as follows: {profile}. Please refer to this information to provide a more personalized and accurate answer."
         
@@ -224,7 +165,7 @@ Use the provided tools to answer the user's question. When you have the final an
 Use the provided tools to answer the user's question. When you have the final answer, use the `end_tool` to complete the task.
 """
         # 1. 生成计划
-        # 检查是否需要追问
+        # 计划只展示给用户、不参与后续行动，默认与第一轮行动并行请求
         plan_prompt = f"""Please create a step-by-step plan to answer the following user query. The user query is: {user_input}"""
         plan_messages = [
             {"role": "system", "content": system_prompt_content.strip()},
@@ -232,12 +173,15 @@ Use the provided tools to answer the user's question. When you have the final an
         ]
         tools = self.tool_manager.get_tool_definitions()
         
-        plan, _ = self.llm_client.generate_with_tools(plan_messages, tools)
-        
-        yield {
-            "type": "plan",
-            "content": plan
-        }
+        plan_mode = self._plan_mode(user_input, plan_mode)
+        plan = _PendingPlan()
+        if plan_mode == "parallel":
+            plan = _PendingPlan(self._plan_executor.submit(self.llm_client.generate, plan_messages))
+        elif plan_mode == "blocking":
+            yield {
+                "type": "plan",
+                "content": self.llm_client.generate(plan_messages)
+            }
 
         # 2. 执行计划
         messages = [
@@ -245,11 +189,6 @@ Use the provided tools to answer the user's question. When you have the final an
             {"role": "user", "content": user_input}
         ]
 
-        # 1. 初始化
-        self.history.clear()
-        self.history.append({"role": "user", "content": user_input})
-        messages.extend(self.history)
-
         yield {
             "type": "thought",
             "step": 0,
@@ -263,19 +202,26 @@ Use the provided tools to answer the user's question. When you have the final an
             # 3. 使用Tool Calls生成响应
             logger.info(f"Tools: {tools}")
             logger.info(f"Messages: {messages}")
-            response, tool_calls = self.llm_client.generate_with_tools(messages, tools)
+            if stream:
+                response, tool_calls = yield from self._stream_turn(messages, tools, i + 1, plan)
+            else:
+                response, tool_calls = self.llm_client.generate_with_tools(messages, tools)
+            yield from plan.poll()
             
             logger.info(f"LLM response: {response}")
             logger.info(f"Tool calls: {tool_calls}")
 
             # 4. 检查是否有工具调用
             if tool_calls:
-                for tool_call in tool_calls:
-                    # 执行工具调用
-                    tool_result = self.tool_manager.execute_tool_call(tool_call)
+                # 追问或结束任务时本轮其余工具的结果不会再被使用，直接处理控制类工具
+                control_call = next((tool_call for tool_call in tool_calls
+                                     if tool_call.function.name in ToolManager.CONTROL_TOOLS), None)
+                if control_call is not None:
+                    tool_result = self.tool_manager.execute_tool_call(control_call)
                     logger.info(f"Tool result: {tool_result}")
                     if tool_result.get("tool") == "ask_clarification":
                         # 检查是否是ask_clarification（需要追问）
+                        plan.cancel()
                         yield {
                             "type": "clarification",
                             "step": i + 1,
@@ -297,10 +243,13 @@ Use the provided tools to answer the user's question. When you have the final an
                         # 使用大模型自己提供的引用来源
                         if model_citations:
                             final_answer += "\n\n### 引用来源：\n"
-                            for i, citation in enumerate(model_citations, 1):
-                                final_answer += f"{i}. [{citation.get('title', '')}]({citation.get('url', '')})\n"
+                            for n, citation in enumerate(model_citations, 1):
+                                final_answer += f"{n}. [{citation.get('title', '')}]({citation.get('url', '')})\n"
                         
                         logger.info(f"Final Answer: {final_answer}")
+                        if use_cache:
+                            self.response_cache.put(user_input, final_answer)
+                        plan.cancel()
                         
                         # 发送最终答案
                         yield {
@@ -310,48 +259,45 @@ Use the provided tools to answer the user's question. When you have the final an
                         }
                         
                         return
-                    
+                
+                # 并发执行本轮的工具调用，每个观察结果完成后立即推送
+                tool_results = [None] * len(tool_calls)
+                for index, tool_result in self.tool_manager.execute_tool_calls(tool_calls):
+                    tool_call = tool_calls[index]
+                    tool_results[index] = tool_result
+                    logger.info(f"Tool result: {tool_result}")
                     
                     # 改造返回给前端的数据结构
                     yield {
                         "type": "step",
                         "step": i + 1,
+                        "index": index,
                         "thought": response,  # LLM的思考过程
                         "action": f"{tool_call.function.name}({tool_call.function.arguments})",
                         "observation": json.dumps(tool_result, ensure_ascii=False)
                     }
-                    
-                    # 将工具结果添加到消息历史
-                    messages.append({
-                        "role": "assistant",
-                        "tool_calls": [tool_call]
-                    })
+                    yield from plan.poll()
+                
+                # 将工具调用和结果按模型给出的顺序添加到消息历史
+                messages.append({
+                    "role": "assistant",
+                    "content": response,
+                    "tool_calls": [self._tool_call_to_dict(tool_call) for tool_call in tool_calls]
+                })
+                for tool_call, tool_result in zip(tool_calls, tool_results):
                     messages.append({
                         "role": "tool",
                         "tool_call_id": tool_call.id,
                         "content": str(tool_result)
                     })
             else:
-                # 没有工具调用，直接返回响应作为最终答案
+                # 没有工具调用，直接返回响应作为最终答案（引用来源只通过 end_tool 提供）
                 final_answer = response if response else "No response generated."
                 
-                # 如果有引用信息，将其添加到最终答案中
-                if all_citations:
-                    final_answer += "\n\n### 引用来源：\n"
-                    unique_citations = []
-                    seen_hrefs = set()
-                    for citation in all_citations:
-                        if citation['href'] not in seen_hrefs:
-                            seen_hrefs.add(citation['href'])
-                            unique_citations.append(citation)
-                    
-                    for i, citation in enumerate(unique_citations, 1):
-                        final_answer += f"{i}. [{citation['title']}]({citation['href']})"
-                        if 'source' in citation:
-                            final_answer += f" - {citation['source']}"
-                        final_answer += "\n"
-                
                 logger.info(f"Final Answer: {final_answer}")
+                if response and use_cache:
+                    self.response_cache.put(user_input, final_answer)
+                plan.cancel()
                 
                 # 发送最终答案
                 yield {
@@ -364,12 +310,111 @@ Use the provided tools to answer the user's question. When you have the final an
 
         # 5. 超出最大步数，发送错误信息
         logger.warning("Max steps reached, unable to find an answer.")
+        plan.cancel()
         yield {
             "type": "error",
             "step": max_steps,
             "content": "Sorry, I couldn't find an answer after several steps."
         }
 
+    def cache_usable(self, history: list = None) -> bool:
+        """
+        Whether the semantic response cache may answer (and store) a query.
+
+        Cached answers are keyed by the question text alone and shared by all
+        users, so follow-ups that depend on earlier turns (``history``)
+        bypass the cache, and so do all queries when a RAG manager supplies
+        user profiles that personalize the answer.
+
+        Args:
+            history (list): Earlier messages of the conversation
+
+        Returns:
+            bool: True if the cache may be used
+        """
+        return self.response_cache is not None and not history and self.rag_manager is None
+
+    @staticmethod
+    def _plan_mode(user_input: str, plan_mode: str = None) -> str:
+        """Effective plan mode for a query: ``parallel``, ``blocking`` or ``off``."""
+        plan_mode = (plan_mode or Config.REACT_PLAN_MODE).lower()
+        if plan_mode not in ("parallel", "blocking", "off"):
+            logger.warning(f"Unknown plan mode {plan_mode!r}, using 'parallel'")
+            plan_mode = "parallel"
+        # 天气、基金等单步查询不需要计划
+        if plan_mode != "off" and quick_intent.classify(user_input) in Config.REACT_PLAN_SKIP_INTENTS:
+            return "off"
+        return plan_mode
+
+    @staticmethod
+    def _tool_call_to_dict(tool_call) -> Dict[str, Any]:
+        """Serialize a tool call object for the assistant message."""
+        return {
+            "id": tool_call.id,
+            "type": "function",
+            "function": {
+                "name": tool_call.function.name,
+                "arguments": tool_call.function.arguments
+            }
+        }
+
+    def _stream_turn(self, messages: list, tools: list, step: int, plan: "_PendingPlan" = None):
+        """
+        Run one ReAct turn as a token stream, forwarding tokens as they arrive.
+        
+        Yields:
+            Dict[str, Any]: ``content_delta`` and ``answer_delta`` events, and
+            the ``plan`` event of ``plan`` as soon as it is ready
+            
+        Returns:
+            tuple: (response, tool_calls) of the completed turn
+        """
+        answer_readers = {}
+        result = {"content": None, "tool_calls": None}
+        for event in self.llm_client.generate_with_tools_stream(messages, tools):
+            if plan is not None:
+                yield from plan.poll()
+            if event["type"] == "content":
+                yield {
+                    "type": "content_delta",
+                    "step": step,
+                    "content": event["delta"]
+                }
+            elif event["type"] == "tool_call" and event["name"] == "end_tool":
+                # 边生成边解析 end_tool 参数中的 final_answer
+                reader = answer_readers.get(event["index"])
+                if reader is None:
+                    reader = answer_readers[event["index"]] = PartialJSONStringReader("final_answer")
+                    delta = reader.feed(event["arguments"])
+                else:
+                    delta = reader.feed(event["arguments_delta"])
+                if delta:
+                    yield {
+                        "type": "answer_delta",
+                        "step": step,
+                        "content": delta
+                    }
+            elif event["type"] == "done":
+                result = event
+        return result["content"], result["tool_calls"]
+
+    def _replay_cached_answer(self, cached: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """Yield a cached answer, optionally in pieces, followed by the final answer event."""
+        logger.info(f"Response cache hit ({cached['intent']}, score={cached['score']:.3f}): {cached['question']}")
+        if Config.RESPONSE_CACHE_STREAM_CHUNK > 0:
+            for piece in iter_answer_chunks(cached["answer"], Config.RESPONSE_CACHE_STREAM_CHUNK):
+                yield {
+                    "type": "answer_delta",
+                    "step": 0,
+                    "content": piece
+                }
+        yield {
+            "type": "final_answer",
+            "step": 0,
+            "content": cached["answer"],
+            "cached": True
+        }
+
     def _execute_action(self, action: str) -> str:
         """Legacy method - no longer used with Tool Calls"""
         logger.warning("_execute_action is deprecated. Use Tool Calls instead.")
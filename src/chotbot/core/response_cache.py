@@ -0,0 +1,235 @@
+"""
+语义回答缓存：相似问题在有效期内直接复用之前的回答，不再调用 LLM 和工具
+"""
+
+import re
+import time
+import logging
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Callable, Dict, Any, Optional, Iterator, FrozenSet
+from chotbot.intent import quick_intent
+from chotbot.rag.embedding_cache import normalize_text
+from chotbot.utils.config import Config
+
+logger = logging.getLogger(__name__)
+
+# 语气词、疑问词等不影响答案的字符，比较问题内容时忽略
+_FILLER_CHARS = frozenset("的了吗呢啊吧呀嘛么请问下帮我你们给查询看告诉怎样如何什是多少样哪些个在有能可以要想知道")
+_TERM_RE = re.compile(r"[A-Za-z]+|\d+(?:\.\d+)?|[\u4e00-\u9fff]")
+
+
+def default_ttls() -> Dict[str, int]:
+    """Per-intent TTLs in seconds from the configuration."""
+    return {
+        quick_intent.WEATHER: Config.RESPONSE_CACHE_TTL_WEATHER,
+        quick_intent.FUND: Config.RESPONSE_CACHE_TTL_FUND,
+        quick_intent.STOCK: Config.RESPONSE_CACHE_TTL_STOCK,
+        quick_intent.NEWS: Config.RESPONSE_CACHE_TTL_NEWS,
+        quick_intent.DOCS: Config.RESPONSE_CACHE_TTL_DOCS,
+        quick_intent.GENERAL: Config.RESPONSE_CACHE_TTL_GENERAL,
+    }
+
+
+def content_terms(text: str, include_cjk: bool = True) -> FrozenSet[str]:
+    """
+    Content-bearing terms of a query: numbers, lower-cased Latin words and
+    (optionally) CJK characters other than fillers.
+
+    Two queries whose terms differ (e.g. "北京天气" vs "上海天气") must not share
+    an answer no matter how close their embeddings are.
+    """
+    terms = set()
+    for match in _TERM_RE.finditer(text):
+        term = match.group().lower()
+        if len(term) == 1 and "\u4e00" <= term <= "\u9fff":
+            if not include_cjk or term in _FILLER_CHARS:
+                continue
+        terms.add(term)
+    return frozenset(terms)
+
+
+def iter_answer_chunks(answer: str, chunk_size: int) -> Iterator[str]:
+    """Split a cached answer into pieces for simulated streaming."""
+    for start in range(0, len(answer), chunk_size):
+        yield answer[start:start + chunk_size]
+
+
+class SemanticResponseCache:
+    """
+    Thread-safe semantic cache of final answers.
+
+    A lookup first tries the normalized query text, then embeds the query and
+    compares it against cached questions of the same intent. A hit requires
+    cosine similarity above ``threshold`` and matching content terms (for
+    ``docs`` only numbers and Latin words must match, so paraphrases still
+    hit). Entries expire after their intent's TTL; the least recently used
+    entry is evicted once ``max_entries`` is exceeded.
+    """
+
+    def __init__(
+        self,
+        embed_fn: Callable[[str], np.ndarray],
+        threshold: float = None,
+        max_entries: int = None,
+        ttls: Dict[str, int] = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.embed_fn = embed_fn
+        self.threshold = Config.RESPONSE_CACHE_THRESHOLD if threshold is None else threshold
+        self.max_entries = max_entries or Config.RESPONSE_CACHE_SIZE
+        self.ttls = ttls or default_ttls()
+        self.clock = clock
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._matrices: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+        self._intent_stats: Dict[str, Dict[str, int]] = {}
+
+    def get(self, query: str) -> Optional[Dict[str, Any]]:
+        """
+        Find a cached answer for ``query``.
+
+        Args:
+            query (str): User query
+
+        Returns:
+            Optional[Dict[str, Any]]: ``{"answer", "intent", "question", "score", "age"}``
+            or None on a miss
+        """
+        key = normalize_text(query)
+        intent = quick_intent.classify(key)
+        now = self.clock()
+        with self._lock:
+            self._purge_expired(now)
+            entry = self._entries.get(key)
+            score = 1.0
+        if entry is None:
+            entry, score = self._semantic_match(key, intent)
+
+        with self._lock:
+            counters = self._intent_stats.setdefault(intent, {"hits": 0, "misses": 0})
+            if entry is None or entry["expires_at"] <= now or entry["key"] not in self._entries:
+                self._stats["misses"] += 1
+                counters["misses"] += 1
+                return None
+            self._entries.move_to_end(entry["key"])
+            self._stats["hits"] += 1
+            counters["hits"] += 1
+            return {
+                "answer": entry["answer"],
+                "intent": entry["intent"],
+                "question": entry["key"],
+                "score": score,
+                "age": now - entry["created_at"]
+            }
+
+    def put(self, query: str, answer: str, intent: str = None):
+        """
+        Cache the answer to ``query``.
+
+        Args:
+            query (str): User query
+            answer (str): Final answer to reuse
+            intent (str): Override the keyword-classified intent
+        """
+        if not answer:
+            return
+        key = normalize_text(query)
+        intent = intent or quick_intent.classify(key)
+        ttl = self.ttls.get(intent, self.ttls.get(quick_intent.GENERAL, 0))
+        if ttl <= 0:
+            return
+        try:
+            vector = np.asarray(self.embed_fn(key), dtype=np.float32)
+        except Exception as e:
+            logger.warning(f"Failed to embed query for response cache: {e}")
+            return
+        norm = np.linalg.norm(vector)
+        now = self.clock()
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = {
+                "key": key,
+                "intent": intent,
+                "terms": self._terms(key, intent),
+                "vector": vector / norm if norm else vector,
+                "answer": answer,
+                "created_at": now,
+                "expires_at": now + ttl
+            }
+            self._matrices.pop(intent, None)
+            self._purge_expired(now)
+            while len(self._entries) > self.max_entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._matrices.pop(evicted["intent"], None)
+                self._stats["evictions"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache statistics.
+
+        Returns:
+            Dict[str, Any]: Entry count, hit/miss/eviction counters, hit rate and per-intent counters
+        """
+        with self._lock:
+            total = self._stats["hits"] + self._stats["misses"]
+            return {
+                "entries": len(self._entries),
+                **self._stats,
+                "hit_rate": self._stats["hits"] / total if total else 0.0,
+                "by_intent": {intent: dict(counters) for intent, counters in self._intent_stats.items()}
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._matrices.clear()
+
+    def _semantic_match(self, key: str, intent: str):
+        with self._lock:
+            if not any(entry["intent"] == intent for entry in self._entries.values()):
+                return None, 0.0
+        try:
+            query = np.asarray(self.embed_fn(key), dtype=np.float32)
+        except Exception as e:
+            logger.warning(f"Failed to embed query for response cache: {e}")
+            return None, 0.0
+        norm = np.linalg.norm(query)
+        if not norm:
+            return None, 0.0
+
+        with self._lock:
+            entries, matrix = self._intent_matrix(intent)
+            if not entries:
+                return None, 0.0
+            scores = matrix @ (query / norm)
+            terms = self._terms(key, intent)
+            # 从最相似的开始检查，直到低于阈值
+            for row in np.argsort(-scores):
+                if scores[row] < self.threshold:
+                    break
+                if entries[row]["terms"] == terms:
+                    return entries[row], float(scores[row])
+        return None, 0.0
+
+    def _intent_matrix(self, intent: str):
+        """Stacked vectors of one intent's entries, rebuilt only after changes."""
+        cached = self._matrices.get(intent)
+        if cached is None:
+            entries = [entry for entry in self._entries.values() if entry["intent"] == intent]
+            matrix = np.stack([entry["vector"] for entry in entries]) if entries else None
+            cached = self._matrices[intent] = (entries, matrix)
+        return cached
+
+    def _purge_expired(self, now: float):
+        expired = [key for key, entry in self._entries.items() if entry["expires_at"] <= now]
+        for key in expired:
+            entry = self._entries.pop(key)
+            self._matrices.pop(entry["intent"], None)
+            self._stats["expirations"] += 1
+
+    @staticmethod
+    def _terms(key: str, intent: str) -> FrozenSet[str]:
+        return content_terms(key, include_cjk=intent != quick_intent.DOCS)
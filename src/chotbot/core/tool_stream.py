@@ -0,0 +1,127 @@
+"""
+流式 Tool Calls 解析：累积工具调用增量，并从尚未生成完的 JSON 参数中实时提取字符串字段
+"""
+
+import re
+import json
+from typing import Dict, Any, List, Optional
+from openai.types.chat import ChatCompletionMessageFunctionToolCall
+from openai.types.chat.chat_completion_message_function_tool_call import Function
+
+
+class ToolCallAccumulator:
+    """
+    Rebuild complete tool calls from streamed ``delta.tool_calls`` fragments.
+
+    Fragments are keyed by their ``index``; the id and name arrive in the first
+    fragment and the JSON arguments are spread over the following ones.
+    """
+
+    def __init__(self):
+        self._calls: Dict[int, Dict[str, str]] = {}
+
+    def add(self, delta) -> Dict[str, Any]:
+        """
+        Merge one streamed tool call fragment.
+
+        Args:
+            delta: ``ChoiceDeltaToolCall`` from a streaming chunk
+
+        Returns:
+            Dict[str, Any]: ``{"index", "id", "name", "arguments_delta", "arguments"}``
+            describing the call after the merge
+        """
+        call = self._calls.setdefault(delta.index, {"id": "", "name": "", "arguments": ""})
+        if delta.id:
+            call["id"] = delta.id
+        arguments_delta = ""
+        if delta.function is not None:
+            if delta.function.name:
+                call["name"] += delta.function.name
+            if delta.function.arguments:
+                arguments_delta = delta.function.arguments
+                call["arguments"] += arguments_delta
+        return {"index": delta.index, "arguments_delta": arguments_delta, **call}
+
+    def tool_calls(self) -> Optional[List[ChatCompletionMessageFunctionToolCall]]:
+        """
+        The accumulated tool calls in index order, or None if there were none.
+        """
+        if not self._calls:
+            return None
+        return [
+            ChatCompletionMessageFunctionToolCall(
+                id=call["id"],
+                type="function",
+                function=Function(name=call["name"], arguments=call["arguments"] or "{}")
+            )
+            for _, call in sorted(self._calls.items())
+        ]
+
+
+class PartialJSONStringReader:
+    """
+    Incrementally decode one top-level string field of a JSON object that is
+    still being generated, e.g. ``final_answer`` in ``end_tool`` arguments.
+
+    ``feed`` returns only the newly decoded characters. Escape sequences split
+    across fragments (including surrogate pairs) are held back until complete.
+    """
+
+    def __init__(self, key: str):
+        self._key_re = re.compile(r'"%s"\s*:\s*"' % re.escape(key))
+        self._buffer = ""
+        self._position = None
+        self.done = False
+
+    def feed(self, fragment: str) -> str:
+        """
+        Add more JSON text.
+
+        Args:
+            fragment (str): Next piece of the arguments string
+
+        Returns:
+            str: Newly available characters of the field value
+        """
+        self._buffer += fragment
+        if self.done:
+            return ""
+        if self._position is None:
+            match = self._key_re.search(self._buffer)
+            if not match:
+                return ""
+            self._position = match.end()
+
+        start = index = self._position
+        end = len(self._buffer)
+        while index < end:
+            char = self._buffer[index]
+            if char == '"':
+                self.done = True
+                break
+            if char == "\\":
+                length = self._escape_length(index)
+                if length is None:
+                    break
+                index += length
+            else:
+                index += 1
+        self._position = index + 1 if self.done else index
+        return json.loads('"' + self._buffer[start:index] + '"')
+
+    def _escape_length(self, index: int) -> Optional[int]:
+        """Length of the complete escape sequence at ``index`` or None if cut off."""
+        if index + 1 >= len(self._buffer):
+            return None
+        if self._buffer[index + 1] != "u":
+            return 2
+        if index + 6 > len(self._buffer):
+            return None
+        code = int(self._buffer[index + 2:index + 6], 16)
+        if 0xD800 <= code < 0xDC00:
+            # 高位代理项必须与后面的低位代理项一起解码
+            if index + 12 > len(self._buffer):
+                return None
+            return 12
+        return 6
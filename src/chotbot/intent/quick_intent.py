@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+快速意图分类 - 基于关键词的本地分类，不调用 LLM
+
+用于缓存 TTL 选择、跳过规划等只需要粗粒度意图、对延迟敏感的场景。
+"""
+
+import re
+
+WEATHER = "weather"
+FUND = "fund"
+STOCK = "stock"
+NEWS = "news"
+DOCS = "docs"
+GENERAL = "general"
+
+# 按优先级排列：先匹配到的意图生效
+_INTENT_PATTERNS = [
+    (WEATHER, re.compile(r"天气|气温|温度|下雨|下雪|降雨|降温|刮风|台风|雾霾|空气质量|weather|forecast|temperature", re.I)),
+    (FUND, re.compile(r"基金|净值|定投|(?<!\d)\d{6}(?!\d)|\bfund\b|\bnav\b", re.I)),
+    (STOCK, re.compile(r"股票|股价|行情|大盘|涨停|跌停|指数|\bstock\b|\bshares?\b", re.I)),
+    (NEWS, re.compile(r"新闻|最新|实时|现在|目前|今天|今日|昨天|最近|本周|今年|现任|\bnews\b|\blatest\b|\bcurrent\b|\btoday\b", re.I)),
+    (DOCS, re.compile(r"文档|资料|手册|说明书|教程|原理|定义|什么是|是什么|介绍一下|区别|\bdocs?\b|\bmanual\b|\bexplain\b|\bwhat is\b", re.I)),
+]
+
+
+def classify(text: str) -> str:
+    """
+    Classify a query into a coarse intent by keyword.
+
+    Args:
+        text (str): User query
+
+    Returns:
+        str: One of ``weather``, ``fund``, ``stock``, ``news``, ``docs``, ``general``
+    """
+    for intent, pattern in _INTENT_PATTERNS:
+        if pattern.search(text):
+            return intent
+    return GENERAL
@@ -1,6 +1,53 @@
+import time
+import logging
+import threading
+from bisect import bisect_left
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import List, Dict, Any, Optional
 from chotbot.utils.config import Config
 from chotbot.core.history_compressor import HistoryCompressor
+from chotbot.utils.tokenizer import message_tokens
+
+logger = logging.getLogger(__name__)
+
+# 发送给模型的消息只保留 API 定义的字段，去掉 token 数、摘要标记等内部字段
+_API_MESSAGE_KEYS = ("role", "content", "tool_calls", "tool_call_id")
+
+# 所有会话共用的后台压缩线程池，首次使用时创建
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+# 所有会话的后台压缩统计
+_metrics_lock = threading.Lock()
+_metrics = {"scheduled": 0, "completed": 0, "failed": 0, "discarded": 0, "total_lag_ms": 0.0, "max_lag_ms": 0.0}
+
+
+def _compression_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=Config.MCP_COMPRESSION_WORKERS, thread_name_prefix="mcp-compress")
+        return _executor
+
+
+def compression_stats() -> Dict[str, Any]:
+    """
+    Background compression statistics across all context managers.
+    
+    Lag is the time from scheduling a compression to swapping its result in.
+    
+    Returns:
+        Dict[str, Any]: scheduled/completed/failed/discarded counts, in-flight
+            count and average/max lag in milliseconds
+    """
+    with _metrics_lock:
+        stats = dict(_metrics)
+    total_lag = stats.pop("total_lag_ms")
+    stats["in_flight"] = stats["scheduled"] - stats["completed"] - stats["failed"] - stats["discarded"]
+    stats["avg_lag_ms"] = round(total_lag / stats["completed"], 1) if stats["completed"] else 0.0
+    stats["max_lag_ms"] = round(stats["max_lag_ms"], 1)
+    return stats
+
 
 class MCPContextManager:
     """
@@ -8,6 +55,12 @@ class MCPContextManager:
     
     This implementation manages the chat history and context window
     to ensure efficient use of the model's context limit.
+    
+    With ``MCP_COMPRESSION_ASYNC`` compression runs on a background worker:
+    the turn that crosses the threshold returns at once, ``get_context``
+    keeps serving the uncompressed history, and when the summary lands it
+    replaces the messages it covers in one swap, keeping any messages added
+    in the meantime.
     """
     def __init__(self, history_compressor: Optional[HistoryCompressor] = None):
         self.history: List[Dict[str, Any]] = []
@@ -17,6 +70,17 @@ class MCPContextManager:
         self.compression_enabled = Config.MCP_COMPRESSION_ENABLED
         self.compression_threshold = Config.MCP_COMPRESSION_THRESHOLD
         self.compression_strategy = Config.MCP_COMPRESSION_STRATEGY
+        self.compression_async = Config.MCP_COMPRESSION_ASYNC
+        self._lock = threading.RLock()
+        # 累计追加的消息数，用于在压缩结果到达时找出之后新增的消息
+        self._appended = 0
+        # clear() 后丢弃仍在进行中的压缩结果
+        self._generation = 0
+        self._pending: Optional[Future] = None
+        self._last_lag_ms: Optional[float] = None
+        # history 各前缀的累计 token 数（_prefix[i] 为前 i 条消息之和），属于 _prefix_owner 列表
+        self._prefix: List[int] = [0]
+        self._prefix_owner: Optional[List[Dict[str, Any]]] = None
     
     def add_message(self, role: str, content: str):
         """
@@ -30,14 +94,19 @@ class MCPContextManager:
             "role": role,
             "content": content
         }
-        self.history.append(message)
-        
-        # Check if compression is needed
-        if self._should_compress():
-            self._compress_history()
-        else:
+        message_tokens(message)
+        with self._lock:
+            self.history.append(message)
+            self._appended += 1
+            
+            # Check if compression is needed
+            if self._pending is None and self._should_compress():
+                if self.compression_async:
+                    self._schedule_compression()
+                    return
+                self._compress_history()
             # Limit the history to the configured limit
-            if len(self.history) > self.history_limit:
+            elif len(self.history) > self.history_limit:
                 self.history = self.history[-self.history_limit:]
     
     def get_context(self, max_tokens: int = None) -> List[Dict[str, Any]]:
@@ -48,33 +117,39 @@ class MCPContextManager:
             max_tokens (int): Maximum number of tokens allowed (default: MCP_MAX_CONTEXT_SIZE)
             
         Returns:
-            List[Dict[str, Any]]: Context messages
+            List[Dict[str, Any]]: Context messages with only ``role``,
+                ``content`` and, where present, ``tool_calls``/``tool_call_id``
         """
         max_tokens = max_tokens or self.max_context_size
         
-        # Simple token count estimation (1 token ~ 4 chars)
-        def estimate_tokens(text: str) -> int:
-            return len(text) // 4
-        
-        # Build context from the end
-        context = []
-        total_tokens = 0
-        
-        for message in reversed(self.history):
-            message_tokens = estimate_tokens(message["content"])
-            if total_tokens + message_tokens > max_tokens:
-                break
-            
-            context.insert(0, message)
-            total_tokens += message_tokens
+        # 保留末尾连续的、总 token 数不超过上限的消息：二分查找前缀和
+        with self._lock:
+            prefix = self._prefix_sums()
+            start = bisect_left(prefix, prefix[-1] - max_tokens)
+            window = self.history[start:]
         
-        return context
+        return [{key: message[key] for key in _API_MESSAGE_KEYS if key in message} for message in window]
+    
+    def _prefix_sums(self) -> List[int]:
+        """
+        Prefix sums of the message token counts, extended for appended
+        messages and rebuilt when the history list was replaced. Caller holds the lock.
+        """
+        if self._prefix_owner is not self.history or len(self._prefix) > len(self.history) + 1:
+            self._prefix, self._prefix_owner = [0], self.history
+        prefix = self._prefix
+        for message in self.history[len(prefix) - 1:]:
+            prefix.append(prefix[-1] + message_tokens(message))
+        return prefix
     
     def clear(self):
         """
         Clear the context history.
         """
-        self.history = []
+        with self._lock:
+            self.history = []
+            self._generation += 1
+            self._pending = None
     
     def get_history(self) -> List[Dict[str, Any]]:
         """
@@ -83,7 +158,8 @@ class MCPContextManager:
         Returns:
             List[Dict[str, Any]]: Full context history
         """
-        return self.history.copy()
+        with self._lock:
+            return self.history.copy()
     
     def get_history_count(self) -> int:
         """
@@ -135,13 +211,97 @@ class MCPContextManager:
             if len(self.history) > self.history_limit:
                 self.history = self.history[-self.history_limit:]
     
+    def _schedule_compression(self):
+        """
+        Compress a snapshot of the history on the background worker. Caller holds the lock.
+        """
+        snapshot = list(self.history)
+        appended, generation = self._appended, self._generation
+        scheduled_at = time.perf_counter()
+        logger.info(f"Scheduling background compression of {len(snapshot)} messages")
+        with _metrics_lock:
+            _metrics["scheduled"] += 1
+        
+        def compress():
+            return self.compressor.compress(snapshot, strategy=self.compression_strategy, keep_last_n=3)
+        
+        future = _compression_executor().submit(compress)
+        self._pending = future
+        future.add_done_callback(lambda done: self._swap_in(done, appended, generation, scheduled_at))
+    
+    def _swap_in(self, future: Future, appended: int, generation: int, scheduled_at: float):
+        """
+        Replace the compressed prefix of the history with the background result.
+        """
+        outcome = "completed"
+        with self._lock:
+            if self._pending is future:
+                self._pending = None
+            try:
+                compressed = future.result()
+            except Exception as e:
+                logger.error(f"Background compression failed: {e}")
+                outcome = "failed"
+                if len(self.history) > self.history_limit:
+                    self.history = self.history[-self.history_limit:]
+            else:
+                added = self._appended - appended
+                if generation != self._generation or added > len(self.history):
+                    # 历史已被清空或替换
+                    outcome = "discarded"
+                else:
+                    self.history = compressed + self.history[len(self.history) - added:]
+                    self._last_lag_ms = (time.perf_counter() - scheduled_at) * 1000
+        
+        with _metrics_lock:
+            _metrics[outcome] += 1
+            if outcome == "completed":
+                _metrics["total_lag_ms"] += self._last_lag_ms
+                _metrics["max_lag_ms"] = max(_metrics["max_lag_ms"], self._last_lag_ms)
+        if outcome == "completed":
+            logger.info(f"Background compression swapped in after {self._last_lag_ms:.0f} ms")
+    
+    def wait_for_compression(self, timeout: float = None) -> bool:
+        """
+        Wait for an in-flight background compression to be swapped in.
+        
+        Args:
+            timeout (float): Maximum seconds to wait (default: no limit)
+            
+        Returns:
+            bool: True if no compression is pending any more
+        """
+        with self._lock:
+            pending = self._pending
+        if pending is None:
+            return True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        try:
+            pending.result(timeout=timeout)
+        except Exception:
+            pass
+        # 结果在回调中替换，回调可能稍晚于 result() 返回
+        while True:
+            with self._lock:
+                if self._pending is not pending:
+                    return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.001)
+    
     def get_compression_stats(self) -> Dict[str, Any]:
         """
         Get statistics about compression if compressor is available.
         
         Returns:
-            Dict[str, Any]: Compression statistics
+            Dict[str, Any]: Compression statistics, whether a background
+                compression is pending and the lag of the last one
         """
         if hasattr(self.compressor, 'get_compression_stats'):
-            return self.compressor.get_compression_stats()
-        return {"enabled": self.compression_enabled}
+            stats = self.compressor.get_compression_stats()
+        else:
+            stats = {"enabled": self.compression_enabled}
+        with self._lock:
+            stats["pending"] = self._pending is not None
+            stats["last_lag_ms"] = self._last_lag_ms
+        return stats
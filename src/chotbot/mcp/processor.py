@@ -43,6 +43,89 @@ class MCPProcessor:
         
         return response
     
+    async def ainteract(self, user_input: str, system_prompt: str = None) -> str:
+        """
+        Asynchronously process a user input with context management.
+        
+        Args:
+            user_input (str): User's input message
+            system_prompt (str): Optional system prompt
+            
+        Returns:
+            str: Generated response
+        """
+        self.context_manager.add_message("user", user_input)
+        
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.extend(self.context_manager.get_context())
+        
+        response = await self.llm_client.agenerate(messages)
+        
+        self.context_manager.add_message("assistant", response)
+        
+        return response
+    
+    def interact_stream(self, user_input: str, system_prompt: str = None):
+        """
+        Process a user input with context management, streaming the response.
+        
+        The streamed tokens are accumulated so the reply is recorded in the
+        context without a second LLM call. An abandoned stream records nothing.
+        
+        Args:
+            user_input (str): User's input message
+            system_prompt (str): Optional system prompt
+            
+        Yields:
+            str: Chunks of the generated response
+        """
+        messages = self._build_messages(user_input, system_prompt)
+        chunks = []
+        for chunk in self.llm_client.generate_stream(messages):
+            chunks.append(chunk)
+            yield chunk
+        self.record_turn(user_input, "".join(chunks))
+    
+    async def ainteract_stream(self, user_input: str, system_prompt: str = None):
+        """
+        Asynchronous ``interact_stream``; closing the generator cancels the LLM request.
+        
+        Args:
+            user_input (str): User's input message
+            system_prompt (str): Optional system prompt
+            
+        Yields:
+            str: Chunks of the generated response
+        """
+        messages = self._build_messages(user_input, system_prompt)
+        chunks = []
+        async for chunk in self.llm_client.agenerate_stream(messages):
+            chunks.append(chunk)
+            yield chunk
+        self.record_turn(user_input, "".join(chunks))
+    
+    def record_turn(self, user_input: str, response: str):
+        """
+        Add a completed user/assistant exchange to the context.
+        
+        Args:
+            user_input (str): User's input message
+            response (str): Assistant's reply
+        """
+        self.context_manager.add_message("user", user_input)
+        self.context_manager.add_message("assistant", response)
+    
+    def _build_messages(self, user_input: str, system_prompt: str = None) -> list:
+        """Messages for the LLM: system prompt, context history and the new input."""
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.extend(self.context_manager.get_context())
+        messages.append({"role": "user", "content": user_input})
+        return messages
+    
     def clear_context(self):
         """
         Clear the current context history.
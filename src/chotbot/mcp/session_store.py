@@ -0,0 +1,189 @@
+"""
+会话存储：按会话 ID 隔离对话上下文，限制内存占用，淘汰的会话可写入磁盘并在再次访问时恢复
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Any, Optional
+from chotbot.mcp.processor import MCPProcessor
+from chotbot.utils.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class SessionStore:
+    """
+    Per-session MCP processors with bounded memory.
+
+    Sessions are kept in LRU order. Looking one up evicts sessions idle for
+    longer than ``idle_ttl`` and the least recently used ones beyond
+    ``max_sessions``; with ``spill_dir`` an evicted session's history is
+    written to disk and restored on its next access. Each session's history
+    is capped at ``max_messages``.
+
+    The store lock only guards the session table; a processor is used without
+    it, so conversations never wait on each other. An evicted session is
+    marked as spilling until its file is written, and accessing it waits for
+    the spill so the restore never misses (or overwrites) its history.
+    Concurrent first accesses to a session wait for a single restore.
+    """
+
+    def __init__(self, factory: Callable[[], MCPProcessor], max_sessions: int = None, idle_ttl: float = None,
+                 max_messages: int = None, spill_dir: str = None, clock: Callable[[], float] = time.monotonic):
+        self.factory = factory
+        self.max_sessions = max_sessions or Config.SESSION_MAX_SESSIONS
+        self.idle_ttl = Config.SESSION_IDLE_TTL if idle_ttl is None else idle_ttl
+        self.max_messages = max_messages or Config.SESSION_MAX_MESSAGES
+        self.spill_dir = Config.SESSION_SPILL_DIR if spill_dir is None else spill_dir
+        self.clock = clock
+        self._sessions: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        # 已从表中移除、仍在写入磁盘的会话：session_id -> 写入完成事件
+        self._spilling: Dict[str, threading.Event] = {}
+        # 正在从磁盘恢复（或新建）的会话：session_id -> 完成事件，同一会话只恢复一次
+        self._restoring: Dict[str, threading.Event] = {}
+        self._stats = {"created": 0, "restored": 0, "evicted": 0, "spilled": 0}
+
+    def get(self, session_id: str) -> MCPProcessor:
+        """
+        The processor of a session, created (or restored from disk) on first use.
+
+        Args:
+            session_id (str): Session or user ID
+
+        Returns:
+            MCPProcessor: The session's processor
+        """
+        now = self.clock()
+        processor = None
+        while True:
+            with self._lock:
+                entry = self._sessions.pop(session_id, None)
+                if entry is not None:
+                    processor = entry[0]
+                    self._sessions[session_id] = (processor, now)
+                    break
+                # 会话正在写入磁盘或正由其他请求恢复时等待其完成，否则由当前请求恢复
+                pending = self._spilling.get(session_id) or self._restoring.get(session_id)
+                if pending is None:
+                    self._restoring[session_id] = threading.Event()
+                    break
+            pending.wait()
+
+        if processor is None:
+            try:
+                restored = self._restore(session_id)
+                with self._lock:
+                    processor = restored or self.factory()
+                    self._stats["created"] += restored is None
+                    self._sessions[session_id] = (processor, now)
+            finally:
+                with self._lock:
+                    self._restoring.pop(session_id).set()
+
+        # 当前会话刚被移到最近使用端，不会被淘汰
+        with self._lock:
+            evicted = self._evict(now)
+        for evicted_id, evicted_processor in evicted:
+            try:
+                self._spill(evicted_id, evicted_processor)
+            finally:
+                with self._lock:
+                    self._spilling.pop(evicted_id).set()
+
+        history = processor.context_manager.history
+        if len(history) > self.max_messages:
+            processor.context_manager.history = history[-self.max_messages:]
+        return processor
+
+    def drop(self, session_id: str):
+        """Forget a session, including its spilled history."""
+        with self._lock:
+            self._sessions.pop(session_id, None)
+            spilling = self._spilling.get(session_id)
+        if spilling is not None:
+            spilling.wait()
+        path = self._spill_path(session_id)
+        if path and os.path.exists(path):
+            os.remove(path)
+
+    def spill_all(self):
+        """Write every in-memory session to disk (call on shutdown)."""
+        with self._lock:
+            sessions = list(self._sessions.items())
+        for session_id, (processor, _) in sessions:
+            self._spill(session_id, processor)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get session statistics.
+
+        Returns:
+            Dict[str, Any]: Active session count and created/restored/evicted/spilled counters
+        """
+        with self._lock:
+            return {"active": len(self._sessions), **self._stats}
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._sessions)
+
+    def _evict(self, now: float) -> list:
+        """
+        Pop idle and over-capacity sessions from the LRU end and mark them as
+        spilling; the caller must pass each one to ``_spill``. Caller holds the lock.
+        """
+        evicted = []
+        while self._sessions:
+            session_id, (processor, last_access) = next(iter(self._sessions.items()))
+            if len(self._sessions) <= self.max_sessions and (not self.idle_ttl or now - last_access < self.idle_ttl):
+                break
+            del self._sessions[session_id]
+            self._spilling[session_id] = threading.Event()
+            evicted.append((session_id, processor))
+            self._stats["evicted"] += 1
+        return evicted
+
+    def _spill_path(self, session_id: str) -> Optional[str]:
+        if not self.spill_dir:
+            return None
+        digest = hashlib.sha1(session_id.encode("utf-8")).hexdigest()
+        return os.path.join(self.spill_dir, f"{digest}.json")
+
+    def _spill(self, session_id: str, processor: MCPProcessor):
+        path = self._spill_path(session_id)
+        history = processor.context_manager.get_history()
+        if not path or not history:
+            return
+        try:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"session_id": session_id, "history": history[-self.max_messages:]}, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+            with self._lock:
+                self._stats["spilled"] += 1
+        except OSError as e:
+            logger.warning(f"Failed to spill session {session_id}: {e}")
+
+    def _restore(self, session_id: str) -> Optional[MCPProcessor]:
+        path = self._spill_path(session_id)
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                history = json.load(f)["history"]
+            os.remove(path)
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Failed to restore session {session_id}: {e}")
+            return None
+        processor = self.factory()
+        processor.context_manager.history = history
+        with self._lock:
+            self._stats["restored"] += 1
+        return processor
@@ -4,8 +4,53 @@
 """
 
 import requests
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, List
 from chotbot.utils.config import Config
+from chotbot.utils.http import HTTPClient
+from chotbot.mcp.tools.result_cache import tool_result_cache, unless_error, seconds_until_nav_update
+
+# 一年的交易日数，用于年化波动率
+TRADING_DAYS_PER_YEAR = 252
+
+
+def summarize_nav_history(history: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Return, volatility and drawdown of one NAV history, computed with NumPy.
+
+    Args:
+        history (List[Dict[str, Any]]): ``历史净值数据`` items (``日期``, ``单位净值``) in any order
+
+    Returns:
+        Dict[str, Any]: Period, latest NAV, period return, annualized volatility
+        and maximum drawdown (percentages as strings), or an error
+    """
+    points = []
+    for item in history:
+        try:
+            points.append((item["日期"], float(item["单位净值"])))
+        except (KeyError, TypeError, ValueError):
+            # 缺失或无法解析的净值直接跳过
+            continue
+    points.sort()
+    if len(points) < 2:
+        return {"error": "净值数据不足", "message": "至少需要两个交易日的净值"}
+
+    navs = np.array([nav for _, nav in points])
+    daily_returns = navs[1:] / navs[:-1] - 1
+    volatility = daily_returns.std(ddof=1) * np.sqrt(TRADING_DAYS_PER_YEAR) if len(daily_returns) > 1 else 0.0
+    drawdowns = navs / np.maximum.accumulate(navs) - 1
+    return {
+        "起始日期": points[0][0],
+        "结束日期": points[-1][0],
+        "数据条数": len(points),
+        "最新单位净值": points[-1][1],
+        "区间收益率": f"{(navs[-1] / navs[0] - 1) * 100:.2f}%",
+        "年化波动率": f"{volatility * 100:.2f}%",
+        "最大回撤": f"{drawdowns.min() * 100:.2f}%"
+    }
+
 
 class FundTool:
     """
@@ -14,6 +59,12 @@ class FundTool:
     
     def __init__(self):
         self.base_url = Config.FUND_API_BASE_URL
+        # 共享连接池，带超时、重试与熔断
+        self.http = HTTPClient("fund")
+        # 净值每个交易日更新一次，结果缓存到下一次净值发布
+        self.cache = tool_result_cache("fund", Config.FUND_CACHE_TTL)
+        # 批量查询时并发请求多只基金
+        self._executor = ThreadPoolExecutor(max_workers=Config.FUND_BATCH_WORKERS, thread_name_prefix="fund")
     
     def get_fund_basic_info(self, fund_code: str) -> Dict[str, Any]:
         """
@@ -25,11 +76,17 @@ class FundTool:
         Returns:
             Dict[str, Any]: 基金基本信息
         """
+        return self.cache.get_or_load(
+            ("detail", fund_code),
+            lambda: self._fetch_fund_basic_info(fund_code),
+            ttl=unless_error(seconds_until_nav_update)
+        )
+    
+    def _fetch_fund_basic_info(self, fund_code: str) -> Dict[str, Any]:
         try:
             # 查询基金基本信息
             url = f"{self.base_url}v1/fund/detail?fundCode={fund_code}"
-            response = requests.get(url)
-            response.raise_for_status()
+            response = self.http.get(url)
             
             data = response.json()
             
@@ -82,11 +139,17 @@ class FundTool:
         Returns:
             Dict[str, Any]: 基金净值历史数据
         """
+        return self.cache.get_or_load(
+            ("nav", fund_code, limit),
+            lambda: self._fetch_fund_net_worth_history(fund_code, limit),
+            ttl=unless_error(seconds_until_nav_update)
+        )
+    
+    def _fetch_fund_net_worth_history(self, fund_code: str, limit: int) -> Dict[str, Any]:
         try:
             # 查询基金净值历史
             url = f"{self.base_url}v1/fund/nav?fundCode={fund_code}&pageIndex=1&pageSize={limit}"
-            response = requests.get(url)
-            response.raise_for_status()
+            response = self.http.get(url)
             
             data = response.json()
             
@@ -124,3 +187,72 @@ class FundTool:
                 "error": f"基金净值数据解析失败: {str(e)}",
                 "message": "API响应格式可能已更改"
             }
+    
+    def get_funds_basic_info(self, fund_codes: List[str]) -> Dict[str, Any]:
+        """
+        批量查询多只基金的基本信息（并发请求）
+        
+        Args:
+            fund_codes (List[str]): 基金代码列表
+            
+        Returns:
+            Dict[str, Any]: 基金代码到基本信息的映射
+        """
+        codes = self._unique_codes(fund_codes)
+        return dict(zip(codes, self._executor.map(self.get_fund_basic_info, codes)))
+    
+    def get_funds_net_worth_history(self, fund_codes: List[str], limit: int = 30) -> Dict[str, Any]:
+        """
+        批量查询多只基金的净值历史（并发请求）
+        
+        Args:
+            fund_codes (List[str]): 基金代码列表
+            limit (int): 每只基金返回的数据条数
+            
+        Returns:
+            Dict[str, Any]: 基金代码到净值历史的映射
+        """
+        codes = self._unique_codes(fund_codes)
+        return dict(zip(codes, self._executor.map(lambda code: self.get_fund_net_worth_history(code, limit), codes)))
+    
+    def compare_funds(self, fund_codes: List[str], limit: int = 60) -> Dict[str, Any]:
+        """
+        对比多只基金：一次并发获取基本信息和净值历史，并计算区间收益率、年化波动率和最大回撤
+        
+        Args:
+            fund_codes (List[str]): 基金代码列表
+            limit (int): 用于计算的最近交易日数
+            
+        Returns:
+            Dict[str, Any]: 每只基金的名称、类型和净值统计，以及按区间收益率排序的基金代码
+        """
+        codes = self._unique_codes(fund_codes)
+        infos = [self._executor.submit(self.get_fund_basic_info, code) for code in codes]
+        histories = [self._executor.submit(self.get_fund_net_worth_history, code, limit) for code in codes]
+        
+        comparison = {}
+        for code, info, history in zip(codes, infos, histories):
+            info, history = info.result(), history.result()
+            if "error" in history:
+                comparison[code] = history
+                continue
+            comparison[code] = {
+                "基金名称": info.get("基金名称", ""),
+                "基金类型": info.get("基金类型", ""),
+                **summarize_nav_history(history["历史净值数据"])
+            }
+        
+        ranked = sorted(
+            (code for code, summary in comparison.items() if "区间收益率" in summary),
+            key=lambda code: float(comparison[code]["区间收益率"].rstrip("%")),
+            reverse=True
+        )
+        return {
+            "基金对比": comparison,
+            "按区间收益率排序": ranked
+        }
+    
+    @staticmethod
+    def _unique_codes(fund_codes: List[str]) -> List[str]:
+        """Strip and de-duplicate fund codes, keeping their order."""
+        return list(dict.fromkeys(code.strip() for code in fund_codes if code and code.strip()))
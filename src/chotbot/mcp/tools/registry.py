@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+声明式工具注册表：根据带类型注解的方法签名和文档字符串生成 Function Calling 定义，
+注册时生成一次并缓存，执行时按名称查表分发
+"""
+
+import re
+import inspect
+import typing
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, FrozenSet, List, Optional
+
+# Python 类型到 JSON Schema 类型
+_JSON_TYPES = {str: "string", int: "integer", float: "number", bool: "boolean", dict: "object", list: "array"}
+_SECTION_RE = re.compile(r"^\s*(Args|Arguments|Returns|Yields|Raises|Example|Examples|Note)\s*:\s*$")
+_ARG_RE = re.compile(r"^\s*(\w+)\s*(?:\([^)]*\))?\s*:\s*(.+)$")
+
+
+def json_schema(annotation) -> Dict[str, Any]:
+    """
+    JSON Schema of a type annotation (``str``, ``int``, ``float``, ``bool``,
+    ``List[X]``, ``Dict[...]``, ``Optional[X]``); unknown types become strings.
+    """
+    origin = typing.get_origin(annotation)
+    args = typing.get_args(annotation)
+    if origin is typing.Union:
+        # Optional[X] -> X
+        non_null = [arg for arg in args if arg is not type(None)]
+        return json_schema(non_null[0]) if len(non_null) == 1 else {}
+    if origin in (list, tuple, set, frozenset) or annotation in (list, tuple, set):
+        schema = {"type": "array"}
+        if args:
+            schema["items"] = json_schema(args[0])
+        return schema
+    if origin is dict:
+        return {"type": "object"}
+    return {"type": _JSON_TYPES.get(annotation, "string")}
+
+
+def parse_docstring(func: Callable) -> tuple:
+    """
+    Summary and per-argument descriptions from a Google-style docstring.
+
+    Returns:
+        tuple: (summary, {argument name: description})
+    """
+    doc = inspect.getdoc(func) or ""
+    summary_lines, arguments = [], {}
+    section = None
+    for line in doc.splitlines():
+        match = _SECTION_RE.match(line)
+        if match:
+            section = match.group(1)
+            continue
+        if section is None:
+            if line.strip():
+                summary_lines.append(line.strip())
+            elif summary_lines:
+                section = ""
+        elif section in ("Args", "Arguments"):
+            match = _ARG_RE.match(line)
+            if match:
+                arguments[match.group(1)] = match.group(2).strip()
+    return " ".join(summary_lines), arguments
+
+
+def function_definition(name: str, func: Callable, description: str = None) -> Dict[str, Any]:
+    """
+    OpenAI function definition derived from a typed function or bound method.
+
+    Parameters without a default are required; ``self``, ``*args`` and
+    ``**kwargs`` are ignored.
+
+    Args:
+        name (str): Function name exposed to the model
+        func (Callable): Function whose signature and docstring describe the tool
+        description (str): Override the docstring summary
+
+    Returns:
+        Dict[str, Any]: ``{"type": "function", "function": {...}}``
+    """
+    summary, argument_docs = parse_docstring(func)
+    hints = typing.get_type_hints(func)
+    properties, required = {}, []
+    for parameter in inspect.signature(func).parameters.values():
+        if parameter.name == "self" or parameter.kind in (parameter.VAR_POSITIONAL, parameter.VAR_KEYWORD):
+            continue
+        schema = json_schema(hints.get(parameter.name, str))
+        if parameter.name in argument_docs:
+            schema["description"] = argument_docs[parameter.name]
+        if parameter.default is parameter.empty:
+            required.append(parameter.name)
+        elif parameter.default is not None:
+            schema["default"] = parameter.default
+        properties[parameter.name] = schema
+    return {
+        "type": "function",
+        "function": {
+            "name": name,
+            "description": description or summary,
+            "parameters": {"type": "object", "properties": properties, "required": required}
+        }
+    }
+
+
+@dataclass
+class ToolSpec:
+    """
+    One registered function-calling tool.
+
+    ``resolve`` returns the callable at call time, so a tool instance can be
+    replaced after registration. With ``raw`` the callable returns the result
+    envelope (``result``, ``status``, ...) itself instead of a plain result.
+    """
+    name: str
+    definition: Dict[str, Any]
+    resolve: Callable[[], Callable]
+    parameters: FrozenSet[str]
+    raw: bool = False
+
+
+class ToolRegistry:
+    """
+    Name -> ToolSpec lookup table with the definitions list built once.
+    """
+
+    def __init__(self):
+        self._specs: Dict[str, ToolSpec] = {}
+        self._definitions: Optional[List[Dict[str, Any]]] = None
+
+    def register(self, name: str, func: Callable, description: str = None, parameters: Dict[str, Any] = None,
+                 resolve: Callable[[], Callable] = None, raw: bool = False) -> ToolSpec:
+        """
+        Register a tool.
+
+        Args:
+            name (str): Function name exposed to the model
+            func (Callable): Typed function (or unbound method) describing the tool;
+                it is also what gets called unless ``resolve`` is given
+            description (str): Override the docstring summary
+            parameters (dict): Hand-written JSON Schema instead of the derived one
+            resolve (Callable): Returns the callable to invoke at call time
+            raw (bool): The callable returns the full result envelope
+
+        Returns:
+            ToolSpec: The registered tool
+        """
+        definition = function_definition(name, func, description)
+        if parameters is not None:
+            definition["function"]["parameters"] = parameters
+        spec = ToolSpec(
+            name=name,
+            definition=definition,
+            resolve=resolve or (lambda: func),
+            parameters=frozenset(definition["function"]["parameters"].get("properties", {})),
+            raw=raw
+        )
+        self._specs[name] = spec
+        self._definitions = None
+        return spec
+
+    def get(self, name: str) -> Optional[ToolSpec]:
+        return self._specs.get(name)
+
+    def names(self) -> List[str]:
+        return list(self._specs)
+
+    def definitions(self) -> List[Dict[str, Any]]:
+        """The function definitions of all tools (cached; do not modify)."""
+        if self._definitions is None:
+            self._definitions = [spec.definition for spec in self._specs.values()]
+        return self._definitions
+
+    def call(self, name: str, arguments: Dict[str, Any]) -> Any:
+        """
+        Invoke a tool with model-supplied arguments, dropping unknown ones.
+
+        Raises:
+            KeyError: The tool is not registered
+            TypeError: Required arguments are missing
+        """
+        spec = self._specs[name]
+        arguments = {key: value for key, value in arguments.items() if key in spec.parameters}
+        return spec.resolve()(**arguments)
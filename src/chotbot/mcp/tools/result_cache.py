@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+工具结果缓存：按接口设置有效期，过期后先返回旧结果并在后台刷新，可选持久化到磁盘
+"""
+
+import os
+import atexit
+from datetime import datetime, timedelta, timezone, time as dt_time
+from typing import Any, Callable, Dict
+from chotbot.utils.cache import TTLCache
+from chotbot.utils.config import Config
+
+# 基金净值按北京时间发布
+_CHINA_TZ = timezone(timedelta(hours=8))
+
+
+def tool_result_cache(name: str, ttl: float) -> TTLCache:
+    """
+    Create the result cache of one tool.
+
+    Entries are served stale for ``TOOL_CACHE_STALE_TTL`` seconds after they
+    expire while a background refresh runs. With ``TOOL_CACHE_DIR`` set the
+    cache is loaded from ``<dir>/<name>.json`` and saved there on exit.
+
+    Args:
+        name (str): Tool name, used as the file name
+        ttl (float): Default TTL in seconds
+
+    Returns:
+        TTLCache: The cache
+    """
+    path = os.path.join(Config.TOOL_CACHE_DIR, f"{name}.json") if Config.TOOL_CACHE_DIR else None
+    cache = TTLCache(ttl, max_entries=Config.TOOL_CACHE_SIZE, stale_ttl=Config.TOOL_CACHE_STALE_TTL, persist_path=path)
+    if path:
+        atexit.register(cache.save)
+    return cache
+
+
+def unless_error(ttl: Callable[[], float]) -> Callable[[Dict[str, Any]], float]:
+    """TTL function for tool results: error results (with an ``error`` key) are not cached."""
+    return lambda result: 0 if "error" in result else ttl()
+
+
+def seconds_until_nav_update(now: datetime = None) -> float:
+    """
+    Seconds until the next fund NAV publication.
+
+    NAVs are published once per trading day at ``FUND_NAV_UPDATE_TIME``
+    (Beijing time); weekends are skipped, public holidays are not known and
+    only cause an early refresh.
+
+    Args:
+        now (datetime): Current time (timezone-aware), defaults to now
+
+    Returns:
+        float: Seconds until the next update
+    """
+    now = (now or datetime.now(_CHINA_TZ)).astimezone(_CHINA_TZ)
+    hour, minute = (int(part) for part in Config.FUND_NAV_UPDATE_TIME.split(":"))
+    update = datetime.combine(now.date(), dt_time(hour, minute), tzinfo=_CHINA_TZ)
+    if update <= now:
+        update += timedelta(days=1)
+    while update.weekday() >= 5:
+        update += timedelta(days=1)
+    return (update - now).total_seconds()
@@ -1,13 +1,43 @@
 from ddgs import DDGS
+import re
+import time
 import logging
+import threading
+from chotbot.rag.embedding_cache import normalize_text
+from chotbot.utils.cache import TTLCache
+from chotbot.utils.config import Config
 
 logger = logging.getLogger(__name__)
 
+# 末尾的标点不影响搜索结果
+_TRAILING_PUNCT_RE = re.compile(r"[\s?？!！.。,，;；]+$")
+
+
+def normalize_query(query: str) -> str:
+    """Cache key form of a search query: normalized, case-folded, without trailing punctuation."""
+    return _TRAILING_PUNCT_RE.sub("", normalize_text(query).casefold())
+
+
 class SearchTool:
     """
     A tool for performing deep searches using DuckDuckGo.
+
+    Results are cached for ``SEARCH_CACHE_TTL`` seconds per normalized query
+    and ``max_results``; concurrent identical searches share one upstream
+    request. Each worker thread keeps its own ``DDGS`` session.
     """
 
+    def __init__(self, cache_ttl: float = None, cache_size: int = None, timeout: float = None):
+        self.timeout = timeout or Config.SEARCH_TIMEOUT
+        self.cache = TTLCache(
+            ttl=Config.SEARCH_CACHE_TTL if cache_ttl is None else cache_ttl,
+            max_entries=cache_size or Config.SEARCH_CACHE_SIZE
+        )
+        # DDGS 会话不保证线程安全，每个工作线程复用自己的会话
+        self._local = threading.local()
+        self._metrics_lock = threading.Lock()
+        self._upstream = {"requests": 0, "errors": 0, "total_latency": 0.0, "max_latency": 0.0}
+
     def run(self, query: str, max_results: int = 3) -> dict:
         """
         Performs a search using DuckDuckGo and returns the results.
@@ -21,28 +51,78 @@ class SearchTool:
         """
         logger.info(f"Performing search for: '{query}'")
         try:
-            with DDGS(timeout=20) as ddgs:
-                results = list(ddgs.text(
-                    query,
-                    max_results=max_results
-                ))
-            logger.info(f"Found {len(results)} results.")
-            
-            # 格式化结果，添加引用信息
-            formatted_results = []
-            for idx, result in enumerate(results, 1):
-                formatted_results.append({
-                    "id": idx,
-                    "title": result.get("title", ""),
-                    "body": result.get("body", ""),
-                    "href": result.get("href", ""),
-                    "source": "DuckDuckGo Search"
-                })
-            
+            formatted_results = self.cache.get_or_load(
+                (normalize_query(query), max_results),
+                lambda: self._search(query, max_results)
+            )
             return {
                 "result": formatted_results,
                 "citations": formatted_results  # 添加引用信息
             }
         except Exception as e:
             logger.error(f"Search failed for query '{query}': {e}", exc_info=True)
-            return {"error": "Search failed", "message": str(e)}
\ No newline at end of file
+            return {"error": "Search failed", "message": str(e)}
+
+    def stats(self) -> dict:
+        """
+        Get cache and upstream metrics.
+
+        Returns:
+            dict: ``{"cache": {...}, "upstream": {"requests", "errors",
+            "avg_latency_ms", "max_latency_ms"}}``
+        """
+        with self._metrics_lock:
+            upstream = dict(self._upstream)
+        requests = upstream["requests"]
+        return {
+            "cache": self.cache.stats(),
+            "upstream": {
+                "requests": requests,
+                "errors": upstream["errors"],
+                "avg_latency_ms": upstream["total_latency"] / requests * 1000 if requests else 0.0,
+                "max_latency_ms": upstream["max_latency"] * 1000
+            }
+        }
+
+    def _search(self, query: str, max_results: int) -> list:
+        """One upstream request; raises on failure so errors are not cached."""
+        started = time.perf_counter()
+        failed = False
+        try:
+            results = list(self._session().text(
+                query,
+                max_results=max_results
+            ))
+        except Exception:
+            failed = True
+            # 出错的会话可能已不可用，下次重新创建
+            self._local.session = None
+            raise
+        finally:
+            self._record_upstream(time.perf_counter() - started, failed)
+        logger.info(f"Found {len(results)} results.")
+
+        # 格式化结果，添加引用信息
+        formatted_results = []
+        for idx, result in enumerate(results, 1):
+            formatted_results.append({
+                "id": idx,
+                "title": result.get("title", ""),
+                "body": result.get("body", ""),
+                "href": result.get("href", ""),
+                "source": "DuckDuckGo Search"
+            })
+        return formatted_results
+
+    def _session(self) -> DDGS:
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = DDGS(timeout=self.timeout)
+        return session
+
+    def _record_upstream(self, latency: float, failed: bool):
+        with self._metrics_lock:
+            self._upstream["requests"] += 1
+            self._upstream["errors"] += failed
+            self._upstream["total_latency"] += latency
+            self._upstream["max_latency"] = max(self._upstream["max_latency"], latency)
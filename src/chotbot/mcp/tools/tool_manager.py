@@ -4,20 +4,38 @@ MCP 工具管理器
 """
 
 import json
+import time
+import logging
+from collections import deque
 from math import e
-from typing import Dict, Any, List
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, Any, List, Iterator, Tuple
+from chotbot.utils.config import Config
 from chotbot.mcp.tools.weather import WeatherTool
 from chotbot.mcp.tools.fund import FundTool
 from chotbot.mcp.tools.search import SearchTool
+from chotbot.mcp.tools.registry import ToolRegistry
+
+logger = logging.getLogger(__name__)
+
 
 class ToolManager:
     """
     工具管理器类，用于管理所有可调用的 MCP 工具
     """
+    # 不访问外部服务、直接返回结果的控制类工具
+    CONTROL_TOOLS = ("end_tool", "ask_clarification")
     
     def __init__(self):
         self.tools = {}
+        # 各工具的超时时间（秒），未列出的使用 Config.TOOL_TIMEOUT
+        self.tool_timeouts = {"search": Config.TOOL_TIMEOUT_SEARCH}
+        # 同一轮中的多个工具调用在共享线程池中并发执行，每轮占用的线程数见 execute_tool_calls
+        self._executor = ThreadPoolExecutor(max_workers=Config.TOOL_MAX_WORKERS, thread_name_prefix="tool")
+        # Function Calling 工具注册表：定义在注册时生成一次，执行时按名称查表
+        self.registry = ToolRegistry()
         self._initialize_tools()
+        self._register_function_tools()
     
     def _initialize_tools(self):
         """
@@ -53,84 +71,82 @@ class ToolManager:
         
         return tool_list
     
+    def _register_function_tools(self):
+        """
+        注册可由模型调用的工具，参数定义由方法签名和文档字符串生成
+        """
+        self.register_method("search", "search", SearchTool.run,
+                             description="Search for information on the internet")
+        self.register_method("get_weather", "查询天气", WeatherTool.get_weather_by_city,
+                             description="查询城市的实时天气（温度、湿度、天气状况、风速、气压）")
+        self.register_method("get_fund_info", "查询基金信息", FundTool.get_fund_basic_info)
+        self.register_method("get_fund_nav_history", "查询基金信息", FundTool.get_fund_net_worth_history)
+        self.register_method("compare_funds", "查询基金信息", FundTool.compare_funds)
+        
+        # end_tool - 用于表示任务完成
+        self.registry.register(
+            "end_tool", _end_tool,
+            description="任务完成时调用此工具，并提供最终答案和所有引用来源的URL。",
+            parameters={
+                "type": "object",
+                "properties": {
+                    "final_answer": {
+                        "type": "string",
+                        "description": "给用户的最终答案"
+                    },
+                    "citations": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "title": {"type": "string", "description": "引用来源的标题"},
+                                "url": {"type": "string", "description": "引用来源的URL"}
+                            },
+                            "required": ["title", "url"]
+                        },
+                        "description": "回答问题时引用的所有URL列表"
+                    }
+                },
+                "required": ["final_answer"]
+            },
+            raw=True
+        )
+        self.registry.register(
+            "ask_clarification", ask_clarification,
+            description="当用户查询模糊时，使用此工具向用户询问澄清问题。"
+        )
+    
+    def register_method(self, name: str, tool_name: str, method, description: str = None, timeout: float = None):
+        """
+        将工具实例的方法注册为 Function Calling 工具
+        
+        调用时才从 self.tools 中取出实例，因此替换工具实例后无需重新注册。
+        
+        Args:
+            name (str): 提供给模型的函数名
+            tool_name (str): self.tools 中的工具名称
+            method: 工具类上带类型注解的方法，如 WeatherTool.get_weather_by_city
+            description (str): 覆盖文档字符串中的描述
+            timeout (float): 单次调用超时（秒），默认 Config.TOOL_TIMEOUT
+        """
+        method_name = method.__name__
+        self.registry.register(
+            name, method, description=description,
+            resolve=lambda: getattr(self.tools[tool_name], method_name)
+        )
+        if timeout is not None:
+            self.tool_timeouts[name] = timeout
+    
     def get_tool_definitions(self) -> List[Dict[str, Any]]:
         """
         获取工具定义，用于OpenAI Function Calling
         
+        定义在注册时生成并缓存，每一步调用都返回同一个列表，调用方不应修改。
+        
         Returns:
             List[Dict[str, Any]]: OpenAI函数定义列表
         """
-        definitions = []
-        
-        # search工具
-        definitions.append({
-            "type": "function",
-            "function": {
-                "name": "search",
-                "description": "Search for information on the internet",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "query": {
-                            "type": "string",
-                            "description": "The search query"
-                        }
-                    },
-                    "required": ["query"]
-                }
-            }
-        })
-        
-        # end_tool - 用于表示任务完成
-        definitions.append({
-            "type": "function",
-            "function": {
-                "name": "end_tool",
-                "description": "任务完成时调用此工具，并提供最终答案和所有引用来源的URL。",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "final_answer": {
-                            "type": "string",
-                            "description": "给用户的最终答案"
-                        },
-                        "citations": {
-                            "type": "array",
-                            "items": {
-                                "type": "object",
-                                "properties": {
-                                    "title": {"type": "string", "description": "引用来源的标题"},
-                                    "url": {"type": "string", "description": "引用来源的URL"}
-                                },
-                                "required": ["title", "url"]
-                            },
-                            "description": "回答问题时引用的所有URL列表"
-                        }
-                    },
-                    "required": ["final_answer"]
-                }
-            }
-        })
-
-        definitions.append({
-            "type": "function",
-            "function": {
-                "name": "ask_clarification",
-                "description": "当用户查询模糊时，使用此工具向用户询问澄清问题。",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "question": {
-                            "type": "string",
-                            "description": "用户需要澄清的问题"
-                        }
-                    },
-                    "required": ["question"]
-                }
-            }
-        })
-        
-        return definitions
+        return self.registry.definitions()
     
     def get_tool(self, tool_name: str):
         """
@@ -171,6 +187,103 @@ class ToolManager:
         except Exception as e:
             return {"error": f"工具调用失败: {str(e)}", "message": "请检查参数是否正确"}
     
+    def get_tool_timeout(self, tool_name: str) -> float:
+        """
+        获取工具的超时时间
+        
+        Args:
+            tool_name (str): 工具名称（Function Calling 中的名称）
+            
+        Returns:
+            float: 超时秒数
+        """
+        return self.tool_timeouts.get(tool_name, Config.TOOL_TIMEOUT)
+    
+    def execute_tool_calls(self, tool_calls: list) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """
+        并发执行同一轮中的多个工具调用，按完成先后返回结果
+        
+        一轮最多同时占用 Config.TOOL_MAX_WORKERS_PER_REQUEST 个线程，其余调用在有空闲时
+        再提交，避免一轮调用占满共享线程池。每个调用的超时从开始执行时计算，超时的调用
+        返回 status 为 "timeout" 的结果；后台线程无法被强制中止，完成前仍计入本轮占用的
+        线程。等待 Config.TOOL_QUEUE_TIMEOUT 秒仍未开始执行的调用同样按超时返回。
+        
+        Args:
+            tool_calls (list): 工具调用列表
+            
+        Yields:
+            Tuple[int, Dict[str, Any]]: (调用在列表中的下标, 工具执行结果)
+        """
+        limit = max(1, Config.TOOL_MAX_WORKERS_PER_REQUEST)
+        queue_deadline = time.monotonic() + Config.TOOL_QUEUE_TIMEOUT
+        waiting = deque(enumerate(tool_calls))
+        # 调用下标 -> 开始执行的时间，由工作线程写入
+        starts = {}
+        futures = {}
+        # 已超时但仍在运行的调用
+        abandoned = set()
+        
+        def deadline(index, tool_call):
+            start = starts.get(index)
+            if start is None:
+                return queue_deadline
+            return start + self.get_tool_timeout(tool_call.function.name)
+        
+        while True:
+            abandoned = {future for future in abandoned if not future.done()}
+            while waiting and len(futures) + len(abandoned) < limit:
+                index, tool_call = waiting.popleft()
+                future = self._executor.submit(self._safe_execute, tool_call, lambda index=index: starts.setdefault(index, time.monotonic()))
+                futures[future] = (index, tool_call)
+            if not futures and not waiting:
+                return
+            
+            next_deadline = min([deadline(index, tool_call) for index, tool_call in futures.values()] + ([queue_deadline] if waiting else []))
+            done, _ = wait(set(futures) | abandoned, timeout=max(0.0, next_deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+            for future in done:
+                if future in futures:
+                    index, _ = futures.pop(future)
+                    yield index, future.result()
+            
+            now = time.monotonic()
+            for future in [future for future, (index, tool_call) in futures.items() if deadline(index, tool_call) <= now]:
+                index, tool_call = futures.pop(future)
+                if future.done():
+                    yield index, future.result()
+                    continue
+                if future.cancel():
+                    yield index, self._timeout_result(tool_call, f"Tool call did not start within {Config.TOOL_QUEUE_TIMEOUT}s")
+                    continue
+                abandoned.add(future)
+                yield index, self._timeout_result(tool_call, f"Tool call timed out after {self.get_tool_timeout(tool_call.function.name)}s")
+            if waiting and queue_deadline <= now:
+                # 本轮的线程都被超时的调用占用，剩余调用不再等待
+                while waiting:
+                    index, tool_call = waiting.popleft()
+                    yield index, self._timeout_result(tool_call, f"Tool call did not start within {Config.TOOL_QUEUE_TIMEOUT}s")
+    
+    def _timeout_result(self, tool_call, error: str) -> Dict[str, Any]:
+        logger.warning(f"{error}: {tool_call.function.name}({tool_call.function.arguments})")
+        return {
+            "tool": tool_call.function.name,
+            "error": error,
+            "status": "timeout",
+            "tool_call_id": tool_call.id
+        }
+    
+    def _safe_execute(self, tool_call, on_start=None) -> Dict[str, Any]:
+        if on_start is not None:
+            on_start()
+        try:
+            return self.execute_tool_call(tool_call)
+        except Exception as e:
+            return {
+                "tool": tool_call.function.name,
+                "error": f"工具调用失败: {str(e)}",
+                "status": "error",
+                "tool_call_id": tool_call.id
+            }
+    
     def execute_tool_call(self, tool_call) -> Dict[str, Any]:
         """
         执行工具调用（OpenAI Function Calling格式）
@@ -186,51 +299,36 @@ class ToolManager:
         arguments = json.loads(tool_call.function.arguments)
         tool_call_id = tool_call.id
         
-        if tool_name == "end_tool":
-            # end_tool是特殊的完成工具
-            return {
-                "tool": "end_tool",
-                "result": arguments.get("final_answer", ""),
-                "citations": arguments.get("citations", []),
-                "status": "completed",
-                "tool_call_id": tool_call_id
-            }
-        elif tool_name == "search":
-            # 执行search工具
-            tool = self.get_tool("search")
-            if tool:
-                result = tool.run(arguments["query"])
-                return {
-                    "tool": "search",
-                    "result": result,
-                    "status": "success",
-                    "tool_call_id": tool_call_id
-                }
-            else:
-                return {
-                    "tool": "search",
-                    "error": "Tool not found",
-                    "status": "error",
-                    "tool_call_id": tool_call_id
-                }
-        elif tool_name == "ask_clarification":
-            # 执行ask_clarification工具
-            return {
-                "tool": "ask_clarification",
-                "result": arguments["question"],
-                "status": "success",
-                "tool_call_id": tool_call_id
-            }
-        else:
+        spec = self.registry.get(tool_name)
+        if spec is None:
             return {
                 "tool": tool_name,
                 "error": f"Unknown tool: {tool_name}",
                 "status": "error",
                 "tool_call_id": tool_call_id
             }
+        
+        result = self.registry.call(tool_name, arguments)
+        if not spec.raw:
+            result = {"result": result, "status": "success"}
+        return {"tool": tool_name, **result, "tool_call_id": tool_call_id}
+
+
+def _end_tool(final_answer: str = "", citations: list = None) -> Dict[str, Any]:
+    """end_tool是特殊的完成工具"""
+    return {
+        "result": final_answer,
+        "citations": citations or [],
+        "status": "completed"
+    }
 
 
 # 新增一个用于追问的工具
 def ask_clarification(question: str) -> str:
-    """When the user's query is ambiguous, use this tool to ask for clarification."""
+    """
+    When the user's query is ambiguous, use this tool to ask for clarification.
+    
+    Args:
+        question (str): 用户需要澄清的问题
+    """
     return question
\ No newline at end of file
@@ -6,6 +6,8 @@
 import requests
 from typing import Dict, Any
 from chotbot.utils.config import Config
+from chotbot.utils.http import HTTPClient
+from chotbot.mcp.tools.result_cache import tool_result_cache, unless_error
 
 class WeatherTool:
     """
@@ -16,6 +18,9 @@ class WeatherTool:
         self.api_key = Config.WEATHER_API_KEY
         self.base_url = Config.WEATHER_API_BASE_URL
         self.language = Config.WEATHER_API_LANGUAGE
+        # 共享连接池，带超时、重试与熔断
+        self.http = HTTPClient("weather")
+        self.cache = tool_result_cache("weather", Config.WEATHER_CACHE_TTL)
         
         # 城市代码映射（部分常见城市）
         self.city_code_map = {
@@ -41,6 +46,14 @@ class WeatherTool:
         Returns:
             Dict[str, Any]: 天气信息
         """
+        city = city.strip()
+        return self.cache.get_or_load(
+            city,
+            lambda: self._fetch_weather(city),
+            ttl=unless_error(lambda: self.cache.ttl)
+        )
+    
+    def _fetch_weather(self, city: str) -> Dict[str, Any]:
         if not self.api_key:
             return {
                 "error": "请先在配置文件中设置WEATHER_API_KEY",
@@ -67,8 +80,7 @@ class WeatherTool:
             }
         
         try:
-            response = requests.get(self.base_url, params=params)
-            response.raise_for_status()  # 检查请求是否成功
+            response = self.http.get(self.base_url, params=params)
             
             data = response.json()
             
@@ -0,0 +1,464 @@
+"""
+近似最近邻（ANN）索引：IVF-Flat 与 HNSW，纯 NumPy 实现
+
+Both stores subclass SimpleVectorStore and keep its contract
+(``add_documents`` / ``similarity_search(query_embedding, k)``), so they can
+be dropped in behind RAGRetriever via ``create_vector_store``.
+"""
+
+import os
+import heapq
+import math
+import logging
+import itertools
+import numpy as np
+from typing import List, Dict, Any
+from chotbot.rag.vector_store import SimpleVectorStore
+from chotbot.utils.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+def spherical_kmeans(vectors: np.ndarray, n_clusters: int, n_iter: int = 20, seed: int = 0,
+                     batch_size: int = 65536) -> np.ndarray:
+    """
+    Cluster L2-normalized vectors by cosine similarity.
+
+    Args:
+        vectors (np.ndarray): Normalized vectors, shape (N, d)
+        n_clusters (int): Number of centroids
+        n_iter (int): Lloyd iterations
+        seed (int): Random seed for initialisation
+        batch_size (int): Rows assigned per block to bound memory
+
+    Returns:
+        np.ndarray: Normalized centroids, shape (n_clusters, d)
+    """
+    rng = np.random.default_rng(seed)
+    n_clusters = min(n_clusters, vectors.shape[0])
+    centroids = vectors[rng.choice(vectors.shape[0], n_clusters, replace=False)].copy()
+
+    for _ in range(n_iter):
+        assignments = assign_to_centroids(vectors, centroids, batch_size)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, vectors)
+        counts = np.bincount(assignments, minlength=n_clusters)
+
+        # 空簇重新随机初始化，避免质心退化
+        empty = counts == 0
+        if empty.any():
+            sums[empty] = vectors[rng.choice(vectors.shape[0], int(empty.sum()), replace=False)]
+
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        centroids = (sums / norms).astype(np.float32)
+
+    return centroids
+
+
+def _save_arrays(path: str, arrays: Dict[str, np.ndarray]):
+    """Write arrays to an ``.npz`` file atomically (temporary file, fsync, replace)."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(f, **arrays)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _load_arrays(path: str) -> Dict[str, np.ndarray]:
+    """Read an ``.npz`` file written by ``_save_arrays``; empty if missing or unreadable."""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            return {key: data[key] for key in data.files}
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable index file {path}: {e}")
+        return {}
+
+
+def assign_to_centroids(vectors: np.ndarray, centroids: np.ndarray, batch_size: int = 65536) -> np.ndarray:
+    """Index of the most similar centroid for every row of ``vectors``."""
+    assignments = np.empty(vectors.shape[0], dtype=np.int32)
+    for start in range(0, vectors.shape[0], batch_size):
+        block = vectors[start:start + batch_size]
+        assignments[start:start + batch_size] = np.argmax(block @ centroids.T, axis=1)
+    return assignments
+
+
+class IVFFlatVectorStore(SimpleVectorStore):
+    """
+    Inverted-file index with a k-means coarse quantizer.
+
+    Vectors are bucketed under their nearest centroid; a query only scans the
+    ``nprobe`` closest buckets. Until enough vectors have been added to train
+    the quantizer, searches fall back to the exact scan.
+    """
+    # 触发训练所需的最少样本数 = nlist * MIN_POINTS_PER_LIST
+    MIN_POINTS_PER_LIST = 4
+    # 数据量增长到上次训练时的若干倍后重新训练
+    RETRAIN_GROWTH = 4
+
+    def __init__(self, dim: int = None, nlist: int = None, nprobe: int = None, **kwargs):
+        super().__init__(dim=dim, **kwargs)
+        self.nlist = nlist or Config.RAG_IVF_NLIST
+        self.nprobe = nprobe or Config.RAG_IVF_NPROBE
+        self.centroids = None
+        self._lists: List[List[int]] = []
+        self._list_arrays: Dict[int, np.ndarray] = {}
+        self._trained_size = 0
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    def add_documents(self, documents: List[str], embeddings: List[np.ndarray],
+                      metadatas: List[Dict[str, Any]] = None, ids: List[str] = None):
+        with self._lock:
+            start = self._size
+            super().add_documents(documents, embeddings, metadatas, ids)
+            if self._size == start:
+                return
+
+            if self._needs_training():
+                self.train()
+            elif self.is_trained:
+                self._assign_range(start, self._size)
+
+    def train(self):
+        """
+        (Re)train the coarse quantizer on the current vectors and rebuild lists.
+        """
+        with self._lock:
+            if self._size == 0:
+                return
+            self.centroids = spherical_kmeans(self.embeddings, self.nlist)
+            self._lists = [[] for _ in range(self.centroids.shape[0])]
+            self._list_arrays = {}
+            self._trained_size = self._size
+            self._assign_range(0, self._size)
+
+    # 量化器与每行所属的倒排表，随向量库一起保存
+    INDEX_FILE = "ivf.npz"
+
+    def _save_index(self, directory: str):
+        path = os.path.join(directory, self.INDEX_FILE)
+        if not self.is_trained:
+            if os.path.exists(path):
+                os.remove(path)
+            return
+        assignments = np.full(self._size, -1, dtype=np.int32)
+        for list_id, rows in enumerate(self._lists):
+            assignments[rows] = list_id
+        _save_arrays(path, {
+            "nlist": np.int64(self.nlist),
+            "trained_size": np.int64(self._trained_size),
+            "centroids": self.centroids,
+            "assignments": assignments
+        })
+
+    def _load_index(self, directory: str) -> bool:
+        arrays = _load_arrays(os.path.join(directory, self.INDEX_FILE))
+        if not arrays:
+            return False
+        centroids, assignments = arrays["centroids"], arrays["assignments"]
+        # 参数或维度变化、或索引比数据新（保存中途崩溃）时视为过期
+        if (int(arrays["nlist"]) != self.nlist or centroids.shape[1] != self.dim
+                or assignments.shape[0] > self._size):
+            return False
+
+        # 按倒排表编号分组还原各表的行号（保持行号升序）
+        order = np.argsort(assignments, kind="stable")
+        order = order[assignments[order] >= 0]
+        bounds = np.searchsorted(assignments[order], np.arange(centroids.shape[0] + 1))
+        self.centroids = centroids.astype(np.float32, copy=False)
+        self._lists = [order[bounds[i]:bounds[i + 1]].tolist() for i in range(centroids.shape[0])]
+        self._list_arrays = {}
+        self._trained_size = int(arrays["trained_size"])
+        # 索引保存之后追加的行
+        if assignments.shape[0] < self._size:
+            self._assign_range(assignments.shape[0], self._size)
+        if self._needs_training():
+            self.train()
+        return True
+
+    def _rebuild_index(self):
+        # 没有可用的已保存量化器，按当前数据重新训练
+        self.centroids = None
+        self._lists = []
+        self._list_arrays = {}
+        self._trained_size = 0
+        if self._needs_training():
+            self.train()
+
+    def _remap_rows(self, old_to_new: np.ndarray):
+        # 压缩后按新行号重写倒排表，删除的行直接丢弃
+        if not self.is_trained:
+            return
+        self._lists = [
+            [int(old_to_new[row]) for row in rows if old_to_new[row] >= 0]
+            for rows in self._lists
+        ]
+        self._list_arrays = {}
+
+    def similarity_search(self, query_embedding: np.ndarray, k: int = 3, nprobe: int = None) -> List[Dict[str, Any]]:
+        """
+        Search the ``nprobe`` closest inverted lists.
+
+        Args:
+            query_embedding (np.ndarray): Query embedding
+            k (int): Number of results to return
+            nprobe (int): Lists to scan (default: ``self.nprobe``); higher is
+                slower but more accurate
+
+        Returns:
+            List[Dict[str, Any]]: List of results with document, metadata and score
+        """
+        with self._lock:
+            if not self.is_trained:
+                return super().similarity_search(query_embedding, k)
+            if len(self) == 0 or k <= 0:
+                return []
+
+            query = self._normalize(np.asarray(query_embedding, dtype=np.float32).reshape(1, -1))[0]
+            nprobe = min(nprobe or self.nprobe, self.centroids.shape[0])
+            probe = self._top_k(self.centroids @ query, nprobe)
+
+            candidates = [self._list_array(int(list_id)) for list_id in probe]
+            candidates = np.concatenate(candidates) if candidates else np.empty(0, dtype=np.int64)
+            if self._deleted_count:
+                candidates = candidates[~self._deleted[candidates]]
+            if candidates.size == 0:
+                return []
+
+            scores = self.embeddings[candidates] @ query
+            order = self._top_k(scores, k)
+            return [self._result(candidates[i], scores[i]) for i in order]
+
+    def _needs_training(self) -> bool:
+        if not self.is_trained:
+            return self._size >= self.nlist * self.MIN_POINTS_PER_LIST
+        return self._size >= self._trained_size * self.RETRAIN_GROWTH
+
+    def _assign_range(self, start: int, end: int):
+        assignments = assign_to_centroids(self.embeddings[start:end], self.centroids)
+        for offset, list_id in enumerate(assignments.tolist()):
+            self._lists[list_id].append(start + offset)
+            self._list_arrays.pop(list_id, None)
+
+    def _list_array(self, list_id: int) -> np.ndarray:
+        # 倒排表按需转换为数组并缓存，追加时失效
+        array = self._list_arrays.get(list_id)
+        if array is None:
+            array = np.asarray(self._lists[list_id], dtype=np.int64)
+            self._list_arrays[list_id] = array
+        return array
+
+
+class HNSWVectorStore(SimpleVectorStore):
+    """
+    Hierarchical Navigable Small World graph index.
+
+    Insertion is incremental (no training step). ``ef_search`` trades query
+    latency for recall.
+    """
+
+    def __init__(self, dim: int = None, m: int = None, ef_construction: int = None,
+                 ef_search: int = None, seed: int = 0, **kwargs):
+        super().__init__(dim=dim, **kwargs)
+        self.m = m or Config.RAG_HNSW_M
+        self.m_max0 = self.m * 2
+        self.ef_construction = ef_construction or Config.RAG_HNSW_EF_CONSTRUCTION
+        self.ef_search = ef_search or Config.RAG_HNSW_EF_SEARCH
+        self._level_mult = 1 / math.log(self.m)
+        self._rng = np.random.default_rng(seed)
+        # 每层一个邻接表：节点编号 -> 邻居编号列表
+        self._layers: List[Dict[int, List[int]]] = []
+        self._entry_point = None
+
+    def add_documents(self, documents: List[str], embeddings: List[np.ndarray],
+                      metadatas: List[Dict[str, Any]] = None, ids: List[str] = None):
+        with self._lock:
+            start = self._size
+            super().add_documents(documents, embeddings, metadatas, ids)
+            for node in range(start, self._size):
+                self._insert(node)
+
+    # 各层邻接表（CSR 格式）与入口点，随向量库一起保存
+    INDEX_FILE = "hnsw.npz"
+
+    def _save_index(self, directory: str):
+        arrays = {
+            "count": np.int64(self._size),
+            "m": np.int64(self.m),
+            "entry_point": np.int64(-1 if self._entry_point is None else self._entry_point),
+            "layers": np.int64(len(self._layers))
+        }
+        for layer, graph in enumerate(self._layers):
+            lengths = np.fromiter((len(links) for links in graph.values()), dtype=np.int64, count=len(graph))
+            arrays[f"nodes_{layer}"] = np.fromiter(graph.keys(), dtype=np.int64, count=len(graph))
+            arrays[f"indptr_{layer}"] = np.concatenate([[0], np.cumsum(lengths)])
+            arrays[f"indices_{layer}"] = np.fromiter(itertools.chain.from_iterable(graph.values()),
+                                                     dtype=np.int64, count=int(lengths.sum()))
+        _save_arrays(os.path.join(directory, self.INDEX_FILE), arrays)
+
+    def _load_index(self, directory: str) -> bool:
+        arrays = _load_arrays(os.path.join(directory, self.INDEX_FILE))
+        if not arrays:
+            return False
+        count = int(arrays["count"])
+        # 参数变化、或索引比数据新（保存中途崩溃）时视为过期
+        if int(arrays["m"]) != self.m or count > self._size:
+            return False
+
+        layers = []
+        for layer in range(int(arrays["layers"])):
+            nodes = arrays[f"nodes_{layer}"].tolist()
+            indptr = arrays[f"indptr_{layer}"].tolist()
+            indices = arrays[f"indices_{layer}"].tolist()
+            layers.append({node: indices[indptr[i]:indptr[i + 1]] for i, node in enumerate(nodes)})
+        entry_point = int(arrays["entry_point"])
+        self._layers = layers
+        self._entry_point = None if entry_point < 0 else entry_point
+        # 索引保存之后追加的行
+        for node in range(count, self._size):
+            self._insert(node)
+        return True
+
+    def _rebuild_index(self):
+        # 没有可用的已保存图结构，逐个重新插入
+        self._layers = []
+        self._entry_point = None
+        for node in range(self._size):
+            self._insert(node)
+
+    def _remap_rows(self, old_to_new: np.ndarray):
+        # 压缩后删除图中已删除的节点并重新编号；删除比例有阈值限制，
+        # 剩余边足以保持图的连通性，不必整体重建
+        layers = []
+        for graph in self._layers:
+            remapped = {}
+            for node, links in graph.items():
+                if old_to_new[node] < 0:
+                    continue
+                remapped[int(old_to_new[node])] = [int(old_to_new[n]) for n in links if old_to_new[n] >= 0]
+            layers.append(remapped)
+        while layers and not layers[-1]:
+            layers.pop()
+        self._layers = layers
+
+        if self._entry_point is not None and old_to_new[self._entry_point] >= 0:
+            self._entry_point = int(old_to_new[self._entry_point])
+        else:
+            self._entry_point = next(iter(self._layers[-1]), None) if self._layers else None
+
+    def similarity_search(self, query_embedding: np.ndarray, k: int = 3, ef_search: int = None) -> List[Dict[str, Any]]:
+        """
+        Greedy descent through the upper layers, then a beam search of width
+        ``ef_search`` on the base layer.
+
+        Args:
+            query_embedding (np.ndarray): Query embedding
+            k (int): Number of results to return
+            ef_search (int): Beam width (default: ``self.ef_search``)
+
+        Returns:
+            List[Dict[str, Any]]: List of results with document, metadata and score
+        """
+        with self._lock:
+            if self._entry_point is None or len(self) == 0 or k <= 0:
+                return []
+
+            query = self._normalize(np.asarray(query_embedding, dtype=np.float32).reshape(1, -1))[0]
+            entry = self._entry_point
+            for layer in range(len(self._layers) - 1, 0, -1):
+                entry = self._search_layer(query, [entry], 1, layer)[0][1]
+
+            # 已删除的节点仍作为路径参与搜索，只从结果中剔除
+            ef = max(ef_search or self.ef_search, k + int(k * self.dead_fraction) + 1)
+            found = self._search_layer(query, [entry], ef, 0)
+            if self._deleted_count:
+                found = [(score, node) for score, node in found if not self._deleted[node]]
+            return [self._result(node, score) for score, node in found[:k]]
+
+    def _insert(self, node: int):
+        level = int(-math.log(1.0 - self._rng.random()) * self._level_mult)
+        while len(self._layers) <= level:
+            self._layers.append({})
+        for layer in range(level + 1):
+            self._layers[layer][node] = []
+
+        if self._entry_point is None:
+            self._entry_point = node
+            return
+
+        query = self._matrix[node]
+        entry = self._entry_point
+        top = self._node_level(entry)
+        for layer in range(top, level, -1):
+            entry = self._search_layer(query, [entry], 1, layer)[0][1]
+
+        entries = [entry]
+        for layer in range(min(top, level), -1, -1):
+            found = self._search_layer(query, entries, self.ef_construction, layer)
+            m_max = self.m_max0 if layer == 0 else self.m
+            neighbors = [n for _, n in found[:self.m]]
+            self._layers[layer][node] = neighbors
+            for neighbor in neighbors:
+                links = self._layers[layer][neighbor]
+                links.append(node)
+                if len(links) > m_max:
+                    self._shrink(neighbor, links, m_max, layer)
+            entries = [n for _, n in found]
+
+        if level > top:
+            self._entry_point = node
+
+    def _shrink(self, node: int, links: List[int], m_max: int, layer: int):
+        # 邻居过多时只保留相似度最高的 m_max 个
+        scores = self._matrix[links] @ self._matrix[node]
+        keep = self._top_k(scores, m_max)
+        self._layers[layer][node] = [links[i] for i in keep]
+
+    def _node_level(self, node: int) -> int:
+        for layer in range(len(self._layers) - 1, -1, -1):
+            if node in self._layers[layer]:
+                return layer
+        return 0
+
+    def _search_layer(self, query: np.ndarray, entries: List[int], ef: int, layer: int) -> List[tuple]:
+        """
+        Beam search on one layer.
+
+        Returns:
+            List[tuple]: ``(score, node)`` pairs sorted by descending score
+        """
+        graph = self._layers[layer]
+        visited = set(entries)
+        entry_scores = self._matrix[entries] @ query
+        # candidates: 最大堆（取负），results: 大小为 ef 的最小堆
+        candidates = [(-float(s), n) for s, n in zip(entry_scores, entries)]
+        results = [(float(s), n) for s, n in zip(entry_scores, entries)]
+        heapq.heapify(candidates)
+        heapq.heapify(results)
+        while len(results) > ef:
+            heapq.heappop(results)
+
+        while candidates:
+            neg_score, node = heapq.heappop(candidates)
+            if -neg_score < results[0][0] and len(results) >= ef:
+                break
+            fresh = [n for n in graph.get(node, ()) if n not in visited]
+            if not fresh:
+                continue
+            visited.update(fresh)
+            scores = self._matrix[fresh] @ query
+            for score, neighbor in zip(scores.tolist(), fresh):
+                if len(results) < ef or score > results[0][0]:
+                    heapq.heappush(candidates, (-score, neighbor))
+                    heapq.heappush(results, (score, neighbor))
+                    if len(results) > ef:
+                        heapq.heappop(results)
+
+        return sorted(results, reverse=True)
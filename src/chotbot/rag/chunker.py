@@ -0,0 +1,140 @@
+"""
+文档切分：按字符、句子或 token 数将文本切成带元数据的片段（支持中文断句）
+"""
+
+import re
+from typing import Iterable, Iterator, Dict, Any, List, Tuple, Callable
+from chotbot.utils.config import Config
+from chotbot.utils.tokenizer import count_tokens
+
+# 句末标点（中英文）及段落分隔；英文句号需后跟空白才算句末，避免切开小数和缩写
+_SENTENCE_END_RE = re.compile(r"[。！？!?；;…]+[”’」』）)]*|\.(?=\s)|\n\s*\n")
+# 句内可断开的位置，用于拆分超长句子
+_CLAUSE_END_RE = re.compile(r"[，,、：:]")
+
+
+class TextChunker:
+    """
+    Streaming text chunker.
+
+    Modes:
+        - "character": fixed-size character windows
+        - "sentence": sentences packed up to ``chunk_size`` characters
+        - "token": sentences packed up to ``chunk_size`` tokens
+
+    Each chunk is yielded as ``{"text": ..., "metadata": {...}}`` where the
+    metadata carries the source path, character offset within the source,
+    page number (PDFs) and the chunk's ordinal within the source.
+    """
+    MODES = ("character", "sentence", "token")
+
+    def __init__(self, chunk_size: int = None, chunk_overlap: int = None, mode: str = None):
+        self.chunk_size = chunk_size or Config.RAG_CHUNK_SIZE
+        self.chunk_overlap = Config.RAG_CHUNK_OVERLAP if chunk_overlap is None else chunk_overlap
+        self.mode = mode or Config.RAG_CHUNK_MODE
+        if self.mode not in self.MODES:
+            raise ValueError(f"Unknown chunk mode: {self.mode}")
+        if self.chunk_overlap >= self.chunk_size:
+            raise ValueError("chunk_overlap must be smaller than chunk_size")
+        self._length: Callable[[str], int] = count_tokens if self.mode == "token" else len
+
+    def chunk(self, text: str, source: str = None) -> Iterator[Dict[str, Any]]:
+        """
+        Split a single text.
+
+        Args:
+            text (str): Text to split
+            source (str): Source file path recorded in the metadata
+
+        Yields:
+            Dict[str, Any]: Chunks with text and metadata
+        """
+        yield from self.chunk_pages([text], source=source, paged=False)
+
+    def chunk_pages(self, pages: Iterable[str], source: str = None, paged: bool = True) -> Iterator[Dict[str, Any]]:
+        """
+        Split a paged document; chunks never span page boundaries.
+
+        Args:
+            pages (Iterable[str]): Page texts in order
+            source (str): Source file path recorded in the metadata
+            paged (bool): Whether to record 1-based page numbers
+
+        Yields:
+            Dict[str, Any]: Chunks with text and metadata
+        """
+        index = 0
+        page_offset = 0
+        for page_number, page in enumerate(pages, 1):
+            for start, end in self._spans(page):
+                raw = page[start:end]
+                text = raw.strip()
+                if text:
+                    yield {
+                        "text": text,
+                        "metadata": {
+                            "source": source,
+                            "offset": page_offset + start + len(raw) - len(raw.lstrip()),
+                            "page": page_number if paged else None,
+                            "chunk_index": index
+                        }
+                    }
+                    index += 1
+            # pdfminer 用换页符分隔页面，偏移量按原文计算
+            page_offset += len(page) + 1
+
+    def _spans(self, text: str) -> Iterator[Tuple[int, int]]:
+        if self.mode == "character":
+            yield from self._character_spans(text, 0, len(text))
+            return
+
+        window: List[Tuple[int, int]] = []
+        window_length = 0
+        for start, end in self._units(text):
+            unit_length = self._length(text[start:end])
+            if window and window_length + unit_length > self.chunk_size:
+                yield window[0][0], window[-1][1]
+                # 保留末尾若干句作为与下一片段的重叠
+                while window and (window_length > self.chunk_overlap or window_length + unit_length > self.chunk_size):
+                    window_length -= self._length(text[window[0][0]:window[0][1]])
+                    window.pop(0)
+            window.append((start, end))
+            window_length += unit_length
+
+        if window:
+            yield window[0][0], window[-1][1]
+
+    def _units(self, text: str) -> Iterator[Tuple[int, int]]:
+        """Sentences, with oversized sentences broken at clauses or characters."""
+        for start, end in self._split(text, 0, len(text), _SENTENCE_END_RE):
+            if self._length(text[start:end]) <= self.chunk_size:
+                yield start, end
+                continue
+            for clause_start, clause_end in self._split(text, start, end, _CLAUSE_END_RE):
+                if self._length(text[clause_start:clause_end]) <= self.chunk_size:
+                    yield clause_start, clause_end
+                else:
+                    yield from self._character_spans(text, clause_start, clause_end, overlap=0)
+
+    @staticmethod
+    def _split(text: str, start: int, end: int, pattern: re.Pattern) -> Iterator[Tuple[int, int]]:
+        position = start
+        for match in pattern.finditer(text, start, end):
+            if match.end() > position:
+                yield position, match.end()
+                position = match.end()
+        if position < end:
+            yield position, end
+
+    def _character_spans(self, text: str, start: int, end: int, overlap: int = None) -> Iterator[Tuple[int, int]]:
+        overlap = self.chunk_overlap if overlap is None else overlap
+        position = start
+        while position < end:
+            stop = min(position + self.chunk_size, end)
+            # token 模式下按实际 token 数收缩窗口
+            while self.mode == "token" and stop - position > 1 and self._length(text[position:stop]) > self.chunk_size:
+                stop = position + max(1, (stop - position) * 9 // 10)
+            yield position, stop
+            if stop >= end:
+                break
+            position = max(stop - overlap, position + 1)
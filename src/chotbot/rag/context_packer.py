@@ -0,0 +1,140 @@
+"""
+上下文打包：在 token 预算内按相似度从高到低挑选检索片段，合并同一文档中相互重叠的片段
+"""
+
+import logging
+from typing import List, Dict, Any, Union, Callable
+from chotbot.utils.config import Config
+from chotbot.utils.tokenizer import count_tokens, truncate_to_tokens
+
+logger = logging.getLogger(__name__)
+
+
+class ContextPacker:
+    """
+    Pack retrieved chunks into a token budget.
+
+    Chunks are taken in descending score order. A chunk that overlaps (or is
+    contained in) an already selected chunk of the same source is merged into
+    it, so the overlapping text is only paid for once; exact duplicates from
+    different sources are dropped. An overlapping chunk whose new text does
+    not fit is dropped rather than added separately. Any other chunk that no
+    longer fits is skipped in favour of smaller lower-ranked ones, except that
+    the remaining budget is filled with a truncated prefix when at least
+    ``min_truncated_tokens`` are left.
+    """
+
+    def __init__(self, token_budget: int = None, min_truncated_tokens: int = None,
+                 count_fn: Callable[[str], int] = count_tokens):
+        self.token_budget = token_budget or Config.RAG_CONTEXT_TOKEN_BUDGET
+        self.min_truncated_tokens = Config.RAG_CONTEXT_MIN_TRUNCATED_TOKENS if min_truncated_tokens is None else min_truncated_tokens
+        self.count_fn = count_fn
+
+    def pack(self, chunks: List[Union[str, Dict[str, Any]]]) -> Dict[str, Any]:
+        """
+        Select and merge chunks within the token budget.
+
+        Args:
+            chunks (list): Plain strings (already ranked) or search results
+                ``{"document", "metadata", "score"}``
+
+        Returns:
+            Dict[str, Any]: ``{"documents", "used_tokens", "dropped_tokens",
+            "dropped_chunks", "merged_chunks", "duplicate_chunks"}`` where
+            ``documents`` are the selected texts in rank order
+        """
+        candidates = [self._as_candidate(chunk, rank) for rank, chunk in enumerate(chunks)]
+        candidates.sort(key=lambda candidate: (-candidate["score"], candidate["rank"]))
+
+        selected: List[Dict[str, Any]] = []
+        seen_texts = set()
+        stats = {"used_tokens": 0, "dropped_tokens": 0, "dropped_chunks": 0,
+                 "merged_chunks": 0, "duplicate_chunks": 0}
+
+        for candidate in candidates:
+            text = candidate["text"]
+            if not text.strip():
+                continue
+            if text in seen_texts:
+                stats["duplicate_chunks"] += 1
+                continue
+
+            target = self._find_overlap(selected, candidate)
+            if target is not None:
+                merged = self._merge(target, candidate)
+                if merged is None:
+                    # 完全包含在已选片段中
+                    stats["duplicate_chunks"] += 1
+                    continue
+                extra_tokens = self.count_fn(merged["text"]) - target["tokens"]
+                if stats["used_tokens"] + extra_tokens <= self.token_budget:
+                    stats["used_tokens"] += extra_tokens
+                    target.update(merged, tokens=target["tokens"] + extra_tokens)
+                    seen_texts.add(text)
+                    stats["merged_chunks"] += 1
+                else:
+                    # 单独加入会重复计入重叠部分，预算不足时直接丢弃
+                    stats["dropped_tokens"] += extra_tokens
+                    stats["dropped_chunks"] += 1
+                continue
+
+            tokens = self.count_fn(text)
+            remaining = self.token_budget - stats["used_tokens"]
+            if tokens <= remaining:
+                candidate["tokens"] = tokens
+            elif remaining >= self.min_truncated_tokens and remaining > 0:
+                candidate["text"] = truncate_to_tokens(text, remaining)
+                candidate["tokens"] = self.count_fn(candidate["text"])
+                candidate["end"] = None
+                stats["dropped_tokens"] += tokens - candidate["tokens"]
+            else:
+                stats["dropped_tokens"] += tokens
+                stats["dropped_chunks"] += 1
+                continue
+            selected.append(candidate)
+            seen_texts.add(text)
+            stats["used_tokens"] += candidate["tokens"]
+
+        if stats["dropped_chunks"] or stats["dropped_tokens"]:
+            logger.info(f"Context packed: {stats['used_tokens']}/{self.token_budget} tokens used, "
+                        f"{stats['dropped_tokens']} tokens dropped ({stats['dropped_chunks']} chunks)")
+        return {"documents": [candidate["text"] for candidate in selected], **stats}
+
+    @staticmethod
+    def _as_candidate(chunk: Union[str, Dict[str, Any]], rank: int) -> Dict[str, Any]:
+        if isinstance(chunk, str):
+            return {"text": chunk, "score": 0.0, "rank": rank, "source": None, "start": None, "end": None}
+        metadata = chunk.get("metadata") or {}
+        text = chunk.get("document", "")
+        offset = metadata.get("offset")
+        return {
+            "text": text,
+            "score": float(chunk.get("score", 0.0)),
+            "rank": rank,
+            "source": metadata.get("source"),
+            "start": offset,
+            "end": offset + len(text) if offset is not None else None
+        }
+
+    @staticmethod
+    def _find_overlap(selected: List[Dict[str, Any]], candidate: Dict[str, Any]):
+        if candidate["source"] is None or candidate["start"] is None:
+            return None
+        for chunk in selected:
+            if (chunk["source"] == candidate["source"] and chunk["end"] is not None
+                    and candidate["start"] <= chunk["end"] and chunk["start"] <= candidate["end"]):
+                return chunk
+        return None
+
+    @staticmethod
+    def _merge(target: Dict[str, Any], candidate: Dict[str, Any]):
+        """Union of two overlapping spans of the same source, or None if nothing is new."""
+        start, end = target["start"], target["end"]
+        if candidate["start"] >= start and candidate["end"] <= end:
+            return None
+        text = target["text"]
+        if candidate["start"] < start:
+            text = candidate["text"][:start - candidate["start"]] + text
+        if candidate["end"] > end:
+            text = text + candidate["text"][end - candidate["start"]:]
+        return {"text": text, "start": min(start, candidate["start"]), "end": max(end, candidate["end"])}
@@ -0,0 +1,149 @@
+"""
+查询向量 LRU 缓存：相同（规范化后）文本不重复调用 Embedding 模型
+"""
+
+import os
+import re
+import threading
+import unicodedata
+import numpy as np
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+from chotbot.utils.config import Config
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """
+    Canonical cache key for a query: NFKC-normalized (full-width -> half-width),
+    trimmed, with runs of whitespace collapsed.
+    """
+    return _WHITESPACE_RE.sub(" ", unicodedata.normalize("NFKC", text)).strip()
+
+
+class EmbeddingCache:
+    """
+    Thread-safe LRU cache of embeddings bounded by entry count and memory.
+
+    Cached vectors are returned read-only so callers cannot corrupt them.
+    """
+
+    def __init__(self, max_entries: int = None, max_bytes: int = None, persist_path: str = None):
+        self.max_entries = max_entries or Config.RAG_QUERY_CACHE_SIZE
+        self.max_bytes = max_bytes or Config.RAG_QUERY_CACHE_MAX_MB * 1024 * 1024
+        self.persist_path = persist_path if persist_path is not None else Config.RAG_QUERY_CACHE_PATH
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if self.persist_path:
+            self.load(self.persist_path)
+
+    def get(self, text: str) -> Optional[np.ndarray]:
+        """
+        Look up an embedding, marking it most recently used.
+
+        Args:
+            text (str): Query text (normalized internally)
+
+        Returns:
+            Optional[np.ndarray]: Cached embedding, or None on a miss
+        """
+        key = normalize_text(text)
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return vector
+
+    def put(self, text: str, vector: np.ndarray) -> np.ndarray:
+        """
+        Store an embedding, evicting least recently used entries over the caps.
+
+        Args:
+            text (str): Query text (normalized internally)
+            vector (np.ndarray): Embedding to cache
+
+        Returns:
+            np.ndarray: The read-only float32 copy that was cached
+        """
+        key = normalize_text(text)
+        vector = np.array(vector, dtype=np.float32)
+        vector.setflags(write=False)
+        if vector.nbytes > self.max_bytes:
+            return vector
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous.nbytes
+            self._entries[key] = vector
+            self._bytes += vector.nbytes
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+        return vector
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache statistics.
+
+        Returns:
+            Dict[str, Any]: Entry count, memory usage, hits, misses and hit rate
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def save(self, path: str = None):
+        """
+        Write the cache to an ``.npz`` file (LRU order is preserved).
+
+        Args:
+            path (str): Target file (default: ``persist_path``)
+        """
+        path = path or self.persist_path
+        if not path:
+            return
+        with self._lock:
+            keys = list(self._entries.keys())
+            vectors = list(self._entries.values())
+        if not vectors:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = path + ".tmp.npz"
+        np.savez(tmp_path, keys=np.array(keys), vectors=np.stack(vectors))
+        os.replace(tmp_path, path)
+
+    def load(self, path: str) -> bool:
+        """
+        Restore entries written by ``save``; a missing or unreadable file is ignored.
+
+        Returns:
+            bool: True if entries were loaded
+        """
+        if not os.path.exists(path):
+            return False
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                keys, vectors = data["keys"], data["vectors"]
+        except Exception:
+            return False
+        for key, vector in zip(keys.tolist(), vectors):
+            self.put(key, vector)
+        return True
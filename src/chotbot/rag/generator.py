@@ -1,26 +1,62 @@
 from chotbot.core.llm_client import LLMClient
+from chotbot.rag.context_packer import ContextPacker
 
 class RAGGenerator:
-    def __init__(self, llm_client: LLMClient):
+    def __init__(self, llm_client: LLMClient, context_packer: ContextPacker = None):
         self.llm_client = llm_client
-    
+        self.context_packer = context_packer or ContextPacker()
+        # 最近一次打包的 token 统计（已用 / 丢弃）
+        self.last_packing = None
+
     def generate(self, query: str, context_docs: list) -> str:
         """
         Generate a response using RAG (Retrieval-Augmented Generation).
-        
+
+        The context is packed into the configured token budget first; the
+        token usage is kept in ``last_packing``.
+
         Args:
             query (str): User query
-            context_docs (list): Relevant documents from retrieval
-            
+            context_docs (list): Relevant documents from retrieval, either
+                texts in rank order or search results with scores and metadata
+
         Returns:
             str: Generated response
         """
+        return self.llm_client.generate(self.build_messages(query, context_docs))
+
+    def generate_stream(self, query: str, context_docs: list):
+        """
+        Stream a RAG response token by token.
+
+        Args:
+            query (str): User query
+            context_docs (list): Relevant documents from retrieval
+
+        Yields:
+            str: Chunks of the generated response
+        """
+        yield from self.llm_client.generate_stream(self.build_messages(query, context_docs))
+
+    def build_messages(self, query: str, context_docs: list) -> list:
+        """
+        Build the LLM messages for a query and its packed context.
+
+        Args:
+            query (str): User query
+            context_docs (list): Relevant documents from retrieval
+
+        Returns:
+            list: Messages in OpenAI format
+        """
+        packed = self.context_packer.pack(context_docs or [])
+        self.last_packing = {key: value for key, value in packed.items() if key != "documents"}
+        context_docs = packed["documents"]
+
         if not context_docs:
             # Fallback to normal LLM generation if no context
-            return self.llm_client.generate([
-                {"role": "user", "content": query}
-            ])
-        
+            return [{"role": "user", "content": query}]
+
         # Construct prompt with context
         context = "\n\n".join(context_docs)
         prompt = f"""
@@ -32,7 +68,5 @@ Question: {query}
 
 Please answer the question using only the information from the context. If you cannot answer the question from the context, please say "I don't have enough information to answer that question."
 """
-        
-        return self.llm_client.generate([
-            {"role": "user", "content": prompt}
-        ])
+
+        return [{"role": "user", "content": prompt}]
@@ -1,14 +1,20 @@
-from chotbot.rag.vector_store import SimpleVectorStore
+import atexit
+import numpy as np
+from chotbot.rag.vector_store import create_vector_store
+from chotbot.rag.embedding_cache import EmbeddingCache
 from chotbot.rag.retriever import RAGRetriever
 from chotbot.rag.generator import RAGGenerator
 from chotbot.core.llm_client import LLMClient
 from chotbot.utils.config import Config
-from chotbot.utils.rag_loader import load_documents, update_loaded_record, DOC_DIR
+from chotbot.utils.rag_loader import scan_document_changes, iter_document_changes, commit_document_changes, DOC_DIR, INDEX_DIR
 from sentence_transformers import SentenceTransformer  # 引入本地Embedding模型
 
 class RAGManager:
+    # 自动加载时每攒够这么多片段就编码一次，避免整个语料同时驻留内存
+    INGEST_BUFFER_SIZE = 4096
+    
     def __init__(self, llm_client: LLMClient = None, auto_load: bool = True):
-        self.vector_store = SimpleVectorStore()
+        self.vector_store = create_vector_store()
         self.llm_client = llm_client or LLMClient()
         self.retriever = RAGRetriever(self.vector_store)
         self.generator = RAGGenerator(self.llm_client)
@@ -17,32 +23,75 @@ class RAGManager:
         # 模型：all-MiniLM-L6-v2 - 轻量高效，支持中文，体积~40MB
         self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
         
+        # 查询向量缓存（配置了 RAG_QUERY_CACHE_PATH 时在退出前落盘）
+        self.query_cache = EmbeddingCache()
+        if self.query_cache.persist_path:
+            atexit.register(self.query_cache.save)
+        
         # 自动加载doc目录的文件
         if auto_load:
             self.auto_load_documents()
     
     def auto_load_documents(self):
-        """自动加载doc目录的文件"""
+        """
+        自动加载doc目录的文件
+
+        如果磁盘上已有持久化的向量索引，直接打开索引，只解析并嵌入新增或修改
+        过的文件，并删除已修改或已删除文件的旧片段；否则加载并嵌入全部文件。
+        """
         try:
-            documents = load_documents()
-            if documents:
-                self.add_documents(documents)
-                # 更新已加载文件的记录
-                update_loaded_record()
+            index_loaded = Config.RAG_PERSIST_INDEX and self.vector_store.load(INDEX_DIR)
+            changes = scan_document_changes(loaded=None if index_loaded else {})
+            if index_loaded and not (changes["added"] or changes["modified"] or changes["deleted"]):
+                return
+            
+            texts, metadatas = [], []
+            for change in iter_document_changes(changes):
+                # 修改或删除的文件：先删除旧版本的所有片段
+                if change["status"] in ("modified", "deleted"):
+                    self.vector_store.delete(source=change["path"])
+                for chunk in change["chunks"]:
+                    texts.append(chunk["text"])
+                    metadatas.append(chunk["metadata"])
+                if len(texts) >= self.INGEST_BUFFER_SIZE:
+                    self.add_documents(texts, metadatas=metadatas)
+                    texts, metadatas = [], []
+            if texts:
+                self.add_documents(texts, metadatas=metadatas)
+            if Config.RAG_PERSIST_INDEX:
+                self.vector_store.save(INDEX_DIR)
+            # 更新已加载文件的记录
+            commit_document_changes(changes)
         except Exception as e:
             print(f"自动加载文档失败: {str(e)}")
     
-    def add_documents(self, documents: list):
+    def add_documents(self, documents: list, metadatas: list = None, batch_size: int = None, ids: list = None):
         """
         Add documents to the RAG system.
         
         Args:
             documents (list): List of document texts
+            metadatas (list): Optional metadata for each document (source, offset, page)
+            batch_size (int): Encoding batch size (default: RAG_EMBEDDING_BATCH_SIZE)
+            ids (list): Optional stable IDs; existing documents with the same ID are replaced
+        """
+        if not documents:
+            return
+        embeddings = self._get_real_embeddings(documents, batch_size=batch_size)
+        self.vector_store.add_documents(documents, embeddings, metadatas, ids=ids)
+    
+    def delete_documents(self, ids: list = None, source: str = None) -> int:
+        """
+        Remove documents from the RAG system by ID or by source file path.
+        
+        Args:
+            ids (list): Document IDs to remove
+            source (str): Remove every chunk that came from this file
+            
+        Returns:
+            int: Number of documents removed
         """
-        # For simplicity, we're using a dummy embedding generator
-        # In production, you should use a real embedding model like OpenAI's text-embedding-3-small
-        embeddings = [self._get_real_embedding(doc) for doc in documents]
-        self.vector_store.add_documents(documents, embeddings)
+        return self.vector_store.delete(ids=ids, source=source)
     
     def query(self, query: str) -> str:
         """
@@ -54,30 +103,104 @@ class RAGManager:
         Returns:
             str: Generated response
         """
-        # Generate dummy embedding for the query
-        query_embedding = self._get_real_embedding(query)
+        # Generate response
+        return self.generator.generate(query, self.retrieve(query))
+    
+    def query_stream(self, query: str):
+        """
+        Process a query using RAG, streaming the answer token by token.
         
-        # Retrieve relevant documents
-        context_docs = self.retriever.retrieve(query_embedding)
+        Args:
+            query (str): User query
+            
+        Yields:
+            str: Chunks of the generated response
+        """
+        yield from self.generator.generate_stream(query, self.retrieve(query))
+    
+    def retrieve(self, query: str) -> list:
+        """
+        Retrieve the chunks relevant to a query.
         
-        # Generate response
-        return self.generator.generate(query, context_docs)
+        Args:
+            query (str): User query
+            
+        Returns:
+            list: Search results with scores and metadata (used to pack the context)
+        """
+        query_embedding = self._get_real_embedding(query)
+        return self.retriever.retrieve_chunks(query_embedding)
     
-    def _get_real_embedding(self, text: str) -> list:
+    def embed_query(self, text: str) -> np.ndarray:
+        """
+        Embed a query with the local model (cached).
+        
+        Args:
+            text (str): Query text
+            
+        Returns:
+            np.ndarray: Read-only float32 embedding
+        """
+        return self._get_real_embedding(text)
+    
+    def _get_real_embedding(self, text: str) -> np.ndarray:
         """
         使用本地模型生成向量嵌入（无网络请求，完全免费）
         
+        结果按规范化后的文本缓存在 LRU 中，重复的查询不再调用模型。
+        
         Args:
             text (str): 输入文本
             
         Returns:
-            list: 向量嵌入
+            np.ndarray: 向量嵌入（float32，只读）
         """
+        cached = self.query_cache.get(text)
+        if cached is not None:
+            return cached
         try:
             # 本地生成Embedding
-            embedding = self.embedding_model.encode(text, convert_to_numpy=True).tolist()
-            return embedding
+            embedding = self.embedding_model.encode(text, convert_to_numpy=True)
+            return self.query_cache.put(text, embedding)
         except Exception as e:
             import traceback
             traceback.print_exc()
             raise RuntimeError(f"本地Embedding生成错误: {repr(e)}")
+    
+    def _get_real_embeddings(self, texts: list, batch_size: int = None) -> np.ndarray:
+        """
+        批量生成向量嵌入
+        
+        文档按 batch_size 分批送入模型；文档数量达到 RAG_EMBEDDING_POOL_MIN_DOCS
+        且 RAG_EMBEDDING_WORKERS > 1 时，使用多进程编码池在多个 CPU 核上并行编码。
+        
+        Args:
+            texts (list): 输入文本列表
+            batch_size (int): 每批文本数量（默认 RAG_EMBEDDING_BATCH_SIZE）
+            
+        Returns:
+            np.ndarray: 形状为 (len(texts), dim) 的 float32 矩阵
+        """
+        batch_size = batch_size or Config.RAG_EMBEDDING_BATCH_SIZE
+        try:
+            if Config.RAG_EMBEDDING_WORKERS > 1 and len(texts) >= Config.RAG_EMBEDDING_POOL_MIN_DOCS:
+                # 多进程池启动时每个进程都要加载模型，只在大批量导入时使用
+                pool = self.embedding_model.start_multi_process_pool(
+                    target_devices=["cpu"] * Config.RAG_EMBEDDING_WORKERS
+                )
+                try:
+                    embeddings = self.embedding_model.encode_multi_process(texts, pool, batch_size=batch_size)
+                finally:
+                    self.embedding_model.stop_multi_process_pool(pool)
+            else:
+                embeddings = self.embedding_model.encode(
+                    texts,
+                    batch_size=batch_size,
+                    convert_to_numpy=True,
+                    show_progress_bar=False
+                )
+            return np.asarray(embeddings, dtype=np.float32)
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            raise RuntimeError(f"本地Embedding批量生成错误: {repr(e)}")
@@ -17,6 +17,18 @@ class RAGRetriever:
         Returns:
             list: List of relevant documents
         """
+        return [result["document"] for result in self.retrieve_chunks(query_embedding, k=k)]
+    
+    def retrieve_chunks(self, query_embedding: any, k: int = None) -> list:
+        """
+        Retrieve relevant chunks with their scores and metadata.
+        
+        Args:
+            query_embedding: Embedding of the query
+            k: Number of chunks to retrieve
+            
+        Returns:
+            list: Search results ``{"id", "document", "metadata", "score"}``
+        """
         k = k or self.top_k
-        results = self.vector_store.similarity_search(query_embedding, k=k)
-        return [result["document"] for result in results]
+        return self.vector_store.similarity_search(query_embedding, k=k)
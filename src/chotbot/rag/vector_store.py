@@ -1,54 +1,551 @@
+import os
+import json
+import uuid
+import threading
 import numpy as np
 from typing import List, Dict, Any
+from chotbot.utils.config import Config
 
 class SimpleVectorStore:
     """
     A simple in-memory vector store for RAG.
+
+    Embeddings are kept L2-normalized in a preallocated, growable float32
+    matrix, so a query is a single matrix-vector product over a contiguous
+    block of memory and cosine similarity reduces to a dot product.
+
+    Every row has a stable ID. Deleting a row only sets its bit in a
+    tombstone bitmap that searches skip; once the dead fraction passes
+    ``compaction_threshold`` the matrix is rewritten in a background thread.
     """
-    def __init__(self):
+    # 初始容量与扩容倍数（容量按倍数增长，追加的均摊复杂度为 O(1)）
+    INITIAL_CAPACITY = 1024
+    GROWTH_FACTOR = 2
+    # 死行数达到该值且比例超过阈值时才触发压缩，避免小库频繁重写
+    COMPACTION_MIN_DEAD = 64
+
+    # 持久化文件名：原始 float32 矩阵 + 文档旁路文件 + 删除位图 + 元数据
+    MATRIX_FILE = "embeddings.f32"
+    DOCUMENTS_FILE = "documents.jsonl"
+    TOMBSTONE_FILE = "deleted.bin"
+    META_FILE = "meta.json"
+
+    def __init__(self, dim: int = None, initial_capacity: int = None, compaction_threshold: float = None):
         self.documents = []
-        self.embeddings = []
-    
-    def add_documents(self, documents: List[str], embeddings: List[np.ndarray]):
+        self.metadatas = []
+        self.ids = []
+        self.dim = dim
+        self.compaction_threshold = (
+            Config.RAG_COMPACTION_THRESHOLD if compaction_threshold is None else compaction_threshold
+        )
+        self._capacity = initial_capacity or self.INITIAL_CAPACITY
+        self._size = 0
+        self._matrix = None
+        self._deleted = np.zeros(self._capacity, dtype=bool)
+        self._deleted_count = 0
+        # ID -> 行号、来源文件 -> 行号集合（仅包含未删除的行）
+        self._id_to_row: Dict[str, int] = {}
+        self._source_rows: Dict[str, set] = {}
+        self._lock = threading.RLock()
+        self._compaction_thread = None
+        # 已写入磁盘的行数与对应目录，用于增量追加
+        self._persist_dir = None
+        self._persisted_count = 0
+        self._documents_bytes = 0
+        if dim is not None:
+            self._matrix = np.zeros((self._capacity, dim), dtype=np.float32)
+
+    @property
+    def embeddings(self) -> np.ndarray:
+        """Normalized embeddings currently stored, including tombstoned rows (a view, not a copy)."""
+        if self._matrix is None:
+            return np.zeros((0, self.dim or 0), dtype=np.float32)
+        return self._matrix[:self._size]
+
+    @property
+    def dead_fraction(self) -> float:
+        """Fraction of stored rows that are tombstoned."""
+        return self._deleted_count / self._size if self._size else 0.0
+
+    def __len__(self) -> int:
+        return self._size - self._deleted_count
+
+    def add_documents(self, documents: List[str], embeddings: List[np.ndarray],
+                      metadatas: List[Dict[str, Any]] = None, ids: List[str] = None):
         """
         Add documents and their embeddings to the vector store.
-        
+
+        Documents whose ID already exists replace the previous version.
+
         Args:
+            documents (List[str]): List of document texts
+            embeddings (List[np.ndarray]): List of embeddings (or a 2-D array)
+            metadatas (List[Dict[str, Any]]): Optional per-document metadata
+                (source file, offset, page, ...)
+            ids (List[str]): Optional stable IDs; by default derived from
+                ``source#chunk_index`` metadata, or random
+        """
+        if len(documents) == 0:
+            return
+        vectors = self._normalize(np.asarray(embeddings, dtype=np.float32))
+        if vectors.ndim != 2 or vectors.shape[0] != len(documents):
+            raise ValueError("documents and embeddings must have the same length")
+        if metadatas is not None and len(metadatas) != len(documents):
+            raise ValueError("documents and metadatas must have the same length")
+        if ids is not None and len(ids) != len(documents):
+            raise ValueError("documents and ids must have the same length")
+
+        metadatas = metadatas if metadatas is not None else [{} for _ in documents]
+        ids = ids if ids is not None else [self._make_id(metadata) for metadata in metadatas]
+
+        with self._lock:
+            start = self._size
+            self._reserve(start + vectors.shape[0], vectors.shape[1])
+            self._matrix[start:start + vectors.shape[0]] = vectors
+            self._size += vectors.shape[0]
+            self.documents.extend(documents)
+            self.metadatas.extend(metadatas)
+            self.ids.extend(ids)
+
+            replaced = []
+            for row, (doc_id, metadata) in enumerate(zip(ids, metadatas), start):
+                if doc_id in self._id_to_row:
+                    replaced.append(self._id_to_row[doc_id])
+                self._id_to_row[doc_id] = row
+                source = metadata.get("source")
+                if source is not None:
+                    self._source_rows.setdefault(source, set()).add(row)
+            if replaced:
+                self._tombstone(replaced)
+        if replaced:
+            self._maybe_schedule_compaction()
+
+    def upsert(self, ids: List[str], documents: List[str], embeddings: List[np.ndarray],
+               metadatas: List[Dict[str, Any]] = None):
+        """
+        Insert documents, replacing any existing documents with the same IDs.
+
+        Args:
+            ids (List[str]): Stable document IDs
             documents (List[str]): List of document texts
             embeddings (List[np.ndarray]): List of embeddings
+            metadatas (List[Dict[str, Any]]): Optional per-document metadata
+        """
+        self.add_documents(documents, embeddings, metadatas, ids=ids)
+
+    def delete(self, ids: List[str] = None, source: str = None) -> int:
         """
-        for doc, emb in zip(documents, embeddings):
-            self.documents.append(doc)
-            self.embeddings.append(emb)
-    
+        Tombstone documents by ID and/or by source path.
+
+        Args:
+            ids (List[str]): IDs to delete
+            source (str): Delete every document whose metadata source matches
+
+        Returns:
+            int: Number of documents deleted
+        """
+        with self._lock:
+            rows = set()
+            for doc_id in ids or []:
+                row = self._id_to_row.get(doc_id)
+                if row is not None:
+                    rows.add(row)
+            if source is not None:
+                rows.update(self._source_rows.get(source, ()))
+            self._tombstone(rows)
+        self._maybe_schedule_compaction()
+        return len(rows)
+
     def similarity_search(self, query_embedding: np.ndarray, k: int = 3) -> List[Dict[str, Any]]:
         """
         Search for the most similar documents to the query embedding.
-        
+
         Args:
             query_embedding (np.ndarray): Query embedding
             k (int): Number of results to return
-            
+
         Returns:
-            List[Dict[str, Any]]: List of results with document and score
-        """
-        if not self.embeddings:
-            return []
-        
-        # Calculate cosine similarity
-        embeddings = np.array(self.embeddings)
-        similarities = np.dot(embeddings, query_embedding) / (
-            np.linalg.norm(embeddings, axis=1) * np.linalg.norm(query_embedding)
-        )
-        
-        # Get top k results
-        top_indices = similarities.argsort()[::-1][:k]
-        
-        results = []
-        for idx in top_indices:
-            results.append({
-                "document": self.documents[idx],
-                "score": float(similarities[idx])
-            })
-        
-        return results
+            List[Dict[str, Any]]: List of results with id, document, metadata and score
+        """
+        with self._lock:
+            if len(self) == 0 or k <= 0:
+                return []
+
+            query = self._normalize(np.asarray(query_embedding, dtype=np.float32).reshape(1, -1))[0]
+            similarities = self.embeddings @ query
+            if self._deleted_count:
+                similarities[self._deleted[:self._size]] = -np.inf
+            top_indices = self._top_k(similarities, min(k, len(self)))
+
+            return [self._result(idx, similarities[idx]) for idx in top_indices]
+
+    def compact(self):
+        """
+        Drop tombstoned rows and rewrite the matrix.
+
+        The new matrix is built outside the lock from a snapshot; rows added or
+        deleted meanwhile are reconciled when the result is swapped in.
+        """
+        with self._lock:
+            snapshot_size = self._size
+            if self._deleted_count == 0:
+                return
+            matrix = self._matrix
+            documents, metadatas, ids = self.documents, self.metadatas, self.ids
+            keep = np.flatnonzero(~self._deleted[:snapshot_size])
+
+        # 在锁外复制存活行：已有行只会被追加，不会被原地修改
+        kept_matrix = matrix[keep]
+        kept_documents = [documents[i] for i in keep]
+        kept_metadatas = [metadatas[i] for i in keep]
+        kept_ids = [ids[i] for i in keep]
+
+        with self._lock:
+            # 压缩期间新增的行原样追加到末尾
+            tail = np.arange(snapshot_size, self._size)
+            old_rows = np.concatenate([keep, tail])
+            new_size = old_rows.shape[0]
+            new_capacity = max(self.INITIAL_CAPACITY, new_size * self.GROWTH_FACTOR)
+
+            new_matrix = np.zeros((new_capacity, self.dim), dtype=np.float32)
+            new_matrix[:keep.shape[0]] = kept_matrix
+            new_matrix[keep.shape[0]:new_size] = self._matrix[snapshot_size:self._size]
+            new_deleted = np.zeros(new_capacity, dtype=bool)
+            # 压缩期间被删除的行保留为墓碑
+            new_deleted[:new_size] = self._deleted[old_rows]
+
+            old_to_new = np.full(self._size, -1, dtype=np.int64)
+            old_to_new[old_rows] = np.arange(new_size)
+
+            self._matrix = new_matrix
+            self._capacity = new_capacity
+            self._size = new_size
+            self._deleted = new_deleted
+            self._deleted_count = int(new_deleted.sum())
+            self.documents = kept_documents + self.documents[snapshot_size:]
+            self.metadatas = kept_metadatas + self.metadatas[snapshot_size:]
+            self.ids = kept_ids + self.ids[snapshot_size:]
+            self._id_to_row = {doc_id: int(old_to_new[row]) for doc_id, row in self._id_to_row.items()}
+            self._source_rows = {
+                source: {int(old_to_new[row]) for row in rows}
+                for source, rows in self._source_rows.items() if rows
+            }
+            # 行号已改变，下次保存时整体重写磁盘文件
+            self._persisted_count = 0
+            self._documents_bytes = 0
+            self._remap_rows(old_to_new)
+
+    def wait_for_compaction(self, timeout: float = None):
+        """
+        Block until a running background compaction has finished.
+        """
+        thread = self._compaction_thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def save(self, directory: str):
+        """
+        Persist the store to ``directory``.
+
+        Rows already written by a previous ``save``/``load`` on the same
+        directory are kept; only new rows and documents are appended. After a
+        compaction (or on the first save) the files are rewritten and swapped
+        in with ``os.replace``. The metadata file is replaced atomically last,
+        so a crash mid-write leaves the previous snapshot readable.
+
+        Args:
+            directory (str): Target directory (created if missing)
+        """
+        os.makedirs(directory, exist_ok=True)
+        directory = os.path.abspath(directory)
+        matrix_path = os.path.join(directory, self.MATRIX_FILE)
+        documents_path = os.path.join(directory, self.DOCUMENTS_FILE)
+
+        with self._lock:
+            if self._persist_dir != directory:
+                self._persisted_count = 0
+                self._documents_bytes = 0
+
+            start = self._persisted_count
+            if start == 0:
+                # 全量重写：写入临时文件后替换，已映射旧文件的读者不受影响
+                self._write_rows(matrix_path + ".tmp", documents_path + ".tmp", 0, 0)
+                os.replace(matrix_path + ".tmp", matrix_path)
+                os.replace(documents_path + ".tmp", documents_path)
+            elif self._size > start:
+                self._write_rows(matrix_path, documents_path, start, self._documents_bytes)
+
+            tombstone_path = os.path.join(directory, self.TOMBSTONE_FILE)
+            with open(tombstone_path + ".tmp", "wb") as f:
+                f.write(np.packbits(self._deleted[:self._size]).tobytes())
+            os.replace(tombstone_path + ".tmp", tombstone_path)
+            self._save_index(directory)
+
+            meta = {
+                "version": 2,
+                "dim": self.dim,
+                "count": self._size,
+                "deleted_count": self._deleted_count,
+                "dtype": "float32",
+                "documents_bytes": self._documents_bytes,
+                "index_type": type(self).__name__
+            }
+            tmp_path = os.path.join(directory, self.META_FILE + ".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+            os.replace(tmp_path, os.path.join(directory, self.META_FILE))
+
+            self._persist_dir = directory
+            self._persisted_count = self._size
+
+    def load(self, directory: str) -> bool:
+        """
+        Reopen a store written by ``save``.
+
+        The embedding matrix is memory-mapped read-only, so opening is cheap
+        regardless of corpus size; it is copied into memory only when new
+        documents are appended. ANN stores restore their saved index instead
+        of rebuilding it.
+
+        Args:
+            directory (str): Directory previously passed to ``save``
+
+        Returns:
+            bool: False if no saved store exists in ``directory``
+        """
+        directory = os.path.abspath(directory)
+        meta_path = os.path.join(directory, self.META_FILE)
+        if not os.path.exists(meta_path):
+            return False
+
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        count, dim = meta["count"], meta["dim"]
+
+        documents, metadatas, ids = [], [], []
+        with open(os.path.join(directory, self.DOCUMENTS_FILE), "rb") as f:
+            data = f.read(meta["documents_bytes"])
+        for line in data.splitlines()[:count]:
+            doc_id, document, metadata = self._decode_record(line)
+            documents.append(document)
+            metadatas.append(metadata)
+            ids.append(doc_id or self._make_id(metadata))
+
+        deleted = np.zeros(max(count, 1), dtype=bool)
+        tombstone_path = os.path.join(directory, self.TOMBSTONE_FILE)
+        if os.path.exists(tombstone_path):
+            with open(tombstone_path, "rb") as f:
+                bits = np.frombuffer(f.read(), dtype=np.uint8)
+            deleted[:count] = np.unpackbits(bits, count=count).astype(bool)
+
+        if count:
+            matrix = np.memmap(os.path.join(directory, self.MATRIX_FILE),
+                               dtype=np.float32, mode="r", shape=(count, dim))
+        else:
+            matrix = None
+
+        with self._lock:
+            self.documents = documents
+            self.metadatas = metadatas
+            self.ids = ids
+            self.dim = dim
+            self._matrix = matrix
+            self._size = count
+            self._capacity = count or self._capacity
+            self._deleted = deleted
+            self._deleted_count = int(deleted[:count].sum())
+            self._id_to_row = {}
+            self._source_rows = {}
+            for row, (doc_id, metadata) in enumerate(zip(ids, metadatas)):
+                if deleted[row]:
+                    continue
+                self._id_to_row[doc_id] = row
+                source = metadata.get("source")
+                if source is not None:
+                    self._source_rows.setdefault(source, set()).add(row)
+            self._persist_dir = directory
+            self._persisted_count = count
+            self._documents_bytes = meta["documents_bytes"]
+            if not self._load_index(directory):
+                self._rebuild_index()
+        return True
+
+    def _write_rows(self, matrix_path: str, documents_path: str, start: int, documents_bytes: int):
+        """Append rows ``start:`` to the matrix and documents files (fsync'd)."""
+        with open(matrix_path, "ab") as f:
+            # 截掉上次崩溃可能遗留的未提交数据
+            f.truncate(start * self.dim * 4)
+            f.write(np.ascontiguousarray(self.embeddings[start:], dtype=np.float32).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+
+        with open(documents_path, "ab") as f:
+            f.truncate(documents_bytes)
+            for row in range(start, self._size):
+                f.write(self._encode_record(self.ids[row], self.documents[row], self.metadatas[row]))
+            f.flush()
+            os.fsync(f.fileno())
+            self._documents_bytes = f.tell()
+
+    def _tombstone(self, rows):
+        """Mark rows as deleted and drop them from the ID/source lookups (lock held)."""
+        for row in rows:
+            if self._deleted[row]:
+                continue
+            self._deleted[row] = True
+            self._deleted_count += 1
+            doc_id = self.ids[row]
+            if self._id_to_row.get(doc_id) == row:
+                del self._id_to_row[doc_id]
+            source = self.metadatas[row].get("source")
+            if source is not None and source in self._source_rows:
+                self._source_rows[source].discard(row)
+                if not self._source_rows[source]:
+                    del self._source_rows[source]
+
+    def _maybe_schedule_compaction(self):
+        with self._lock:
+            if self._deleted_count < self.COMPACTION_MIN_DEAD or self.dead_fraction < self.compaction_threshold:
+                return
+            if self._compaction_thread is not None and self._compaction_thread.is_alive():
+                return
+            self._compaction_thread = threading.Thread(target=self.compact, name="vector-store-compaction", daemon=True)
+            self._compaction_thread.start()
+
+    def _save_index(self, directory: str):
+        """
+        Hook for subclasses to persist auxiliary index structures in ``save``
+        (lock held). It runs before the metadata file is replaced.
+        """
+        pass
+
+    def _load_index(self, directory: str) -> bool:
+        """
+        Hook for subclasses to restore index structures written by
+        ``_save_index`` during ``load`` (lock held).
+
+        Returns:
+            bool: False if nothing usable was found; ``_rebuild_index`` then runs
+        """
+        return False
+
+    def _rebuild_index(self):
+        """
+        Hook for subclasses to rebuild auxiliary index structures after
+        ``load`` when no saved index could be restored.
+        """
+        pass
+
+    def _remap_rows(self, old_to_new: np.ndarray):
+        """
+        Hook for subclasses to renumber auxiliary index structures after
+        ``compact``; ``old_to_new[row]`` is -1 for dropped rows.
+        """
+        pass
+
+    def _result(self, idx: int, score: float) -> Dict[str, Any]:
+        return {
+            "id": self.ids[idx],
+            "document": self.documents[idx],
+            "metadata": self.metadatas[idx],
+            "score": float(score)
+        }
+
+    @staticmethod
+    def _make_id(metadata: Dict[str, Any]) -> str:
+        # 来自文件的片段使用 “来源#序号” 作为稳定 ID，重新导入同一文件时 ID 不变
+        if metadata.get("source") is not None and metadata.get("chunk_index") is not None:
+            return f"{metadata['source']}#{metadata['chunk_index']}"
+        return uuid.uuid4().hex
+
+    @staticmethod
+    def _encode_record(doc_id: str, document: str, metadata: Dict[str, Any]) -> bytes:
+        record = {"id": doc_id, "document": document, "metadata": metadata}
+        return (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+
+    @staticmethod
+    def _decode_record(line: bytes) -> tuple:
+        record = json.loads(line)
+        return record.get("id"), record["document"], record.get("metadata", {})
+
+    def _reserve(self, required: int, dim: int):
+        """
+        Make sure the matrix can hold ``required`` rows, growing geometrically.
+        """
+        if self.dim is None:
+            self.dim = dim
+        elif dim != self.dim:
+            raise ValueError(f"Embedding dimension mismatch: expected {self.dim}, got {dim}")
+
+        if self._matrix is None:
+            self._capacity = max(self._capacity, required)
+            self._matrix = np.zeros((self._capacity, self.dim), dtype=np.float32)
+            self._grow_tombstones(self._capacity)
+            return
+
+        if required <= self._capacity:
+            return
+
+        new_capacity = self._capacity
+        while new_capacity < required:
+            new_capacity *= self.GROWTH_FACTOR
+        grown = np.zeros((new_capacity, self.dim), dtype=np.float32)
+        grown[:self._size] = self._matrix[:self._size]
+        self._matrix = grown
+        self._capacity = new_capacity
+        self._grow_tombstones(new_capacity)
+
+    def _grow_tombstones(self, capacity: int):
+        if self._deleted.shape[0] < capacity:
+            grown = np.zeros(capacity, dtype=bool)
+            grown[:self._deleted.shape[0]] = self._deleted
+            self._deleted = grown
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        """
+        L2-normalize vectors row-wise; zero vectors are left as zeros.
+        """
+        if vectors.ndim == 1:
+            vectors = vectors.reshape(1, -1)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    @staticmethod
+    def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+        """
+        Indices of the ``k`` highest scores in descending order.
+
+        Uses ``np.argpartition`` (O(N)) and only sorts the selected ``k``.
+        """
+        k = min(k, scores.shape[0])
+        if k == scores.shape[0]:
+            candidates = np.arange(k)
+        else:
+            candidates = np.argpartition(-scores, k - 1)[:k]
+        return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+def create_vector_store(index_type: str = None, **kwargs) -> SimpleVectorStore:
+    """
+    Build the vector store selected by ``Config.RAG_VECTOR_INDEX``.
+
+    Args:
+        index_type (str): "flat" (exact), "ivf" or "hnsw"; defaults to config
+        **kwargs: Extra arguments for the store constructor
+
+    Returns:
+        SimpleVectorStore: The configured store
+    """
+    index_type = (index_type or Config.RAG_VECTOR_INDEX).lower()
+    if index_type == "flat":
+        return SimpleVectorStore(**kwargs)
+
+    from chotbot.rag.ann_index import IVFFlatVectorStore, HNSWVectorStore
+
+    if index_type == "ivf":
+        return IVFFlatVectorStore(**kwargs)
+    if index_type == "hnsw":
+        return HNSWVectorStore(**kwargs)
+    raise ValueError(f"Unknown vector index type: {index_type}")
@@ -0,0 +1,262 @@
+"""
+通用 TTL 缓存：按条目过期、LRU 淘汰，合并并发的相同请求（single-flight），
+可在过期后短时间内先返回旧值并在后台刷新（stale-while-revalidate），可持久化到磁盘
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+_FRESH = "fresh"
+_STALE = "stale"
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries expire after a TTL.
+
+    ``get_or_load`` coalesces concurrent misses for the same key: the first
+    caller runs the loader and every other caller waits for and shares its
+    result (or exception). Exceptions are never cached.
+
+    With ``stale_ttl`` an expired entry is kept that much longer; during that
+    window ``get_or_load`` returns it immediately and refreshes it on a
+    background thread. With ``persist_path`` (JSON; keys and values must be
+    JSON serializable, tuple keys are restored as tuples) ``load`` and
+    ``save`` keep the entries and their remaining lifetime across restarts.
+    """
+
+    def __init__(self, ttl: float, max_entries: int = 256, clock: Callable[[], float] = time.monotonic,
+                 stale_ttl: float = 0, persist_path: str = None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self.stale_ttl = stale_ttl
+        self.persist_path = persist_path
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._inflight: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+        self._refresher = None
+        self._stats = {"hits": 0, "stale_hits": 0, "misses": 0, "coalesced": 0,
+                       "refreshes": 0, "refresh_errors": 0, "evictions": 0, "expirations": 0}
+        if persist_path:
+            self.load(persist_path)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Look up a fresh entry, marking it most recently used.
+
+        Args:
+            key: Cache key
+            default: Returned on a miss
+
+        Returns:
+            Any: The cached value or ``default``
+        """
+        with self._lock:
+            state, value = self._lookup(key)
+            found = state == _FRESH
+            self._stats["hits" if found else "misses"] += 1
+            return value if found else default
+
+    def put(self, key: Hashable, value: Any, ttl: Union[float, Callable[[Any], float]] = None):
+        """
+        Store a value, evicting the least recently used entries over ``max_entries``.
+
+        Args:
+            key: Cache key
+            value: Value to cache
+            ttl: Override the default TTL in seconds, or a function of the
+                value returning it; a TTL <= 0 means the value is not cached
+        """
+        ttl = self.ttl if ttl is None else ttl
+        if callable(ttl):
+            ttl = ttl(value)
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (value, self.clock() + ttl)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any],
+                    ttl: Union[float, Callable[[Any], float]] = None) -> Any:
+        """
+        Return the cached value or load it, sharing one load among concurrent callers.
+
+        A stale entry (within ``stale_ttl`` after expiry) is returned at once
+        while a background refresh runs.
+
+        Args:
+            key: Cache key
+            loader: Called without arguments on a miss; its result is cached
+            ttl: Override the default TTL, see ``put``
+
+        Returns:
+            Any: The cached or freshly loaded value
+
+        Raises:
+            Exception: Whatever the loader raised
+        """
+        with self._lock:
+            state, value = self._lookup(key)
+            if state == _FRESH:
+                self._stats["hits"] += 1
+                return value
+            future = self._inflight.get(key)
+            if state == _STALE:
+                self._stats["stale_hits"] += 1
+                if future is None:
+                    future = self._inflight[key] = Future()
+                    self._stats["refreshes"] += 1
+                    self._refresh_executor().submit(self._refresh, key, loader, ttl, future)
+                return value
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+                self._stats["misses"] += 1
+            else:
+                self._stats["coalesced"] += 1
+
+        if not leader:
+            return future.result()
+        return self._load(key, loader, ttl, future)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache statistics.
+
+        Returns:
+            Dict[str, Any]: Entry count, counters and ``hit_rate`` (share of
+            lookups served without waiting for the loader, coalesced and
+            stale ones included)
+        """
+        with self._lock:
+            served = self._stats["hits"] + self._stats["stale_hits"] + self._stats["coalesced"]
+            total = served + self._stats["misses"]
+            return {
+                "entries": len(self._entries),
+                **self._stats,
+                "hit_rate": served / total if total else 0.0
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def save(self, path: str = None):
+        """
+        Write the unexpired (including stale) entries to a JSON file.
+
+        Args:
+            path (str): Target file, defaults to ``persist_path``
+        """
+        path = path or self.persist_path
+        if not path:
+            return
+        now, wall = self.clock(), time.time()
+        with self._lock:
+            entries = [[key, value, wall + expires_at - now]
+                       for key, (value, expires_at) in self._entries.items()
+                       if expires_at + self.stale_ttl > now]
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"entries": entries}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def load(self, path: str = None) -> int:
+        """
+        Load entries written by ``save``, skipping those that are past their stale window.
+
+        Args:
+            path (str): Source file, defaults to ``persist_path``
+
+        Returns:
+            int: Number of entries loaded
+        """
+        path = path or self.persist_path
+        if not path or not os.path.exists(path):
+            return 0
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entries = json.load(f)["entries"]
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Failed to load cache from {path}: {e}")
+            return 0
+        now, wall = self.clock(), time.time()
+        loaded = 0
+        with self._lock:
+            for key, value, expires_wall in entries:
+                expires_at = now + expires_wall - wall
+                if expires_at + self.stale_ttl <= now:
+                    continue
+                self._entries[tuple(key) if isinstance(key, list) else key] = (value, expires_at)
+                loaded += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return loaded
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def _load(self, key: Hashable, loader: Callable[[], Any], ttl, future: Future) -> Any:
+        try:
+            value = loader()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            self.put(key, value, ttl)
+            future.set_result(value)
+            return value
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _refresh(self, key: Hashable, loader: Callable[[], Any], ttl, future: Future):
+        try:
+            self._load(key, loader, ttl, future)
+        except Exception as e:
+            # 刷新失败时保留旧值，直到其超出过期宽限期
+            with self._lock:
+                self._stats["refresh_errors"] += 1
+            logger.warning(f"Background refresh failed for {key!r}: {e}")
+
+    def _refresh_executor(self) -> ThreadPoolExecutor:
+        """Lazily created pool for background refreshes. Caller holds the lock."""
+        if self._refresher is None:
+            self._refresher = ThreadPoolExecutor(max_workers=2, thread_name_prefix="cache-refresh")
+        return self._refresher
+
+    def _lookup(self, key: Hashable) -> tuple:
+        """
+        (state, value) of an entry: ``fresh``, ``stale`` (expired but within
+        ``stale_ttl``) or None; drops entries past their stale window.
+        Caller holds the lock.
+        """
+        entry: Optional[tuple] = self._entries.get(key)
+        if entry is None:
+            return None, None
+        value, expires_at = entry
+        now = self.clock()
+        if expires_at > now:
+            self._entries.move_to_end(key)
+            return _FRESH, value
+        if expires_at + self.stale_ttl > now:
+            return _STALE, value
+        del self._entries[key]
+        self._stats["expirations"] += 1
+        return None, None
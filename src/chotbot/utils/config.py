@@ -11,6 +11,31 @@ class Config:
     MODEL_NAME = os.getenv("MODEL_NAME", "gpt-3.5-turbo")
     TEMPERATURE = float(os.getenv("TEMPERATURE", "0.7"))
     
+    # LLM Connection Pool Configuration (shared by all LLMClient instances)
+    LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "100"))
+    LLM_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "20"))
+    LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "30"))  # 空闲连接保活秒数
+    LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))  # 同时进行的 LLM 请求上限
+    LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+    
+    # ReAct Agent Configuration
+    REACT_STREAM_TOKENS = os.getenv("REACT_STREAM_TOKENS", "true").lower() == "true"  # 每轮以流式请求，实时推送 token
+    REACT_PLAN_MODE = os.getenv("REACT_PLAN_MODE", "parallel")  # parallel: 计划与第一轮行动并行；blocking: 先生成计划；off: 不生成
+    REACT_PLAN_SKIP_INTENTS = [intent.strip() for intent in os.getenv("REACT_PLAN_SKIP_INTENTS", "weather,fund,stock").split(",") if intent.strip()]  # 这些快速意图不生成计划
+    
+    # Tool Execution Configuration
+    TOOL_MAX_WORKERS = int(os.getenv("TOOL_MAX_WORKERS", "8"))  # 工具调用共享线程池的线程数
+    TOOL_MAX_WORKERS_PER_REQUEST = int(os.getenv("TOOL_MAX_WORKERS_PER_REQUEST", "4"))  # 一轮工具调用最多同时占用的线程数（含超时后仍在运行的调用）
+    TOOL_QUEUE_TIMEOUT = float(os.getenv("TOOL_QUEUE_TIMEOUT", "30"))  # 工具调用等待空闲线程的最长时间（秒）
+    TOOL_TIMEOUT = float(os.getenv("TOOL_TIMEOUT", "20"))  # 单个工具调用的默认超时（秒）
+    TOOL_TIMEOUT_SEARCH = float(os.getenv("TOOL_TIMEOUT_SEARCH", "15"))
+    SEARCH_TIMEOUT = float(os.getenv("SEARCH_TIMEOUT", "20"))  # DuckDuckGo 单次请求超时（秒）
+    SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", "300"))  # 搜索结果缓存时间（秒），0 关闭缓存
+    SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", "256"))
+    
+    # Backend Configuration
+    BACKEND_THREADPOOL_SIZE = int(os.getenv("BACKEND_THREADPOOL_SIZE", "32"))  # 运行同步 ReAct 循环的线程数
+    
     # Deepseek Embedding Configuration
     DEEPSEEK_API_KEY = os.getenv("DEEPSEEK_API_KEY")
     DEEPSEEK_BASE_URL = os.getenv("DEEPSEEK_BASE_URL", "https://api.deepseek.com/v1")
@@ -20,20 +45,93 @@ class Config:
     RAG_TOP_K = int(os.getenv("RAG_TOP_K", "3"))
     RAG_CHUNK_SIZE = int(os.getenv("RAG_CHUNK_SIZE", "1000"))
     RAG_CHUNK_OVERLAP = int(os.getenv("RAG_CHUNK_OVERLAP", "100"))
+    RAG_CHUNK_MODE = os.getenv("RAG_CHUNK_MODE", "sentence")  # character, sentence, token
+    RAG_LOADER_WORKERS = int(os.getenv("RAG_LOADER_WORKERS", "0"))  # 0 表示使用全部 CPU 核
+    RAG_CONTEXT_TOKEN_BUDGET = int(os.getenv("RAG_CONTEXT_TOKEN_BUDGET", "2000"))  # 拼入提示词的检索上下文最多 token 数
+    RAG_CONTEXT_MIN_TRUNCATED_TOKENS = int(os.getenv("RAG_CONTEXT_MIN_TRUNCATED_TOKENS", "64"))  # 剩余预算不少于该值时截断片段填充
+    
+    # RAG Vector Index Configuration
+    RAG_VECTOR_INDEX = os.getenv("RAG_VECTOR_INDEX", "flat")  # flat, ivf, hnsw
+    RAG_IVF_NLIST = int(os.getenv("RAG_IVF_NLIST", "256"))
+    RAG_IVF_NPROBE = int(os.getenv("RAG_IVF_NPROBE", "8"))
+    RAG_HNSW_M = int(os.getenv("RAG_HNSW_M", "16"))
+    RAG_HNSW_EF_CONSTRUCTION = int(os.getenv("RAG_HNSW_EF_CONSTRUCTION", "100"))
+    RAG_HNSW_EF_SEARCH = int(os.getenv("RAG_HNSW_EF_SEARCH", "50"))
+    RAG_PERSIST_INDEX = os.getenv("RAG_PERSIST_INDEX", "true").lower() == "true"
+    RAG_COMPACTION_THRESHOLD = float(os.getenv("RAG_COMPACTION_THRESHOLD", "0.2"))  # 已删除行占比超过该值时后台压缩
+    
+    # RAG Embedding Configuration
+    RAG_EMBEDDING_BATCH_SIZE = int(os.getenv("RAG_EMBEDDING_BATCH_SIZE", "64"))
+    RAG_EMBEDDING_WORKERS = int(os.getenv("RAG_EMBEDDING_WORKERS", "1"))  # >1 启用多进程编码
+    RAG_EMBEDDING_POOL_MIN_DOCS = int(os.getenv("RAG_EMBEDDING_POOL_MIN_DOCS", "2000"))
+    
+    # RAG Query Embedding Cache Configuration
+    RAG_QUERY_CACHE_SIZE = int(os.getenv("RAG_QUERY_CACHE_SIZE", "1024"))
+    RAG_QUERY_CACHE_MAX_MB = int(os.getenv("RAG_QUERY_CACHE_MAX_MB", "64"))
+    RAG_QUERY_CACHE_PATH = os.getenv("RAG_QUERY_CACHE_PATH", "")  # 为空时不落盘
+    
+    # Semantic Response Cache Configuration
+    RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+    RESPONSE_CACHE_THRESHOLD = float(os.getenv("RESPONSE_CACHE_THRESHOLD", "0.92"))  # 余弦相似度阈值
+    RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "512"))
+    RESPONSE_CACHE_STREAM_CHUNK = int(os.getenv("RESPONSE_CACHE_STREAM_CHUNK", "0"))  # >0 时按该字符数分片流式返回缓存答案
+    # 各意图的有效期（秒），0 表示不缓存
+    RESPONSE_CACHE_TTL_WEATHER = int(os.getenv("RESPONSE_CACHE_TTL_WEATHER", "600"))
+    RESPONSE_CACHE_TTL_FUND = int(os.getenv("RESPONSE_CACHE_TTL_FUND", "1800"))
+    RESPONSE_CACHE_TTL_STOCK = int(os.getenv("RESPONSE_CACHE_TTL_STOCK", "60"))
+    RESPONSE_CACHE_TTL_NEWS = int(os.getenv("RESPONSE_CACHE_TTL_NEWS", "900"))
+    RESPONSE_CACHE_TTL_DOCS = int(os.getenv("RESPONSE_CACHE_TTL_DOCS", "86400"))
+    RESPONSE_CACHE_TTL_GENERAL = int(os.getenv("RESPONSE_CACHE_TTL_GENERAL", "3600"))
+    
+    # Tokenizer Configuration (tiktoken encoding; falls back to an estimate if unavailable)
+    TOKENIZER_ENCODING = os.getenv("TOKENIZER_ENCODING", "cl100k_base")
     
     # MCP Configuration
     MCP_MAX_CONTEXT_SIZE = int(os.getenv("MCP_MAX_CONTEXT_SIZE", "4096"))
     MCP_HISTORY_LIMIT = int(os.getenv("MCP_HISTORY_LIMIT", "10"))
     
+    # Session Configuration (per-session conversation context)
+    SESSION_MAX_SESSIONS = int(os.getenv("SESSION_MAX_SESSIONS", "5000"))  # 内存中最多保留的会话数，超出时淘汰最久未使用的
+    SESSION_IDLE_TTL = float(os.getenv("SESSION_IDLE_TTL", "1800"))  # 空闲超过该时间（秒）的会话被淘汰，0 表示不按空闲时间淘汰
+    SESSION_MAX_MESSAGES = int(os.getenv("SESSION_MAX_MESSAGES", "200"))  # 每个会话最多保留的消息数
+    SESSION_SPILL_DIR = os.getenv("SESSION_SPILL_DIR", "")  # 非空时淘汰的会话写入该目录，再次访问时恢复
+    
+    # Conversation Log Configuration (ReAct 对话记录，按用户索引)
+    CONVERSATION_LOG_DIR = os.getenv("CONVERSATION_LOG_DIR", "history")  # 分段日志目录
+    CONVERSATION_LOG_SEGMENT_BYTES = int(os.getenv("CONVERSATION_LOG_SEGMENT_BYTES", str(64 * 1024 * 1024)))  # 单个分段文件达到该大小后封存并新建分段
+    CONVERSATION_LOG_FSYNC_INTERVAL = float(os.getenv("CONVERSATION_LOG_FSYNC_INTERVAL", "1"))  # 两次 fsync 的最小间隔（秒），0 表示每批写入后都 fsync
+    
     # MCP History Compression Configuration
     MCP_COMPRESSION_ENABLED = os.getenv("MCP_COMPRESSION_ENABLED", "true").lower() == "true"
     MCP_COMPRESSION_THRESHOLD = int(os.getenv("MCP_COMPRESSION_THRESHOLD", "15"))
-    MCP_COMPRESSION_STRATEGY = os.getenv("MCP_COMPRESSION_STRATEGY", "summary")  # summary, extract_key_info, hybrid
+    MCP_COMPRESSION_STRATEGY = os.getenv("MCP_COMPRESSION_STRATEGY", "summary")  # summary, extract_key_info, hybrid, rolling
+    MCP_COMPRESSION_ASYNC = os.getenv("MCP_COMPRESSION_ASYNC", "true").lower() == "true"  # 在后台线程压缩，不阻塞当前轮次
+    MCP_COMPRESSION_WORKERS = int(os.getenv("MCP_COMPRESSION_WORKERS", "2"))  # 后台压缩线程数（所有会话共用）
     
     # Weather API Configuration
     WEATHER_API_KEY = os.getenv("WEATHER_API_KEY")
     WEATHER_API_BASE_URL = "https://api.openweathermap.org/data/2.5/weather"
     WEATHER_API_LANGUAGE = "zh_cn"
+    WEATHER_CACHE_TTL = float(os.getenv("WEATHER_CACHE_TTL", "600"))  # 天气结果缓存时间（秒），0 关闭缓存
     
     # Fund API Configuration
     FUND_API_BASE_URL = "https://api.mfapi.cn/"
+    FUND_CACHE_TTL = float(os.getenv("FUND_CACHE_TTL", "3600"))  # 未指定有效期的基金接口的缓存时间（秒）
+    FUND_NAV_UPDATE_TIME = os.getenv("FUND_NAV_UPDATE_TIME", "21:00")  # 每个交易日净值发布时间（北京时间），净值缓存到此刻
+    FUND_BATCH_WORKERS = int(os.getenv("FUND_BATCH_WORKERS", "8"))  # 批量查询基金时的并发请求数
+    
+    # Tool Result Cache Configuration (weather / fund)
+    TOOL_CACHE_SIZE = int(os.getenv("TOOL_CACHE_SIZE", "512"))
+    TOOL_CACHE_STALE_TTL = float(os.getenv("TOOL_CACHE_STALE_TTL", "1800"))  # 过期后仍可先返回旧结果并后台刷新的时间（秒）
+    TOOL_CACHE_DIR = os.getenv("TOOL_CACHE_DIR", "")  # 非空时缓存在退出时保存到该目录，启动时加载
+    
+    # Upstream HTTP Configuration (weather / fund APIs)
+    HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3.05"))
+    HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "10"))
+    HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "2"))  # 连接失败、超时、429/5xx 的重试次数
+    HTTP_BACKOFF_BASE = float(os.getenv("HTTP_BACKOFF_BASE", "0.5"))  # 第 n 次重试前等待 base * 2^n 秒
+    HTTP_BACKOFF_MAX = float(os.getenv("HTTP_BACKOFF_MAX", "4"))
+    HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "10"))  # 缓存连接池的主机数
+    HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "20"))  # 每个主机保持的连接数
+    HTTP_BREAKER_FAILURES = int(os.getenv("HTTP_BREAKER_FAILURES", "5"))  # 连续失败多少次后熔断
+    HTTP_BREAKER_RESET_TIMEOUT = float(os.getenv("HTTP_BREAKER_RESET_TIMEOUT", "30"))  # 熔断后多久放行一次试探请求（秒）
@@ -0,0 +1,168 @@
+"""
+外部 HTTP 接口访问：共享连接池、连接/读取超时、有上限的指数退避重试与熔断
+"""
+
+import time
+import random
+import logging
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from typing import Callable, Dict, Any
+from chotbot.utils.config import Config
+
+logger = logging.getLogger(__name__)
+
+# 这些状态码说明上游暂时不可用，值得重试
+RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def shared_session() -> requests.Session:
+    """The process-wide pooled session (keep-alive connections are reused across tools)."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            adapter = HTTPAdapter(pool_connections=Config.HTTP_POOL_CONNECTIONS, pool_maxsize=Config.HTTP_POOL_MAXSIZE)
+            _session = requests.Session()
+            _session.mount("http://", adapter)
+            _session.mount("https://", adapter)
+        return _session
+
+
+class CircuitOpenError(requests.RequestException):
+    """Raised without contacting the upstream while its circuit is open."""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    After ``failure_threshold`` failures in a row the circuit opens and calls
+    fail fast for ``reset_timeout`` seconds. Then one trial call is let through
+    (half-open): success closes the circuit, failure opens it again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = None, reset_timeout: float = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold or Config.HTTP_BREAKER_FAILURES
+        self.reset_timeout = Config.HTTP_BREAKER_RESET_TIMEOUT if reset_timeout is None else reset_timeout
+        self.clock = clock
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and self.clock() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        """Whether a call may go upstream now; claims the trial call when half-open."""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN and self.clock() - self._opened_at >= self.reset_timeout:
+                self._state = self.HALF_OPEN
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = self.clock()
+
+
+class HTTPClient:
+    """
+    GET requests to one upstream service over the shared session.
+
+    Connection errors, timeouts and ``RETRY_STATUS_CODES`` are retried up to
+    ``max_retries`` times with exponential backoff (jittered, capped at
+    ``backoff_max``); other HTTP errors are returned to the caller at once.
+    Each failed call counts towards the service's circuit breaker.
+    """
+
+    def __init__(self, name: str, timeout: tuple = None, max_retries: int = None,
+                 backoff_base: float = None, backoff_max: float = None,
+                 breaker: CircuitBreaker = None, session: requests.Session = None):
+        self.name = name
+        self.timeout = timeout or (Config.HTTP_CONNECT_TIMEOUT, Config.HTTP_READ_TIMEOUT)
+        self.max_retries = Config.HTTP_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff_base = Config.HTTP_BACKOFF_BASE if backoff_base is None else backoff_base
+        self.backoff_max = Config.HTTP_BACKOFF_MAX if backoff_max is None else backoff_max
+        self.breaker = breaker or CircuitBreaker()
+        self.session = session or shared_session()
+        self._stats = {"requests": 0, "retries": 0, "failures": 0, "rejected": 0}
+        self._stats_lock = threading.Lock()
+
+    def get(self, url: str, params: Dict[str, Any] = None) -> requests.Response:
+        """
+        Send a GET request with timeouts, retries and circuit breaking.
+
+        Args:
+            url (str): Request URL
+            params (dict): Query parameters
+
+        Returns:
+            requests.Response: A successful (2xx/3xx) response
+
+        Raises:
+            CircuitOpenError: The circuit is open
+            requests.RequestException: The request failed after all retries
+        """
+        if not self.breaker.allow():
+            self._count("rejected")
+            raise CircuitOpenError(f"{self.name} 服务暂时不可用（熔断中），请稍后再试")
+
+        for attempt in range(self.max_retries + 1):
+            self._count("requests")
+            try:
+                response = self.session.get(url, params=params, timeout=self.timeout)
+                if response.status_code not in RETRY_STATUS_CODES:
+                    response.raise_for_status()
+                    self.breaker.record_success()
+                    return response
+                error = requests.HTTPError(f"{response.status_code} Server Error for url: {response.url}", response=response)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+            except requests.HTTPError:
+                # 4xx 是请求本身的问题，不重试，也不说明上游故障
+                self.breaker.record_success()
+                raise
+
+            if attempt == self.max_retries:
+                break
+            delay = min(self.backoff_max, self.backoff_base * 2 ** attempt) * random.uniform(0.5, 1.0)
+            logger.warning(f"{self.name} request failed ({error}), retrying in {delay:.2f}s")
+            self._count("retries")
+            time.sleep(delay)
+
+        self._count("failures")
+        self.breaker.record_failure()
+        raise error
+
+    def stats(self) -> Dict[str, Any]:
+        """Request/retry/failure counters and the circuit state."""
+        with self._stats_lock:
+            return {**self._stats, "circuit": self.breaker.state}
+
+    def _count(self, key: str):
+        with self._stats_lock:
+            self._stats[key] += 1
@@ -6,11 +6,14 @@ RAG自动加载工具：自动加载doc目录的文件并跟踪已加载的文
 import os
 import json
 import hashlib
-from typing import List, Dict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List, Dict, Iterator, Any, Optional
 
 # 配置
 DOC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..", "doc"))
 TRACK_FILE = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..", ".rag_loaded.json"))
+INDEX_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..", ".rag_index"))
+SUPPORTED_EXTENSIONS = (".md", ".txt", ".pdf", ".docx", ".rst")
 
 def get_file_hash(file_path: str) -> str:
     """计算文件的MD5哈希值"""
@@ -21,8 +24,12 @@ def get_file_hash(file_path: str) -> str:
             md5_hash.update(byte_block)
     return md5_hash.hexdigest()
 
-def load_loaded_files() -> Dict[str, str]:
-    """加载已加载文件的记录"""
+def load_loaded_files() -> Dict[str, Any]:
+    """加载已加载文件的记录
+
+    每个文件对应 {"md5": ..., "mtime": ..., "size": ...}；旧版本记录中的值
+    是 MD5 字符串，同样兼容。
+    """
     if os.path.exists(TRACK_FILE):
         try:
             with open(TRACK_FILE, "r", encoding="utf-8") as f:
@@ -31,88 +38,273 @@ def load_loaded_files() -> Dict[str, str]:
             return {}
     return {}
 
-def save_loaded_files(loaded: Dict[str, str]) -> None:
+def save_loaded_files(loaded: Dict[str, Any]) -> None:
     """保存已加载文件的记录"""
     with open(TRACK_FILE, "w", encoding="utf-8") as f:
         json.dump(loaded, f, indent=2, ensure_ascii=False)
 
-def get_new_or_updated_files(doc_dir: str = None) -> List[str]:
-    """获取新的或更新过的文件"""
-    doc_dir = doc_dir or DOC_DIR
-    loaded = load_loaded_files()
-    new_files = []
+def _record_hash(entry: Any) -> Optional[str]:
+    """从记录中取出 MD5（兼容旧版本只保存哈希字符串的格式）"""
+    if isinstance(entry, str):
+        return entry
+    if isinstance(entry, dict):
+        return entry.get("md5")
+    return None
+
+def _make_record(stat: os.stat_result, file_hash: str) -> Dict[str, Any]:
+    return {"md5": file_hash, "mtime": stat.st_mtime_ns, "size": stat.st_size}
+
+def scan_document_changes(doc_dir: str = None, loaded: Dict[str, Any] = None) -> Dict[str, Any]:
+    """单次遍历文档目录，找出新增、修改和删除的文件
+
+    先比较 mtime 和文件大小，两者都没变的文件直接视为未修改，不再计算哈希；
+    只有元数据变化的文件才会计算 MD5 以确认内容是否真的改变。
+
+    Args:
+        doc_dir: 文档目录，默认为 DOC_DIR
+        loaded: 已加载文件的记录，默认读取 TRACK_FILE；传入 {} 表示全量加载
+
+    Returns:
+        Dict[str, Any]: {"added": [...], "modified": [...], "deleted": [...],
+        "records": 目录中所有文件的最新记录, "doc_dir": 扫描的目录}
+    """
+    doc_dir = os.path.abspath(doc_dir or DOC_DIR)
+    loaded = load_loaded_files() if loaded is None else loaded
+    changes = {"added": [], "modified": [], "deleted": [], "records": {}, "doc_dir": doc_dir}
+    seen = set()
     
     # 遍历doc目录下的所有文件（支持嵌套目录）
     for root, dirs, files in os.walk(doc_dir):
         for file_name in files:
             # 过滤常见文档格式
-            if file_name.endswith((".md", ".txt", ".pdf", ".docx", ".rst")):
-                file_path = os.path.join(root, file_name)
-                file_hash = get_file_hash(file_path)
-                
-                # 检查文件是否未加载或已更新
-                if file_path not in loaded or loaded[file_path] != file_hash:
-                    new_files.append(file_path)
+            if not file_name.endswith(SUPPORTED_EXTENSIONS):
+                continue
+            file_path = os.path.join(root, file_name)
+            seen.add(file_path)
+            stat = os.stat(file_path)
+            entry = loaded.get(file_path)
+            
+            # 快速检查：mtime 与大小均未变化
+            if isinstance(entry, dict) and entry.get("mtime") == stat.st_mtime_ns and entry.get("size") == stat.st_size:
+                changes["records"][file_path] = entry
+                continue
+            
+            file_hash = get_file_hash(file_path)
+            changes["records"][file_path] = _make_record(stat, file_hash)
+            if entry is None:
+                changes["added"].append(file_path)
+            elif _record_hash(entry) != file_hash:
+                changes["modified"].append(file_path)
+    
+    # 记录中存在但目录里已经没有的文件
+    prefix = doc_dir + os.sep
+    changes["deleted"] = [
+        file_path for file_path in loaded
+        if file_path.startswith(prefix) and file_path not in seen
+    ]
+    
+    return changes
+
+def commit_document_changes(changes: Dict[str, Any]) -> None:
+    """在变更写入向量库之后，持久化 scan_document_changes 得到的文件记录
+
+    扫描目录下本次没有扫描到的文件记录一并删除：全量加载（loaded={}）时
+    deleted 为空，过期记录也不会残留。
+    """
+    loaded = load_loaded_files()
+    for file_path in changes["deleted"]:
+        loaded.pop(file_path, None)
+    if changes.get("doc_dir"):
+        prefix = changes["doc_dir"] + os.sep
+        for file_path in [file_path for file_path in loaded
+                          if file_path.startswith(prefix) and file_path not in changes["records"]]:
+            del loaded[file_path]
+    loaded.update(changes["records"])
+    save_loaded_files(loaded)
+
+def get_new_or_updated_files(doc_dir: str = None) -> List[str]:
+    """获取新的或更新过的文件"""
+    changes = scan_document_changes(doc_dir)
+    return changes["added"] + changes["modified"]
+
+def _load_file_chunks(file_path: str, chunk_size: int, chunk_overlap: int, chunk_mode: str) -> List[Dict[str, Any]]:
+    """进程池任务：读取并切分单个文件（PDF 解析是 CPU 密集型的）"""
+    from chotbot.rag.chunker import TextChunker
+    
+    chunker = TextChunker(chunk_size=chunk_size, chunk_overlap=chunk_overlap, mode=chunk_mode)
+    pages = read_document_pages(file_path)
+    if not pages:
+        return []
+    return list(chunker.chunk_pages(pages, source=file_path, paged=file_path.endswith(".pdf")))
+
+def iter_document_changes(changes: Dict[str, Any], chunker=None, workers: int = None) -> Iterator[Dict[str, Any]]:
+    """解析变更的文件，逐个产出 {"path", "status", "chunks"}
+
+    删除的文件最先产出（chunks 为空）；新增和修改的文件在进程池中并行解析，
+    按完成顺序产出。
+
+    Args:
+        changes: scan_document_changes 的返回值
+        chunker: TextChunker 实例，默认按 Config 创建
+        workers: 解析进程数，默认 Config.RAG_LOADER_WORKERS（0 表示 CPU 核数）
+    """
+    from chotbot.rag.chunker import TextChunker
+    from chotbot.utils.config import Config
+    
+    chunker = chunker or TextChunker()
+    workers = workers if workers is not None else Config.RAG_LOADER_WORKERS
+    workers = workers or os.cpu_count() or 1
     
-    return new_files
+    for file_path in changes["deleted"]:
+        yield {"path": file_path, "status": "deleted", "chunks": []}
+    
+    status = {file_path: "added" for file_path in changes["added"]}
+    status.update({file_path: "modified" for file_path in changes["modified"]})
+    if not status:
+        return
+    
+    args = (chunker.chunk_size, chunker.chunk_overlap, chunker.mode)
+    if workers <= 1 or len(status) == 1:
+        for file_path in status:
+            yield {"path": file_path, "status": status[file_path], "chunks": _load_file_chunks(file_path, *args)}
+        return
+    
+    with ProcessPoolExecutor(max_workers=min(workers, len(status))) as executor:
+        futures = {executor.submit(_load_file_chunks, file_path, *args): file_path for file_path in status}
+        for future in as_completed(futures):
+            file_path = futures[future]
+            try:
+                chunks = future.result()
+            except Exception as e:
+                print(f"跳过异常文件 {os.path.basename(file_path)}: {str(e)}")
+                chunks = []
+            yield {"path": file_path, "status": status[file_path], "chunks": chunks}
+
+def load_documents(doc_dir: str = None, file_paths: List[str] = None) -> List[str]:
+    """加载doc目录下的所有文档内容（支持MD/TXT/RST/PDF）
 
-def load_documents(doc_dir: str = None) -> List[str]:
-    """加载doc目录下的所有文档内容（支持MD/TXT/RST/PDF）"""
+    Args:
+        doc_dir: 文档目录，默认为 DOC_DIR
+        file_paths: 仅加载这些文件（例如 get_new_or_updated_files 的结果）
+    """
     doc_dir = doc_dir or DOC_DIR
     documents = []
     
-    for root, dirs, files in os.walk(doc_dir):
-        for file_name in files:
-            file_path = os.path.join(root, file_name)
+    if file_paths is None:
+        file_paths = [
+            os.path.join(root, file_name)
+            for root, dirs, files in os.walk(doc_dir)
+            for file_name in files
+        ]
+    
+    for file_path in file_paths:
+        content = read_document(file_path)
+        if content:
+            documents.append(content)
+    
+    return documents
+
+def read_document(file_path: str) -> str:
+    """读取单个文档的文本内容，无法处理时返回空字符串"""
+    file_name = os.path.basename(file_path)
+    
+    try:
+        # 处理Markdown/Text/ReST文件
+        if file_name.endswith((".md", ".txt", ".rst")):
+            with open(file_path, "r", encoding="utf-8") as f:
+                content = f.read()
+                if content.strip():
+                    return content
+        
+        # 处理PDF文件
+        elif file_name.endswith(".pdf"):
+            from pdfminer.high_level import extract_text
             
-            try:
-                # 处理Markdown/Text/ReST文件
-                if file_name.endswith((".md", ".txt", ".rst")):
-                    with open(file_path, "r", encoding="utf-8") as f:
-                        content = f.read()
-                        if content.strip():
-                            documents.append(content)
+            # 使用pdfminer.six提取PDF内容
+            pdf_content = extract_text(file_path)
+            
+            if pdf_content.strip():
+                return pdf_content
                 
-                # 处理PDF文件
-                elif file_name.endswith(".pdf"):
-                    from pdfminer.high_level import extract_text
-                    
-                    # 使用pdfminer.six提取PDF内容
-                    pdf_content = extract_text(file_path)
-                    
-                    if pdf_content.strip():
-                        documents.append(pdf_content)
-                        
-            except UnicodeDecodeError:
-                # 跳过无法解码的文件
-                continue
-            except Exception as e:
-                # 跳过无法处理的PDF文件
-                print(f"跳过异常文件 {file_name}: {str(e)}")
-                continue
+    except UnicodeDecodeError:
+        # 跳过无法解码的文件
+        pass
+    except Exception as e:
+        # 跳过无法处理的PDF文件
+        print(f"跳过异常文件 {file_name}: {str(e)}")
     
-    return documents
+    return ""
 
-def update_loaded_record(doc_dir: str = None) -> None:
-    """更新已加载文件的记录"""
+def read_document_pages(file_path: str) -> List[str]:
+    """读取文档并按页拆分（PDF 按换页符分页，其他格式视为单页）"""
+    content = read_document(file_path)
+    if not content:
+        return []
+    if file_path.endswith(".pdf"):
+        pages = content.split("\f")
+        # pdfminer 在最后一页之后也会输出换页符
+        if pages and not pages[-1].strip():
+            pages.pop()
+        return pages
+    return [content]
+
+def iter_document_chunks(doc_dir: str = None, file_paths: List[str] = None, chunker=None) -> Iterator[Dict[str, Any]]:
+    """逐个文件读取并切分文档，按需产出带来源/偏移/页码元数据的片段
+
+    Args:
+        doc_dir: 文档目录，默认为 DOC_DIR
+        file_paths: 仅处理这些文件
+        chunker: TextChunker 实例，默认按 Config 创建
+    """
+    from chotbot.rag.chunker import TextChunker
+    
+    doc_dir = doc_dir or DOC_DIR
+    chunker = chunker or TextChunker()
+    
+    if file_paths is None:
+        file_paths = [
+            os.path.join(root, file_name)
+            for root, dirs, files in os.walk(doc_dir)
+            for file_name in files
+        ]
+    
+    for file_path in file_paths:
+        pages = read_document_pages(file_path)
+        if pages:
+            yield from chunker.chunk_pages(pages, source=file_path, paged=file_path.endswith(".pdf"))
+
+def update_loaded_record(doc_dir: str = None, file_paths: List[str] = None) -> None:
+    """更新已加载文件的记录
+
+    Args:
+        doc_dir: 文档目录，默认为 DOC_DIR
+        file_paths: 仅更新这些文件的记录，默认遍历整个目录
+    """
     doc_dir = doc_dir or DOC_DIR
     loaded = load_loaded_files()
     
-    # 遍历所有文档文件并更新哈希记录
-    for root, dirs, files in os.walk(doc_dir):
-        for file_name in files:
-            if file_name.endswith((".md", ".txt", ".pdf", ".docx", ".rst")):
-                file_path = os.path.join(root, file_name)
-                file_hash = get_file_hash(file_path)
-                loaded[file_path] = file_hash
+    if file_paths is None:
+        file_paths = [
+            os.path.join(root, file_name)
+            for root, dirs, files in os.walk(doc_dir)
+            for file_name in files
+            if file_name.endswith(SUPPORTED_EXTENSIONS)
+        ]
+    
+    # 更新哈希记录
+    for file_path in file_paths:
+        loaded[file_path] = _make_record(os.stat(file_path), get_file_hash(file_path))
     
     # 保存更新后的记录
     save_loaded_files(loaded)
 
 def clear_loaded_record() -> None:
-    """清除已加载文件的记录"""
+    """清除已加载文件的记录（同时删除持久化的向量索引）"""
     if os.path.exists(TRACK_FILE):
         os.remove(TRACK_FILE)
+    if os.path.isdir(INDEX_DIR):
+        import shutil
+        shutil.rmtree(INDEX_DIR)
 
 def get_document_count(doc_dir: str = None) -> int:
     """获取文档目录下的文件数量"""
@@ -121,7 +313,7 @@ def get_document_count(doc_dir: str = None) -> int:
     
     for root, dirs, files in os.walk(doc_dir):
         for file_name in files:
-            if file_name.endswith((".md", ".txt", ".pdf", ".docx", ".rst")):
+            if file_name.endswith(SUPPORTED_EXTENSIONS):
                 count += 1
     
     return count
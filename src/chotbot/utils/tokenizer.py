@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Token 计数工具：优先使用 tiktoken 的 BPE 编码，未安装时使用本地近似估算
+"""
+
+import re
+import math
+import logging
+from functools import lru_cache
+from chotbot.utils.config import Config
+
+logger = logging.getLogger(__name__)
+
+# 中日韩统一表意文字、假名、全角符号：BPE 下通常每个字符至少 1 个 token
+_CJK_PATTERN = r"[\u3000-\u303f\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uff00-\uffef]"
+_TOKEN_RE = re.compile(rf"{_CJK_PATTERN}|[A-Za-z0-9_]+|[^\sA-Za-z0-9_]")
+
+# 聊天消息中角色、分隔符等格式开销（OpenAI 计算方式中每条消息约 4 个 token）
+MESSAGE_OVERHEAD_TOKENS = 4
+
+_fallback_warned = False
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Approximate the BPE token count of ``text`` without a tokenizer.
+
+    CJK characters and punctuation count as one token each; runs of ASCII
+    letters/digits count as one token per four characters.
+
+    Args:
+        text (str): Input text
+
+    Returns:
+        int: Estimated token count
+    """
+    count = 0
+    for match in _TOKEN_RE.finditer(text):
+        piece = match.group()
+        if len(piece) > 1:
+            count += math.ceil(len(piece) / 4)
+        else:
+            count += 1
+    return count
+
+
+@lru_cache(maxsize=None)
+def get_encoding(name: str = None):
+    """
+    Load a tiktoken encoding, or None when tiktoken is unavailable.
+
+    Args:
+        name (str): Encoding name (default: Config.TOKENIZER_ENCODING)
+    """
+    global _fallback_warned
+    name = name or Config.TOKENIZER_ENCODING
+    try:
+        import tiktoken
+        return tiktoken.get_encoding(name)
+    except Exception as e:
+        # 未安装 tiktoken 或无法下载编码文件时回退到近似估算，只提示一次
+        if not _fallback_warned:
+            _fallback_warned = True
+            logger.warning(f"tiktoken encoding {name!r} unavailable ({e}); token counts are estimated")
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """
+    Count tokens with the configured BPE encoding, falling back to
+    ``estimate_tokens``.
+
+    Args:
+        text (str): Input text
+
+    Returns:
+        int: Token count
+    """
+    if not text:
+        return 0
+    encoding = get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return estimate_tokens(text)
+
+
+def message_tokens(message: dict) -> int:
+    """
+    Token count of a chat message including its formatting overhead.
+
+    The count is cached on the message under ``"tokens"``, so each message
+    is encoded once; messages must not be modified after counting.
+
+    Args:
+        message (dict): Chat message with ``role`` and ``content``
+
+    Returns:
+        int: Token count
+    """
+    tokens = message.get("tokens")
+    if tokens is None:
+        content = message.get("content")
+        tokens = count_tokens(content if isinstance(content, str) else "") + MESSAGE_OVERHEAD_TOKENS
+        message["tokens"] = tokens
+    return tokens
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    Cut ``text`` to its longest prefix of at most ``max_tokens`` tokens.
+
+    Args:
+        text (str): Input text
+        max_tokens (int): Token limit
+
+    Returns:
+        str: Truncated text
+    """
+    if max_tokens <= 0:
+        return ""
+    encoding = get_encoding()
+    if encoding is not None:
+        tokens = encoding.encode(text, disallowed_special=())
+        if len(tokens) <= max_tokens:
+            return text
+        # 截断位置可能落在多字节字符中间，去掉不完整的替换字符
+        return encoding.decode(tokens[:max_tokens]).rstrip("\ufffd")
+
+    # 近似估算下对前缀长度二分查找
+    low, high = 0, len(text)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if estimate_tokens(text[:middle]) <= max_tokens:
+            low = middle
+        else:
+            high = middle - 1
+    return text[:low]
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for the approximate nearest-neighbour vector stores.
+"""
+
+import sys
+import os
+import time
+import tempfile
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'evaluation'))
+
+from chotbot.rag.vector_store import SimpleVectorStore, create_vector_store
+from chotbot.rag.ann_index import IVFFlatVectorStore, HNSWVectorStore
+from benchmark_ann import make_dataset, recall_at_k, run_queries
+
+
+def _exact_and_documents(data, queries, k):
+    documents = [str(i) for i in range(len(data))]
+    store = SimpleVectorStore()
+    store.add_documents(documents, data)
+    exact, _ = run_queries(store, queries, k)
+    return documents, exact
+
+
+def test_ivf_recall():
+    """IVF with a generous nprobe should recover almost all exact neighbours."""
+    data, queries = make_dataset(3000, 32, 30)
+    documents, exact = _exact_and_documents(data, queries, 5)
+
+    store = IVFFlatVectorStore(nlist=32, nprobe=8)
+    store.add_documents(documents, data)
+    assert store.is_trained
+
+    approx, _ = run_queries(store, queries, 5)
+    assert recall_at_k(exact, approx) >= 0.9
+
+    # nprobe == nlist scans everything and must be exact
+    approx, _ = run_queries(store, queries, 5, nprobe=32)
+    assert recall_at_k(exact, approx) == 1.0
+
+
+def test_ivf_untrained_falls_back_to_exact():
+    """Small corpora are searched exactly until the quantizer is trained."""
+    data, queries = make_dataset(50, 16, 5)
+    documents, exact = _exact_and_documents(data, queries, 3)
+
+    store = IVFFlatVectorStore(nlist=64)
+    store.add_documents(documents, data)
+    assert not store.is_trained
+
+    approx, _ = run_queries(store, queries, 3)
+    assert approx == exact
+
+
+def test_hnsw_recall():
+    """HNSW recall should be high on clustered data."""
+    data, queries = make_dataset(1500, 32, 30)
+    documents, exact = _exact_and_documents(data, queries, 5)
+
+    store = HNSWVectorStore(m=8, ef_construction=64, ef_search=64)
+    for start in range(0, len(data), 500):
+        store.add_documents(documents[start:start + 500], data[start:start + 500])
+
+    approx, _ = run_queries(store, queries, 5)
+    assert recall_at_k(exact, approx) >= 0.9
+
+
+def test_create_vector_store():
+    """The factory honours the requested index type."""
+    assert type(create_vector_store("flat")) is SimpleVectorStore
+    assert isinstance(create_vector_store("ivf"), IVFFlatVectorStore)
+    assert isinstance(create_vector_store("hnsw"), HNSWVectorStore)
+
+
+def test_saved_index_reopens_without_rebuilding():
+    """HNSW graphs and IVF quantizers are restored from disk, not rebuilt."""
+    data, queries = make_dataset(1500, 32, 20)
+    documents = [str(i) for i in range(len(data))]
+    for store_class, kwargs in ((HNSWVectorStore, {"m": 8, "ef_construction": 64}),
+                                (IVFFlatVectorStore, {"nlist": 16, "nprobe": 4})):
+        store = store_class(**kwargs)
+        store.add_documents(documents[:1000], data[:1000])
+        expected, _ = run_queries(store, queries, 5)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            store.save(tmp_dir)
+
+            reopened = store_class(**kwargs)
+            reopened._rebuild_index = lambda: (_ for _ in ()).throw(AssertionError("rebuilt"))
+            started = time.perf_counter()
+            assert reopened.load(tmp_dir)
+            assert time.perf_counter() - started < 0.5
+            assert run_queries(reopened, queries, 5)[0] == expected
+
+            # 加载后追加的行增量加入索引，再次保存、加载后仍可用
+            reopened.add_documents(documents[1000:], data[1000:])
+            reopened.save(tmp_dir)
+            final = store_class(**kwargs)
+            final._rebuild_index = reopened._rebuild_index
+            assert final.load(tmp_dir)
+            assert run_queries(final, queries, 5)[0] == run_queries(reopened, queries, 5)[0]
+
+            # 索引文件缺失或参数不一致时重建
+            os.remove(os.path.join(tmp_dir, store_class.INDEX_FILE))
+            rebuilt = store_class(**kwargs)
+            assert rebuilt.load(tmp_dir)
+            assert len(run_queries(rebuilt, queries, 5)[0]) == len(queries)
+
+
+if __name__ == "__main__":
+    test_ivf_recall()
+    test_ivf_untrained_falls_back_to_exact()
+    test_hnsw_recall()
+    test_create_vector_store()
+    test_saved_index_reopens_without_rebuilding()
+    print("All ANN index tests passed!")
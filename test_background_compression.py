@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for background (non-blocking) history compression in MCPContextManager.
+"""
+
+import sys
+import os
+import time
+import threading
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from chotbot.mcp.context_manager import MCPContextManager, compression_stats
+
+
+class _SlowCompressor:
+    """Summarizes everything but the last three messages after a delay."""
+
+    def __init__(self, delay=0.2, fail=False):
+        self.delay = delay
+        self.fail = fail
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def should_compress(self, history, threshold_messages=15, threshold_tokens=None):
+        return len(history) >= threshold_messages
+
+    def compress(self, history, strategy="summary", keep_last_n=3):
+        self.started.set()
+        self.release.wait(self.delay)
+        if self.fail:
+            raise RuntimeError("boom")
+        summary = {"role": "system", "content": f"[History Summary] {len(history) - keep_last_n}", "compressed": True}
+        return [summary] + history[-keep_last_n:]
+
+
+def _manager(compressor):
+    manager = MCPContextManager(compressor)
+    manager.compression_enabled = True
+    manager.compression_async = True
+    manager.compression_threshold = 6
+    manager.history_limit = 100
+    return manager
+
+
+def test_threshold_turn_does_not_block():
+    """The turn crossing the threshold returns at once; the summary is swapped in later."""
+    compressor = _SlowCompressor(delay=5)
+    manager = _manager(compressor)
+    before = compression_stats()
+    for i in range(5):
+        manager.add_message("user", f"m{i}")
+
+    started = time.perf_counter()
+    manager.add_message("user", "m5")
+    assert time.perf_counter() - started < 0.05
+    assert compressor.started.wait(1)
+
+    # 摘要到达前返回未压缩的历史，期间新增的消息也在其中
+    manager.add_message("assistant", "m6")
+    assert [m["content"] for m in manager.get_context()] == [f"m{i}" for i in range(7)]
+    assert manager.get_compression_stats()["pending"]
+
+    compressor.release.set()
+    assert manager.wait_for_compression(1)
+    contents = [m["content"] for m in manager.get_context()]
+    assert contents == ["[History Summary] 3", "m3", "m4", "m5", "m6"]
+
+    stats = manager.get_compression_stats()
+    assert not stats["pending"] and stats["last_lag_ms"] > 0
+    after = compression_stats()
+    assert after["completed"] == before["completed"] + 1
+    assert after["max_lag_ms"] >= stats["last_lag_ms"] - 0.1
+
+
+def test_clear_discards_in_flight_result():
+    """A summary of history that was cleared meanwhile is dropped."""
+    compressor = _SlowCompressor(delay=5)
+    manager = _manager(compressor)
+    before = compression_stats()
+    for i in range(6):
+        manager.add_message("user", f"m{i}")
+    assert compressor.started.wait(1)
+    pending = manager._pending
+    manager.clear()
+    manager.add_message("user", "fresh")
+    compressor.release.set()
+    pending.result(1)
+    time.sleep(0.05)
+    assert [m["content"] for m in manager.get_history()] == ["fresh"]
+    assert compression_stats()["discarded"] == before["discarded"] + 1
+
+
+def test_failed_compression_keeps_history():
+    """A failed background compression leaves the history in place."""
+    manager = _manager(_SlowCompressor(delay=0, fail=True))
+    for i in range(6):
+        manager.add_message("user", f"m{i}")
+    assert manager.wait_for_compression(1)
+    assert len(manager.get_history()) == 6
+
+
+if __name__ == "__main__":
+    test_threshold_turn_does_not_block()
+    test_clear_discards_in_flight_result()
+    test_failed_compression_keeps_history()
+    print("All tests passed!")
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for token streaming through the MCP processor.
+"""
+
+import sys
+import os
+import json
+import asyncio
+import tempfile
+from contextlib import aclosing
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from openai.types.chat import ChatCompletionMessageFunctionToolCall
+from openai.types.chat.chat_completion_message_function_tool_call import Function
+from chotbot.mcp.processor import MCPProcessor
+from chotbot.core.react_agent import ReActAgent
+from chotbot.core.conversation_log import ConversationLog
+
+
+class _RecordingLLM:
+    """Yields a fixed reply token by token and records every request."""
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.requests = []
+        self.closed = False
+
+    def generate_stream(self, messages):
+        self.requests.append(messages)
+        yield from self.tokens
+
+    async def agenerate_stream(self, messages):
+        self.requests.append(messages)
+        try:
+            for token in self.tokens:
+                await asyncio.sleep(0)
+                yield token
+        finally:
+            self.closed = True
+
+
+def test_stream_records_context_with_one_call():
+    """Streamed tokens are teed into the context; the LLM is called once."""
+    llm = _RecordingLLM(["你", "好", "！"])
+    processor = MCPProcessor(llm)
+
+    assert list(processor.interact_stream("hi", system_prompt="sys")) == ["你", "好", "！"]
+    assert len(llm.requests) == 1
+    assert llm.requests[0][0] == {"role": "system", "content": "sys"}
+    assert llm.requests[0][-1] == {"role": "user", "content": "hi"}
+    assert processor.get_context() == [
+        {"role": "user", "content": "hi"},
+        {"role": "assistant", "content": "你好！"},
+    ]
+
+
+def test_async_stream_cancellation_closes_llm_stream():
+    """Closing the stream early stops the LLM stream and records nothing."""
+    llm = _RecordingLLM(["a", "b", "c", "d"])
+    processor = MCPProcessor(llm)
+
+    async def consume():
+        received = []
+        async with aclosing(processor.ainteract_stream("hi")) as chunks:
+            async for chunk in chunks:
+                received.append(chunk)
+                if len(received) == 2:
+                    break
+        return received
+
+    assert asyncio.run(consume()) == ["a", "b"]
+    assert llm.closed
+    assert processor.get_context() == []
+
+    assert asyncio.run(_collect(processor.ainteract_stream("again"))) == ["a", "b", "c", "d"]
+    assert processor.get_context()[-1] == {"role": "assistant", "content": "abcd"}
+
+
+class _StreamingAgent:
+    """Stands in for the ReAct agent: streams the answer after a tool step."""
+
+    def __init__(self, deltas, final_answer):
+        self.deltas = deltas
+        self.final_answer = final_answer
+        self.calls = []
+        self.closed = False
+
+    def cache_usable(self, history=None):
+        return False
+
+    def run_stream(self, user_input, history=None, stream=None, user_id=None, plan_mode="auto"):
+        self.calls.append((user_input, list(history or [])))
+        try:
+            yield {"type": "step", "step": 1, "content": {"action": "tool_call"}}
+            for delta in self.deltas:
+                yield {"type": "answer_delta", "step": 2, "content": delta}
+            yield {"type": "final_answer", "step": 2, "content": self.final_answer}
+        finally:
+            self.closed = True
+
+
+def _chatbot(agent):
+    # 延迟导入：Chatbot 依赖的 RAG 组件只在这里用到
+    from chotbot.core.chatbot import Chatbot
+    chatbot = Chatbot.__new__(Chatbot)
+    chatbot.react_agent = agent
+    chatbot.mcp_processor = MCPProcessor(_RecordingLLM([]))
+    chatbot.response_cache = None
+    chatbot.rag_manager = None
+    return chatbot
+
+
+def test_chatbot_stream_forwards_react_answer_tokens():
+    """The chat stream runs the ReAct loop and forwards answer tokens plus the citation tail."""
+    agent = _StreamingAgent(["今天", "晴"], "今天晴\n\n参考来源：\n[1] 天气")
+    chatbot = _chatbot(agent)
+
+    chunks = asyncio.run(_collect(chatbot.achat_stream("天气怎么样", use_rag=False)))
+    assert chunks == ["今天", "晴", "\n\n参考来源：\n[1] 天气"]
+    assert chatbot.mcp_processor.get_context()[-1] == {"role": "assistant", "content": "今天晴\n\n参考来源：\n[1] 天气"}
+
+    asyncio.run(_collect(chatbot.achat_stream("明天呢", use_rag=False)))
+    assert agent.calls[1][1][-1]["content"] == "今天晴\n\n参考来源：\n[1] 天气"
+
+
+def test_chatbot_stream_cancellation_stops_react_loop():
+    """Closing the chat stream early closes the ReAct generator and records nothing."""
+    agent = _StreamingAgent(["a", "b", "c"], "abc")
+    chatbot = _chatbot(agent)
+
+    async def consume():
+        async with aclosing(chatbot.achat_stream("hi", use_rag=False)) as chunks:
+            async for chunk in chunks:
+                return chunk
+
+    assert asyncio.run(consume()) == "a"
+    assert agent.closed
+    assert chatbot.mcp_processor.get_context() == []
+
+
+class _ToolThenAnswerLLM:
+    """Streams a search call on the first turn and a direct answer in pieces on the second."""
+
+    def __init__(self, pieces):
+        self.pieces = pieces
+        self.turns = 0
+
+    def generate_with_tools_stream(self, messages, tools):
+        self.turns += 1
+        if self.turns == 1:
+            arguments = json.dumps({"query": "北京天气"}, ensure_ascii=False)
+            yield {"type": "tool_call", "index": 0, "id": "s", "name": "search",
+                   "arguments_delta": arguments, "arguments": arguments}
+            yield {"type": "done", "content": None, "tool_calls": [ChatCompletionMessageFunctionToolCall(
+                id="s", type="function", function=Function(name="search", arguments=arguments)
+            )]}
+            return
+        for piece in self.pieces:
+            yield {"type": "content", "delta": piece}
+        yield {"type": "done", "content": "".join(self.pieces), "tool_calls": None}
+
+
+class _SearchTools:
+    def get_tool_definitions(self):
+        return []
+
+    def execute_tool_calls(self, tool_calls):
+        for index, tool_call in enumerate(tool_calls):
+            yield index, {"tool": "search", "status": "success", "result": ["晴"], "tool_call_id": tool_call.id}
+
+
+def test_chatbot_stream_forwards_direct_answer_tokens():
+    """A direct answer without end_tool is streamed piece by piece, not sent as one chunk at the end."""
+    with tempfile.TemporaryDirectory() as tmp:
+        llm = _ToolThenAnswerLLM(["北京", "今天", "晴"])
+        agent = ReActAgent(llm, _SearchTools(), conversation_log=ConversationLog(tmp))
+        chatbot = _chatbot(agent)
+
+        chunks = asyncio.run(_collect(chatbot.achat_stream("北京天气", use_rag=False)))
+        assert chunks == ["北京", "今天", "晴"]
+        assert llm.turns == 2
+        assert chatbot.mcp_processor.get_context()[-1] == {"role": "assistant", "content": "北京今天晴"}
+
+
+async def _collect(chunks):
+    return [chunk async for chunk in chunks]
+
+
+if __name__ == "__main__":
+    test_stream_records_context_with_one_call()
+    test_async_stream_cancellation_closes_llm_stream()
+    test_chatbot_stream_forwards_react_answer_tokens()
+    test_chatbot_stream_cancellation_stops_react_loop()
+    test_chatbot_stream_forwards_direct_answer_tokens()
+    print("All chat stream tests passed!")
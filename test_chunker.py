@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for the RAG document chunker.
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from chotbot.rag.chunker import TextChunker
+from chotbot.utils.tokenizer import estimate_tokens
+
+CHINESE_TEXT = (
+    "Python是一种广泛使用的高级编程语言。它由Guido van Rossum于1989年发明！"
+    "Python的设计哲学强调代码的可读性和简洁性。Python支持多种编程范式，包括面向对象、命令式、函数式和过程式编程？"
+    "Python的标准库非常庞大；提供了广泛的功能。"
+)
+
+
+def test_sentence_mode_respects_size_and_offsets():
+    """Sentence chunks stay within the size limit and offsets point into the source."""
+    chunker = TextChunker(chunk_size=40, chunk_overlap=10, mode="sentence")
+    chunks = list(chunker.chunk(CHINESE_TEXT, source="doc/python.md"))
+
+    assert len(chunks) > 1
+    for i, chunk in enumerate(chunks):
+        metadata = chunk["metadata"]
+        assert len(chunk["text"]) <= 40
+        assert metadata["source"] == "doc/python.md"
+        assert metadata["page"] is None
+        assert metadata["chunk_index"] == i
+        assert CHINESE_TEXT[metadata["offset"]:].startswith(chunk["text"])
+
+    # 每个片段都应在中文句末标点处结束
+    assert all(chunk["text"][-1] in "。！？；" for chunk in chunks)
+
+
+def test_sentence_mode_overlap():
+    """Consecutive chunks share trailing sentences when overlap allows it."""
+    text = "".join("这是第{}句。".format(i) for i in range(20))
+    chunker = TextChunker(chunk_size=30, chunk_overlap=10, mode="sentence")
+    chunks = list(chunker.chunk(text))
+    starts = [c["metadata"]["offset"] for c in chunks]
+    ends = [c["metadata"]["offset"] + len(c["text"]) for c in chunks]
+    assert len(chunks) > 1
+    assert all(starts[i + 1] < ends[i] for i in range(len(chunks) - 1))
+
+
+def test_character_mode():
+    """Character windows advance by size - overlap."""
+    text = "abcdefghij" * 5
+    chunker = TextChunker(chunk_size=20, chunk_overlap=5, mode="character")
+    chunks = list(chunker.chunk(text))
+    assert [c["metadata"]["offset"] for c in chunks] == [0, 15, 30]
+    assert all(len(c["text"]) <= 20 for c in chunks)
+
+
+def test_token_mode_and_long_sentences():
+    """Token chunks never exceed the token budget, even for run-on sentences."""
+    text = "这是一段没有任何句号的非常长的中文文本" * 20
+    chunker = TextChunker(chunk_size=30, chunk_overlap=5, mode="token")
+    chunks = list(chunker.chunk(text))
+    assert len(chunks) > 1
+    assert all(estimate_tokens(c["text"]) <= 30 for c in chunks)
+    assert "".join(c["text"] for c in chunks) == text
+
+
+def test_pages_are_recorded():
+    """Paged input records 1-based page numbers and never merges pages."""
+    chunker = TextChunker(chunk_size=100, chunk_overlap=0, mode="sentence")
+    chunks = list(chunker.chunk_pages(["第一页内容。", "第二页内容。"], source="a.pdf"))
+    assert [c["metadata"]["page"] for c in chunks] == [1, 2]
+    assert [c["text"] for c in chunks] == ["第一页内容。", "第二页内容。"]
+
+
+if __name__ == "__main__":
+    test_sentence_mode_respects_size_and_offsets()
+    test_sentence_mode_overlap()
+    test_character_mode()
+    test_token_mode_and_long_sentences()
+    test_pages_are_recorded()
+    print("All chunker tests passed!")
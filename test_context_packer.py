@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for the token-budgeted RAG context packer.
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from chotbot.rag.context_packer import ContextPacker
+from chotbot.utils.tokenizer import truncate_to_tokens, count_tokens
+
+
+def _result(text, score, source=None, offset=None):
+    return {"document": text, "score": score, "metadata": {"source": source, "offset": offset}}
+
+
+def test_budget_filled_by_score():
+    """Higher-scoring chunks win; chunks that don't fit are reported as dropped."""
+    packer = ContextPacker(token_budget=10, min_truncated_tokens=100, count_fn=len)
+    packed = packer.pack([
+        _result("aaaaaa", 0.5),
+        _result("bbbbbbbb", 0.9),
+        _result("cc", 0.7),
+    ])
+
+    assert packed["documents"] == ["bbbbbbbb", "cc"]
+    assert packed["used_tokens"] == 10
+    assert packed["dropped_tokens"] == 6 and packed["dropped_chunks"] == 1
+
+
+def test_overlapping_chunks_are_merged():
+    """Overlapping chunks of one source are merged and duplicates dropped."""
+    source = "天气预报：北京今天晴，最高气温二十五度。明天多云。"
+    first, second = source[0:15], source[10:25]
+    packer = ContextPacker(token_budget=100, count_fn=len)
+    packed = packer.pack([
+        _result(first, 0.9, "a.md", 0),
+        _result(second, 0.8, "a.md", 10),
+        _result(source[3:8], 0.7, "a.md", 3),
+        _result(first, 0.6, "b.md", 0),
+    ])
+
+    assert packed["documents"] == [source]
+    assert packed["used_tokens"] == len(source)
+    assert packed["merged_chunks"] == 1 and packed["duplicate_chunks"] == 2
+
+
+def test_truncates_to_fill_remaining_budget():
+    """A large chunk is cut to the remaining budget instead of being dropped."""
+    packer = ContextPacker(token_budget=8, min_truncated_tokens=2, count_fn=count_tokens)
+    packed = packer.pack(["这是一段很长很长的检索结果文本"])
+
+    assert packed["used_tokens"] <= 8
+    assert packed["documents"][0] == truncate_to_tokens("这是一段很长很长的检索结果文本", 8)
+    assert packed["dropped_tokens"] > 0 and packed["dropped_chunks"] == 0
+
+
+if __name__ == "__main__":
+    test_budget_filled_by_score()
+    test_overlapping_chunks_are_merged()
+    test_truncates_to_fill_remaining_budget()
+    print("All context packer tests passed!")
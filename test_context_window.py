@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for token accounting and prefix-sum window selection in MCPContextManager.
+"""
+
+import sys
+import os
+import random
+import logging
+from unittest import mock
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from chotbot.mcp.context_manager import MCPContextManager
+from chotbot.utils import tokenizer
+from chotbot.utils.tokenizer import message_tokens, count_tokens, estimate_tokens, MESSAGE_OVERHEAD_TOKENS
+
+
+def _naive_window(history, max_tokens):
+    context, total = [], 0
+    for message in reversed(history):
+        tokens = message_tokens(message)
+        if total + tokens > max_tokens:
+            break
+        context.insert(0, message["content"])
+        total += tokens
+    return context
+
+
+def _manager():
+    manager = MCPContextManager()
+    manager.compression_enabled = False
+    manager.history_limit = 1000
+    return manager
+
+
+def test_message_tokens_are_cached_on_the_message():
+    """Counts include the per-message overhead and are computed once."""
+    message = {"role": "user", "content": "今天北京天气怎么样？"}
+    assert message_tokens(message) == count_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+    # 中文按字计数，远多于 len // 4
+    assert message["tokens"] > len(message["content"]) // 4 + MESSAGE_OVERHEAD_TOKENS
+    message["tokens"] = 99
+    assert message_tokens(message) == 99
+    assert message_tokens({"role": "assistant", "content": None}) == MESSAGE_OVERHEAD_TOKENS
+
+
+def test_window_matches_linear_scan_and_fits_the_limit():
+    """The selected window equals the old backwards scan and never exceeds the budget."""
+    rng = random.Random(7)
+    manager = _manager()
+    for i in range(300):
+        content = "你好" * rng.randint(1, 40) + " hello world" * rng.randint(0, 10)
+        manager.add_message("user" if i % 2 == 0 else "assistant", f"{i}:{content}")
+        if i % 37 == 0:
+            for budget in (10, 200, 1000, 100000):
+                context = manager.get_context(budget)
+                assert [m["content"] for m in context] == _naive_window(manager.history, budget)
+                assert sum(message_tokens(dict(m)) for m in context) <= budget
+                assert all("tokens" not in m for m in context)
+
+
+def test_prefix_sums_follow_history_replacement():
+    """Truncation, clearing and direct assignment rebuild the prefix sums."""
+    manager = _manager()
+    manager.history_limit = 5
+    for i in range(12):
+        manager.add_message("user", f"message {i}")
+    assert [m["content"] for m in manager.get_context(100000)] == [f"message {i}" for i in range(7, 12)]
+
+    manager.history = [{"role": "system", "content": "restored"}]
+    assert [m["content"] for m in manager.get_context()] == ["restored"]
+    manager.add_message("user", "next")
+    assert [m["content"] for m in manager.get_context()] == ["restored", "next"]
+
+    manager.clear()
+    assert manager.get_context() == []
+
+
+def test_outgoing_messages_carry_only_api_fields():
+    """Summary markers and cached token counts are not sent to the model."""
+    manager = _manager()
+    tool_calls = [{"id": "c", "type": "function", "function": {"name": "search", "arguments": "{}"}}]
+    manager.history = [
+        {"role": "system", "content": "[History Summary] old", "compressed": True, "original_count": 7,
+         "strategy": "rolling"},
+        {"role": "assistant", "content": None, "tool_calls": tool_calls},
+        {"role": "tool", "content": "晴", "tool_call_id": "c"},
+    ]
+    assert manager.get_context() == [
+        {"role": "system", "content": "[History Summary] old"},
+        {"role": "assistant", "content": None, "tool_calls": tool_calls},
+        {"role": "tool", "content": "晴", "tool_call_id": "c"},
+    ]
+    # 内部字段仍保留在历史中
+    assert manager.history[0]["compressed"] and "tokens" in manager.history[0]
+
+
+class _Records(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+def test_missing_tiktoken_warns_once_and_estimates():
+    """Without tiktoken counts fall back to the estimate and a single warning is logged."""
+    handler = _Records()
+    tokenizer.logger.addHandler(handler)
+    tokenizer.get_encoding.cache_clear()
+    try:
+        with mock.patch.dict(sys.modules, {"tiktoken": None}), mock.patch.object(tokenizer, "_fallback_warned", False):
+            assert count_tokens("你好 world") == estimate_tokens("你好 world")
+            tokenizer.get_encoding("cl100k_base")
+            count_tokens("再来一次")
+        assert [r.levelno for r in handler.records] == [logging.WARNING]
+    finally:
+        tokenizer.logger.removeHandler(handler)
+        tokenizer.get_encoding.cache_clear()
+
+
+if __name__ == "__main__":
+    test_message_tokens_are_cached_on_the_message()
+    test_window_matches_linear_scan_and_fits_the_limit()
+    test_prefix_sums_follow_history_replacement()
+    test_outgoing_messages_carry_only_api_fields()
+    test_missing_tiktoken_warns_once_and_estimates()
+    print("All tests passed!")
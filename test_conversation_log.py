@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for the append-only conversation log: background batched writes,
+per-user index, segment rotation and recovery on restart.
+"""
+
+import sys
+import os
+import json
+import time
+import tempfile
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from openai.types.chat import ChatCompletionMessageFunctionToolCall
+from openai.types.chat.chat_completion_message_function_tool_call import Function
+from chotbot.core.conversation_log import ConversationLog
+from chotbot.core.react_agent import ReActAgent, PROFILE_EVERY_N_TURNS
+
+
+def _turn(i):
+    return [{"role": "user", "content": f"问题 {i}"}, {"role": "assistant", "content": f"回答 {i}"}]
+
+
+def test_append_is_queued_and_indexed_by_user():
+    """Turns are written by the writer thread and read back per user by offset."""
+    with tempfile.TemporaryDirectory() as tmp:
+        log = ConversationLog(tmp, fsync_interval=60)
+        for i in range(20):
+            log.append("alice" if i % 2 == 0 else "bob", _turn(i))
+        assert log.turn_count("alice") == 10
+        assert log.flush(5)
+
+        records = log.read("alice")
+        assert [r["messages"][0]["content"] for r in records] == [f"问题 {i}" for i in range(0, 20, 2)]
+        assert log.read_messages("bob", limit=2) == _turn(17) + _turn(19)
+        assert log.read("nobody") == []
+
+        stats = log.stats()
+        assert stats["records"] == 20 and stats["users"] == 2 and stats["queued"] == 0
+        # 批量写入：记录数远多于 fsync 次数
+        assert stats["fsyncs"] <= 2
+        # 全部写在一个追加文件中，而不是每轮一个文件
+        assert os.listdir(tmp) == ["segment-00000000.jsonl"]
+        log.close()
+
+
+def test_idle_log_is_fsynced_after_the_interval():
+    """Writes are fsynced within the interval even when no further records arrive."""
+    with tempfile.TemporaryDirectory() as tmp:
+        log = ConversationLog(tmp, fsync_interval=0.2)
+        log.append("alice", _turn(0))
+        time.sleep(0.05)
+        log.append("alice", _turn(1))
+        deadline = time.monotonic() + 2
+        while log.stats()["fsyncs"] < 1 and time.monotonic() < deadline:
+            time.sleep(0.02)
+        time.sleep(0.3)
+        stats = log.stats()
+        assert stats["records"] == 2
+        # 空闲后按时 fsync 一次，之后没有新写入不再 fsync
+        assert stats["fsyncs"] == 1
+        time.sleep(0.3)
+        assert log.stats()["fsyncs"] == 1
+        log.close()
+
+
+def test_segments_rotate_and_reload():
+    """Sealed segments are reloaded from their index; a torn last line is dropped."""
+    with tempfile.TemporaryDirectory() as tmp:
+        log = ConversationLog(tmp, segment_bytes=300, fsync_interval=0)
+        for i in range(10):
+            log.append("alice", _turn(i))
+            log.flush(5)
+        log.append("bob", _turn(99))
+        log.close()
+        names = sorted(os.listdir(tmp))
+        assert any(name.endswith(".idx.json") for name in names)
+        assert log.stats()["segments"] >= 2
+
+        # 模拟崩溃时写了一半的记录
+        active = sorted(name for name in names if name.endswith(".jsonl"))[-1]
+        with open(os.path.join(tmp, active), "ab") as f:
+            f.write(b'{"user_id": "alice", "messa')
+
+        reloaded = ConversationLog(tmp)
+        assert reloaded.turn_count("alice") == 10
+        assert reloaded.read_messages("alice", limit=1) == _turn(9)
+        assert reloaded.read_messages("bob") == _turn(99)
+
+        reloaded.append("alice", _turn(10))
+        reloaded.flush(5)
+        assert [r["messages"][0]["content"] for r in reloaded.read("alice", limit=2)] == ["问题 9", "问题 10"]
+        reloaded.close()
+        assert ConversationLog(tmp).turn_count("alice") == 11
+
+
+class _AnsweringLLM:
+    """Answers every question at once with end_tool."""
+
+    def generate_with_tools(self, messages, tools):
+        answer = f"答：{messages[-1]['content']}"
+        return None, [ChatCompletionMessageFunctionToolCall(
+            id="end", type="function",
+            function=Function(name="end_tool", arguments=json.dumps({"final_answer": answer}, ensure_ascii=False))
+        )]
+
+
+class _Tools:
+    def get_tool_definitions(self):
+        return []
+
+    def execute_tool_call(self, tool_call):
+        arguments = json.loads(tool_call.function.arguments)
+        return {"tool": "end_tool", "status": "completed", "result": arguments["final_answer"]}
+
+
+class _Profiles:
+    """Records profile extraction requests and stored profiles."""
+
+    def __init__(self):
+        self.extracted = []
+        self.documents = []
+
+    def extract_user_profile(self, messages):
+        self.extracted.append(messages)
+        return {"turns": len(messages) // 2}
+
+    def query(self, query):
+        return ""
+
+    def add_documents(self, documents, ids=None):
+        self.documents.append((documents, ids))
+
+
+def test_react_agent_logs_turns_and_extracts_profiles():
+    """``run`` appends each answered turn and builds the profile from the logged history."""
+    with tempfile.TemporaryDirectory() as tmp:
+        log = ConversationLog(tmp)
+        profiles = _Profiles()
+        agent = ReActAgent(_AnsweringLLM(), _Tools(), history_compressor=profiles, rag_manager=profiles,
+                           conversation_log=log)
+        for i in range(PROFILE_EVERY_N_TURNS):
+            assert agent.run(f"问题 {i}", user_id="alice")[0] == f"答：问题 {i}"
+        agent.run("匿名问题")
+
+        assert len(profiles.extracted) == 1
+        assert [m["content"] for m in profiles.extracted[0][:2]] == ["问题 0", "答：问题 0"]
+        assert len(profiles.extracted[0]) == 2 * PROFILE_EVERY_N_TURNS
+        assert profiles.documents[0][1] == ["user_profile_alice"]
+        log.flush(5)
+        assert log.turn_count("alice") == PROFILE_EVERY_N_TURNS and log.stats()["users"] == 1
+        log.close()
+
+
+if __name__ == "__main__":
+    test_append_is_queued_and_indexed_by_user()
+    test_idle_log_is_fsynced_after_the_interval()
+    test_segments_rotate_and_reload()
+    test_react_agent_logs_turns_and_extracts_profiles()
+    print("All tests passed!")
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for the query embedding cache.
+"""
+
+import sys
+import os
+import tempfile
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+import numpy as np
+from chotbot.rag.embedding_cache import EmbeddingCache, normalize_text
+
+
+def test_normalized_keys_hit():
+    """Whitespace and full-width variants share one entry."""
+    cache = EmbeddingCache(max_entries=4, persist_path="")
+    cache.put("  今天 天气\n怎么样 ", np.ones(4))
+
+    assert normalize_text("ＡＢＣ  def") == "ABC def"
+    assert cache.get("今天 天气 怎么样") is not None
+    assert cache.get("明天天气") is None
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1 and stats["hit_rate"] == 0.5
+
+
+def test_lru_eviction_by_count_and_bytes():
+    """Least recently used entries are evicted first under either cap."""
+    cache = EmbeddingCache(max_entries=2, persist_path="")
+    cache.put("a", np.zeros(4))
+    cache.put("b", np.zeros(4))
+    cache.get("a")
+    cache.put("c", np.zeros(4))
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+
+    # 每个向量 16 字节，内存上限只够放两个
+    cache = EmbeddingCache(max_entries=100, max_bytes=32, persist_path="")
+    for key in ("x", "y", "z"):
+        cache.put(key, np.zeros(4))
+    assert cache.stats()["entries"] == 2 and cache.stats()["bytes"] == 32
+    assert cache.get("x") is None
+
+
+def test_cached_vectors_are_read_only():
+    """Callers cannot mutate a cached embedding in place."""
+    cache = EmbeddingCache(max_entries=2, persist_path="")
+    vector = cache.put("q", np.ones(3))
+    try:
+        vector[0] = 5.0
+    except ValueError:
+        return
+    raise AssertionError("Expected cached vector to be read-only")
+
+
+def test_save_and_load():
+    """Persisted entries are restored in LRU order."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "query_cache.npz")
+        cache = EmbeddingCache(max_entries=2, persist_path=path)
+        cache.put("第一个", np.arange(4))
+        cache.put("second", np.ones(4))
+        cache.save()
+
+        reopened = EmbeddingCache(max_entries=2, persist_path=path)
+        np.testing.assert_array_equal(reopened.get("第一个"), np.arange(4))
+        reopened.put("third", np.zeros(4))
+        assert reopened.get("second") is None
+
+
+if __name__ == "__main__":
+    test_normalized_keys_hit()
+    test_lru_eviction_by_count_and_bytes()
+    test_cached_vectors_are_read_only()
+    test_save_and_load()
+    print("All embedding cache tests passed!")
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for batch fund queries and the vectorized NAV summary.
+"""
+
+import sys
+import os
+import time
+import threading
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+import numpy as np
+from chotbot.mcp.tools.fund import FundTool, summarize_nav_history
+
+NAVS = {"2024-06-03": "1.0", "2024-06-04": "1.1", "2024-06-05": "0.99", "2024-06-06": "1.2"}
+
+
+class _Response:
+    def __init__(self, body):
+        self.body = body
+
+    def json(self):
+        return self.body
+
+
+class _SlowFundAPI:
+    """Answers every request after 0.1s; fund ``bad`` does not exist."""
+
+    def __init__(self):
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    def get(self, url):
+        with self.lock:
+            self.requests += 1
+        time.sleep(0.1)
+        code = url.split("fundCode=")[1].split("&")[0]
+        if code == "bad":
+            return _Response({"code": 1, "message": "not found"})
+        if "/nav" in url:
+            # 接口按日期倒序返回
+            items = [{"date": date, "netWorth": nav} for date, nav in sorted(NAVS.items(), reverse=True)]
+            return _Response({"code": 0, "data": {"list": items}})
+        return _Response({"code": 0, "data": {"fundCode": code, "name": f"基金{code}", "type": "混合型"}})
+
+
+def _tool():
+    tool = FundTool()
+    tool.http = _SlowFundAPI()
+    return tool
+
+
+def test_summary_metrics():
+    """Return, drawdown and volatility are computed over the date-sorted NAVs."""
+    history = [{"日期": date, "单位净值": nav} for date, nav in reversed(list(NAVS.items()))]
+    history.append({"日期": "2024-06-07", "单位净值": ""})
+    summary = summarize_nav_history(history)
+
+    navs = np.array([1.0, 1.1, 0.99, 1.2])
+    volatility = np.std(navs[1:] / navs[:-1] - 1, ddof=1) * np.sqrt(252)
+    assert summary["起始日期"] == "2024-06-03" and summary["结束日期"] == "2024-06-06"
+    assert summary["数据条数"] == 4
+    assert summary["区间收益率"] == "20.00%"
+    assert summary["最大回撤"] == "-10.00%"
+    assert summary["年化波动率"] == f"{volatility * 100:.2f}%"
+    assert "error" in summarize_nav_history(history[:1])
+
+
+def test_batch_queries_run_concurrently():
+    """Four funds take about one request's latency; duplicates are fetched once."""
+    tool = _tool()
+    started = time.perf_counter()
+    infos = tool.get_funds_basic_info(["000001", "000002", "000003", "000004", "000001 "])
+    assert time.perf_counter() - started < 0.3
+    assert list(infos) == ["000001", "000002", "000003", "000004"]
+    assert infos["000002"]["基金名称"] == "基金000002"
+    assert tool.http.requests == 4
+
+    histories = tool.get_funds_net_worth_history(["000001", "bad"], limit=4)
+    assert histories["000001"]["数据条数"] == 4
+    assert "error" in histories["bad"]
+
+
+def test_compare_funds_in_one_call():
+    """Details and histories are fetched together and summarized per fund."""
+    tool = _tool()
+    started = time.perf_counter()
+    result = tool.compare_funds(["000001", "000002", "bad"])
+    assert time.perf_counter() - started < 0.3
+
+    comparison = result["基金对比"]
+    assert comparison["000001"]["基金名称"] == "基金000001"
+    assert comparison["000001"]["区间收益率"] == "20.00%"
+    assert "error" in comparison["bad"]
+    assert result["按区间收益率排序"] == ["000001", "000002"]
+
+
+if __name__ == "__main__":
+    test_summary_metrics()
+    test_batch_queries_run_concurrently()
+    test_compare_funds_in_one_call()
+    print("All tests passed!")
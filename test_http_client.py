@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for the pooled HTTP client (timeouts, retry/backoff, circuit
+breaking) used by the weather and fund tools, against a local stub server.
+"""
+
+import sys
+import os
+import json
+import time
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from chotbot.utils.http import HTTPClient, CircuitBreaker, CircuitOpenError
+from chotbot.mcp.tools.fund import FundTool
+from chotbot.mcp.tools.weather import WeatherTool
+
+FUND_DETAIL = {"code": 0, "data": {"fundCode": "000001", "name": "华夏成长", "netWorth": "1.234"}}
+WEATHER = {"name": "Beijing", "main": {"temp": 20, "humidity": 40, "pressure": 1013},
+           "weather": [{"description": "晴"}], "wind": {"speed": 3}}
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """Replies from a per-path script of ``(status, delay, body)``; the last entry repeats."""
+    protocol_version = "HTTP/1.1"
+    scripts = {}
+    hits = []
+    lock = threading.Lock()
+
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        with _StubHandler.lock:
+            _StubHandler.hits.append((path, self.client_address[1]))
+            script = _StubHandler.scripts[path]
+            status, delay, body = script.pop(0) if len(script) > 1 else script[0]
+        time.sleep(delay)
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+def _stub_server(scripts):
+    _StubHandler.scripts = scripts
+    _StubHandler.hits = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def _client(**kwargs):
+    options = {"timeout": (1, 0.2), "max_retries": 2, "backoff_base": 0.01, "backoff_max": 0.02}
+    options.update(kwargs)
+    return HTTPClient("stub", **options)
+
+
+def test_retries_transient_errors_over_pooled_connections():
+    """503s are retried with backoff, keep-alive connections are reused and 404 is not retried."""
+    server, url = _stub_server({
+        "/v1/fund/detail": [(503, 0, {}), (503, 0, {}), (200, 0, FUND_DETAIL)],
+        "/missing": [(404, 0, {})],
+    })
+    try:
+        tool = FundTool()
+        tool.base_url = url + "/"
+        tool.http = _client()
+        info = tool.get_fund_basic_info("000001")
+        assert info["基金名称"] == "华夏成长"
+        assert len(_StubHandler.hits) == 3
+        # 三次请求复用同一个连接
+        assert len({port for _, port in _StubHandler.hits}) == 1
+        assert tool.http.stats()["retries"] == 2
+
+        client = _client()
+        try:
+            client.get(url + "/missing")
+            assert False, "404 should raise"
+        except Exception as e:
+            assert e.response.status_code == 404
+        assert len(_StubHandler.hits) == 4
+        assert client.breaker.state == CircuitBreaker.CLOSED
+    finally:
+        server.shutdown()
+
+
+def test_read_timeout_is_bounded():
+    """A hung upstream costs at most (retries + 1) read timeouts, then the tool reports an error."""
+    server, url = _stub_server({"/weather": [(200, 1.0, WEATHER)]})
+    try:
+        tool = WeatherTool()
+        tool.api_key = "key"
+        tool.base_url = url + "/weather"
+        tool.http = _client(max_retries=1)
+        started = time.perf_counter()
+        result = tool.get_weather_by_city("北京")
+        assert "error" in result
+        assert time.perf_counter() - started < 0.8
+        assert tool.http.stats()["failures"] == 1
+    finally:
+        server.shutdown()
+
+
+def test_circuit_opens_and_recovers():
+    """Consecutive failures open the circuit; after the reset timeout one trial call closes it."""
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30, clock=lambda: now[0])
+    server, url = _stub_server({"/weather": [(500, 0, {}), (500, 0, {}), (200, 0, WEATHER)]})
+    try:
+        client = _client(max_retries=0, breaker=breaker)
+        for _ in range(2):
+            try:
+                client.get(url + "/weather")
+            except Exception as e:
+                assert not isinstance(e, CircuitOpenError)
+        assert breaker.state == CircuitBreaker.OPEN
+
+        try:
+            client.get(url + "/weather")
+            assert False, "open circuit should fail fast"
+        except CircuitOpenError:
+            pass
+        assert len(_StubHandler.hits) == 2
+
+        now[0] = 31
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        assert client.get(url + "/weather").json()["name"] == "Beijing"
+        assert breaker.state == CircuitBreaker.CLOSED
+        assert client.stats()["rejected"] == 1
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    test_retries_transient_errors_over_pooled_connections()
+    test_read_timeout_is_bounded()
+    test_circuit_opens_and_recovers()
+    print("All tests passed!")
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for the async LLMClient against a local OpenAI-compatible stub server.
+"""
+
+import sys
+import os
+import json
+import time
+import asyncio
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from chotbot.core.llm_client import LLMClient
+from chotbot.utils.config import Config
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with _StubHandler.lock:
+            _StubHandler.active += 1
+            _StubHandler.peak = max(_StubHandler.peak, _StubHandler.active)
+        time.sleep(0.1)
+        with _StubHandler.lock:
+            _StubHandler.active -= 1
+
+        text = body["messages"][-1]["content"]
+        if body.get("stream"):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            if body.get("tools"):
+                # 模拟 end_tool 调用：参数分多个片段到达
+                arguments = json.dumps({"final_answer": text})
+                deltas = [{"content": "思考"},
+                          {"tool_calls": [{"index": 0, "id": "call_1", "type": "function",
+                                           "function": {"name": "end_tool", "arguments": ""}}]}]
+                deltas += [{"tool_calls": [{"index": 0, "function": {"arguments": arguments[i:i + 7]}}]}
+                           for i in range(0, len(arguments), 7)]
+            else:
+                deltas = [{"content": text[:2]}, {"content": text[2:]}]
+            for delta in deltas + [{}]:
+                chunk = {"id": "c", "object": "chat.completion.chunk", "created": 0, "model": "stub",
+                         "choices": [{"index": 0, "delta": delta, "finish_reason": None if delta else "stop"}]}
+                self._write_chunk(f"data: {json.dumps(chunk)}\n\n")
+            self._write_chunk("data: [DONE]\n\n")
+            self._write_chunk("")
+            return
+
+        payload = json.dumps({
+            "id": "c", "object": "chat.completion", "created": 0, "model": "stub",
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": f"echo: {text}"}}]
+        }).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _write_chunk(self, data):
+        encoded = data.encode("utf-8")
+        self.wfile.write(f"{len(encoded):x}\r\n".encode("ascii") + encoded + b"\r\n")
+
+    def log_message(self, *args):
+        pass
+
+
+def _start_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    Config.OPENAI_BASE_URL = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    Config.OPENAI_API_KEY = Config.OPENAI_API_KEY or "test-key"
+    return server
+
+
+def test_async_concurrency_is_limited():
+    """Concurrent agenerate calls share one pool and respect LLM_MAX_CONCURRENCY."""
+    server = _start_server()
+    Config.LLM_MAX_CONCURRENCY = 2
+    _StubHandler.peak = 0
+
+    async def main():
+        client = LLMClient()
+        started = time.perf_counter()
+        answers = await asyncio.gather(*[
+            client.agenerate([{"role": "user", "content": f"q{i}"}]) for i in range(6)
+        ])
+        elapsed = time.perf_counter() - started
+        await LLMClient.aclose()
+        return answers, elapsed
+
+    try:
+        answers, elapsed = asyncio.run(main())
+    finally:
+        server.shutdown()
+        LLMClient._client = None
+
+    assert answers == [f"echo: q{i}" for i in range(6)]
+    assert _StubHandler.peak == 2
+    # 6 个请求、并发 2、每个 0.1 秒：至少 3 轮
+    assert elapsed >= 0.3
+
+
+def test_async_stream():
+    """agenerate_stream yields content deltas as they arrive."""
+    server = _start_server()
+
+    async def main():
+        client = LLMClient()
+        pieces = [piece async for piece in client.agenerate_stream([{"role": "user", "content": "你好世界"}])]
+        await LLMClient.aclose()
+        return pieces
+
+    try:
+        assert asyncio.run(main()) == ["你好", "世界"]
+    finally:
+        server.shutdown()
+        LLMClient._client = None
+
+
+def test_tool_call_stream():
+    """generate_with_tools_stream forwards content and assembles tool calls."""
+    server = _start_server()
+    try:
+        events = list(LLMClient().generate_with_tools_stream([{"role": "user", "content": "北京晴"}], tools=[
+            {"type": "function", "function": {"name": "end_tool", "parameters": {"type": "object"}}}
+        ]))
+    finally:
+        server.shutdown()
+        LLMClient._client = None
+
+    assert events[0] == {"type": "content", "delta": "思考"}
+    fragments = [event["arguments_delta"] for event in events if event["type"] == "tool_call"]
+    assert len(fragments) > 2
+    done = events[-1]
+    assert done["type"] == "done" and done["content"] == "思考"
+    assert done["tool_calls"][0].function.name == "end_tool"
+    assert json.loads(done["tool_calls"][0].function.arguments) == {"final_answer": "北京晴"}
+
+
+def test_stream_does_not_hold_a_slot_while_consumed():
+    """An open or abandoned stream leaves its concurrency slot free for other calls."""
+    server = _start_server()
+    Config.LLM_MAX_CONCURRENCY = 1
+    LLMClient._client = None
+    try:
+        client = LLMClient()
+        chunks = client.generate_stream([{"role": "user", "content": "你好世界"}])
+        assert next(chunks) == "你好"
+        # 流尚未读完时，其他同步调用不会被阻塞
+        answers = []
+        caller = threading.Thread(target=lambda: answers.append(client.generate([{"role": "user", "content": "q"}])),
+                                  daemon=True)
+        caller.start()
+        caller.join(5)
+        assert answers == ["echo: q"]
+
+        events = client.generate_with_tools_stream([{"role": "user", "content": "北京晴"}], tools=[])
+        assert next(events)["type"] == "content"
+        events.close()
+        chunks.close()
+        assert LLMClient._semaphore.acquire(timeout=1)
+        LLMClient._semaphore.release()
+    finally:
+        server.shutdown()
+        LLMClient._client = None
+
+
+if __name__ == "__main__":
+    test_async_concurrency_is_limited()
+    test_async_stream()
+    test_tool_call_stream()
+    test_stream_does_not_hold_a_slot_while_consumed()
+    print("All LLM client tests passed!")
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for concurrent tool execution within one ReAct turn.
+"""
+
+import sys
+import os
+import time
+import json
+import threading
+from unittest import mock
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from openai.types.chat import ChatCompletionMessageFunctionToolCall
+from openai.types.chat.chat_completion_message_function_tool_call import Function
+from chotbot.mcp.tools.tool_manager import ToolManager
+from chotbot.utils.config import Config
+
+
+def _call(call_id, query):
+    return ChatCompletionMessageFunctionToolCall(
+        id=call_id, type="function",
+        function=Function(name="search", arguments=json.dumps({"query": query}))
+    )
+
+
+class _SlowSearch:
+    """Search tool whose latency is encoded in the query."""
+
+    def __init__(self):
+        self.running = 0
+        self.max_running = 0
+        self._lock = threading.Lock()
+
+    def run(self, query, max_results=3):
+        with self._lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        try:
+            time.sleep(float(query))
+        finally:
+            with self._lock:
+                self.running -= 1
+        if query == "0.05":
+            raise RuntimeError("boom")
+        return [{"title": query}]
+
+
+def _manager():
+    manager = ToolManager()
+    manager.tools["search"] = _SlowSearch()
+    manager.tool_timeouts["search"] = 0.5
+    return manager
+
+
+def test_tool_calls_run_concurrently_in_completion_order():
+    """Three calls take about as long as the slowest and complete fastest-first."""
+    manager = _manager()
+    calls = [_call("a", "0.3"), _call("b", "0.1"), _call("c", "0.2")]
+
+    started = time.perf_counter()
+    results = list(manager.execute_tool_calls(calls))
+    elapsed = time.perf_counter() - started
+
+    assert [index for index, _ in results] == [1, 2, 0]
+    assert all(result["status"] == "success" for _, result in results)
+    assert results[0][1]["tool_call_id"] == "b"
+    assert elapsed < 0.5
+
+
+def test_timeouts_and_errors_are_reported_per_call():
+    """A slow call times out and a failing call errors without affecting the others."""
+    manager = _manager()
+    calls = [_call("slow", "2"), _call("fast", "0.01"), _call("bad", "0.05")]
+
+    started = time.perf_counter()
+    results = dict(manager.execute_tool_calls(calls))
+    elapsed = time.perf_counter() - started
+
+    assert results[0]["status"] == "timeout" and results[0]["tool_call_id"] == "slow"
+    assert results[1]["status"] == "success"
+    assert results[2]["status"] == "error"
+    assert elapsed < 1.0
+
+
+def test_timeout_starts_when_the_call_runs():
+    """Calls waiting for a worker do not time out; each gets its full timeout once running."""
+    manager = _manager()
+    calls = [_call(str(i), "0.3") for i in range(3)]
+
+    with mock.patch.object(Config, "TOOL_MAX_WORKERS_PER_REQUEST", 1):
+        results = dict(manager.execute_tool_calls(calls))
+
+    # 三个调用依次执行，总时长超过单个调用的超时，但都不超时
+    assert [results[i]["status"] for i in range(3)] == ["success"] * 3
+    assert manager.tools["search"].max_running == 1
+
+
+def test_timed_out_calls_keep_their_worker_slot():
+    """A timed-out call still counts against the per-request limit until it finishes."""
+    manager = _manager()
+    manager.tool_timeouts["search"] = 0.2
+    calls = [_call("hung", "1"), _call("a", "0.01"), _call("b", "0.01"), _call("c", "0.01")]
+
+    with mock.patch.object(Config, "TOOL_MAX_WORKERS_PER_REQUEST", 2), mock.patch.object(Config, "TOOL_QUEUE_TIMEOUT", 5):
+        results = dict(manager.execute_tool_calls(calls))
+
+    assert results[0]["status"] == "timeout"
+    assert [results[i]["status"] for i in (1, 2, 3)] == ["success"] * 3
+    assert manager.tools["search"].max_running == 2
+
+    # 本轮的线程都被未结束的调用占用时，剩余调用等待超时后返回
+    with mock.patch.object(Config, "TOOL_MAX_WORKERS_PER_REQUEST", 1), mock.patch.object(Config, "TOOL_QUEUE_TIMEOUT", 0.4):
+        started = time.perf_counter()
+        results = dict(manager.execute_tool_calls([_call("hung", "1"), _call("a", "0.01")]))
+        elapsed = time.perf_counter() - started
+
+    assert results[0]["status"] == "timeout" and results[1]["status"] == "timeout"
+    assert "did not start" in results[1]["error"]
+    assert elapsed < 0.8
+
+
+if __name__ == "__main__":
+    test_tool_calls_run_concurrently_in_completion_order()
+    test_timeouts_and_errors_are_reported_per_call()
+    test_timeout_starts_when_the_call_runs()
+    test_timed_out_calls_keep_their_worker_slot()
+    print("All parallel tool tests passed!")
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for batched document embedding in RAGManager.
+"""
+
+import sys
+import os
+from unittest import mock
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+import numpy as np
+from chotbot.rag.rag_manager import RAGManager
+from chotbot.utils.config import Config
+
+
+class _FakeSentenceTransformer:
+    """Records encode calls and returns one float32 row per text."""
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.calls = []
+        self.pools = []
+        self.stopped = []
+        self.outputs = []
+
+    def _embed(self, texts):
+        output = np.arange(len(texts) * 4, dtype=np.float32).reshape(len(texts), 4) + 1
+        self.outputs.append(output)
+        return output
+
+    def encode(self, texts, batch_size=32, convert_to_numpy=True, show_progress_bar=None):
+        self.calls.append(("encode", list(texts), batch_size))
+        return self._embed(texts)
+
+    def start_multi_process_pool(self, target_devices=None):
+        pool = {"devices": target_devices}
+        self.pools.append(pool)
+        return pool
+
+    def encode_multi_process(self, texts, pool, batch_size=32):
+        self.calls.append(("encode_multi_process", list(texts), batch_size))
+        if self.fail:
+            raise RuntimeError("worker died")
+        return self._embed(texts)
+
+    def stop_multi_process_pool(self, pool):
+        self.stopped.append(pool)
+
+
+class _RecordingStore:
+    def __init__(self):
+        self.added = []
+
+    def add_documents(self, documents, embeddings, metadatas=None, ids=None):
+        self.added.append((documents, embeddings))
+
+
+def _manager(model):
+    manager = RAGManager.__new__(RAGManager)
+    manager.embedding_model = model
+    manager.vector_store = _RecordingStore()
+    return manager
+
+
+def test_documents_are_encoded_in_one_batched_call():
+    """One encode call with the batch size; the float32 matrix reaches the store unchanged."""
+    model = _FakeSentenceTransformer()
+    manager = _manager(model)
+    texts = [f"片段 {i}" for i in range(5)]
+
+    with mock.patch.object(Config, "RAG_EMBEDDING_WORKERS", 1):
+        manager.add_documents(texts, batch_size=2)
+
+    assert model.calls == [("encode", texts, 2)]
+    documents, embeddings = manager.vector_store.added[0]
+    assert documents == texts
+    # 直接传入模型输出的矩阵，没有转换成列表
+    assert isinstance(embeddings, np.ndarray) and embeddings.dtype == np.float32
+    assert embeddings.shape == (5, 4) and embeddings is model.outputs[0]
+
+    with mock.patch.object(Config, "RAG_EMBEDDING_BATCH_SIZE", 16), mock.patch.object(Config, "RAG_EMBEDDING_WORKERS", 1):
+        manager.add_documents(["a"])
+    assert model.calls[-1] == ("encode", ["a"], 16)
+
+
+def test_large_batches_use_the_multi_process_pool():
+    """With several workers large batches go through the pool, which is always stopped."""
+    model = _FakeSentenceTransformer()
+    manager = _manager(model)
+    texts = [f"doc {i}" for i in range(4)]
+
+    with mock.patch.object(Config, "RAG_EMBEDDING_WORKERS", 3), mock.patch.object(Config, "RAG_EMBEDDING_POOL_MIN_DOCS", 4):
+        manager.add_documents(texts, batch_size=8)
+        # 数量不足 RAG_EMBEDDING_POOL_MIN_DOCS 时不启动进程池
+        manager.add_documents(texts[:3], batch_size=8)
+
+    assert model.calls == [("encode_multi_process", texts, 8), ("encode", texts[:3], 8)]
+    assert model.pools == [{"devices": ["cpu"] * 3}] and model.stopped == model.pools
+    embeddings = manager.vector_store.added[0][1]
+    assert isinstance(embeddings, np.ndarray) and embeddings.dtype == np.float32
+
+    failing = _FakeSentenceTransformer(fail=True)
+    manager = _manager(failing)
+    with mock.patch.object(Config, "RAG_EMBEDDING_WORKERS", 2), mock.patch.object(Config, "RAG_EMBEDDING_POOL_MIN_DOCS", 1):
+        try:
+            manager.add_documents(["x", "y"])
+        except RuntimeError:
+            pass
+        else:
+            raise AssertionError("Expected the encoding error to propagate")
+    assert failing.stopped == failing.pools and len(failing.pools) == 1
+    assert manager.vector_store.added == []
+
+
+if __name__ == "__main__":
+    test_documents_are_encoded_in_one_batched_call()
+    test_large_batches_use_the_multi_process_pool()
+    print("All RAG embedding tests passed!")
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for incremental document loading.
+"""
+
+import sys
+import os
+import time
+import tempfile
+from unittest import mock
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from chotbot.utils import rag_loader
+from chotbot.utils.rag_loader import scan_document_changes, iter_document_changes, commit_document_changes
+
+
+def _write(path, content):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
+
+
+def test_scan_detects_added_modified_deleted():
+    """Single-pass scan reports each kind of change."""
+    with tempfile.TemporaryDirectory() as doc_dir:
+        a = os.path.join(doc_dir, "a.md")
+        b = os.path.join(doc_dir, "sub", "b.txt")
+        os.makedirs(os.path.dirname(b))
+        _write(a, "第一份文档。")
+        _write(b, "第二份文档。")
+        _write(os.path.join(doc_dir, "image.png"), "not a document")
+
+        changes = scan_document_changes(doc_dir, loaded={})
+        assert sorted(changes["added"]) == sorted([a, b])
+        assert changes["modified"] == [] and changes["deleted"] == []
+        records = changes["records"]
+
+        # 没有任何变化
+        changes = scan_document_changes(doc_dir, loaded=records)
+        assert changes["added"] == changes["modified"] == changes["deleted"] == []
+
+        # 修改 a，删除 b
+        _write(a, "第一份文档，已经修改。")
+        os.remove(b)
+        changes = scan_document_changes(doc_dir, loaded=records)
+        assert changes["modified"] == [a]
+        assert changes["deleted"] == [b]
+        assert b not in changes["records"]
+
+
+def test_touch_without_content_change_is_not_modified():
+    """An mtime change with identical content is re-hashed but not reported."""
+    with tempfile.TemporaryDirectory() as doc_dir:
+        a = os.path.join(doc_dir, "a.md")
+        _write(a, "内容不变。")
+        records = scan_document_changes(doc_dir, loaded={})["records"]
+
+        later = time.time() + 10
+        os.utime(a, (later, later))
+        changes = scan_document_changes(doc_dir, loaded=records)
+        assert changes["modified"] == []
+        assert changes["records"][a]["mtime"] != records[a]["mtime"]
+
+
+def test_legacy_hash_records_are_understood():
+    """Records written as bare MD5 strings still count as loaded."""
+    with tempfile.TemporaryDirectory() as doc_dir:
+        a = os.path.join(doc_dir, "a.md")
+        _write(a, "旧格式记录。")
+        md5 = scan_document_changes(doc_dir, loaded={})["records"][a]["md5"]
+
+        changes = scan_document_changes(doc_dir, loaded={a: md5})
+        assert changes["added"] == changes["modified"] == []
+
+
+def test_iter_document_changes_parses_in_parallel():
+    """Changed files are chunked (in a process pool) and deletions come first."""
+    with tempfile.TemporaryDirectory() as doc_dir:
+        paths = []
+        for i in range(3):
+            path = os.path.join(doc_dir, "{}.md".format(i))
+            _write(path, "文档{}的第一句。文档{}的第二句。".format(i, i))
+            paths.append(path)
+
+        changes = scan_document_changes(doc_dir, loaded={})
+        changes["deleted"] = ["/gone.md"]
+        results = list(iter_document_changes(changes, workers=2))
+
+        assert results[0] == {"path": "/gone.md", "status": "deleted", "chunks": []}
+        parsed = {r["path"]: r for r in results[1:]}
+        assert sorted(parsed) == sorted(paths)
+        for path, result in parsed.items():
+            assert result["status"] == "added"
+            assert result["chunks"][0]["metadata"]["source"] == path
+
+
+def test_full_reload_prunes_records_of_missing_files():
+    """A full reload drops tracked files that are gone, so a re-added copy is loaded again."""
+    with tempfile.TemporaryDirectory() as tmp:
+        doc_dir = os.path.join(tmp, "doc")
+        os.makedirs(doc_dir)
+        a = os.path.join(doc_dir, "a.md")
+        gone = os.path.join(doc_dir, "gone.md")
+        other = os.path.join(tmp, "other", "c.md")
+        _write(a, "保留的文档。")
+        _write(gone, "稍后删除的文档。")
+
+        with mock.patch.object(rag_loader, "TRACK_FILE", os.path.join(tmp, "loaded.json")):
+            changes = scan_document_changes(doc_dir, loaded={})
+            rag_loader.save_loaded_files({other: {"md5": "x", "mtime": 1, "size": 1}})
+            commit_document_changes(changes)
+            stat = os.stat(gone)
+            os.remove(gone)
+
+            # 全量加载：deleted 为空，但 gone 的记录也要删除，其他目录的记录保留
+            changes = scan_document_changes(doc_dir, loaded={})
+            assert changes["deleted"] == []
+            commit_document_changes(changes)
+            assert sorted(rag_loader.load_loaded_files()) == sorted([a, other])
+
+            # 以相同的 mtime 和大小重新放回，视为新增文件
+            _write(gone, "稍后删除的文档。")
+            os.utime(gone, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+            assert scan_document_changes(doc_dir)["added"] == [gone]
+
+
+if __name__ == "__main__":
+    test_scan_detects_added_modified_deleted()
+    test_touch_without_content_change_is_not_modified()
+    test_legacy_hash_records_are_understood()
+    test_iter_document_changes_parses_in_parallel()
+    test_full_reload_prunes_records_of_missing_files()
+    print("All RAG loader tests passed!")
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for overlapping the ReAct plan request with the first action turn.
+"""
+
+import sys
+import os
+import time
+import json
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from openai.types.chat import ChatCompletionMessageFunctionToolCall
+from openai.types.chat.chat_completion_message_function_tool_call import Function
+from chotbot.core.react_agent import ReActAgent
+
+
+def _call(call_id, name, arguments):
+    return ChatCompletionMessageFunctionToolCall(
+        id=call_id, type="function",
+        function=Function(name=name, arguments=json.dumps(arguments, ensure_ascii=False))
+    )
+
+
+class _ScriptedLLM:
+    """Plans slowly and answers with one lookup followed by end_tool."""
+
+    def __init__(self, plan_delay=0.2, turn_delay=0.2):
+        self.plan_delay = plan_delay
+        self.turn_delay = turn_delay
+        self.plan_requests = 0
+        self.turns = 0
+
+    def generate(self, messages):
+        self.plan_requests += 1
+        time.sleep(self.plan_delay)
+        return "1. look it up 2. answer"
+
+    def _turn(self):
+        time.sleep(self.turn_delay)
+        self.turns += 1
+        if self.turns == 1:
+            return "looking up", [_call("a", "lookup", {"query": "x"})]
+        return None, [_call("b", "end_tool", {"final_answer": "done"})]
+
+    def generate_with_tools(self, messages, tools):
+        return self._turn()
+
+    def generate_with_tools_stream(self, messages, tools):
+        content, tool_calls = self._turn()
+        if content:
+            yield {"type": "content", "delta": content}
+        yield {"type": "done", "content": content, "tool_calls": tool_calls}
+
+
+class _Tools:
+    def get_tool_definitions(self):
+        return []
+
+    def execute_tool_call(self, tool_call):
+        arguments = json.loads(tool_call.function.arguments)
+        return {"tool": "end_tool", "status": "completed", "result": arguments["final_answer"]}
+
+    def execute_tool_calls(self, tool_calls):
+        for index, tool_call in enumerate(tool_calls):
+            yield index, {"tool": tool_call.function.name, "status": "success", "result": "x"}
+
+
+def test_parallel_plan_overlaps_first_turn():
+    """The plan arrives before the answer without adding its latency up front."""
+    llm = _ScriptedLLM()
+    agent = ReActAgent(llm, _Tools())
+
+    started = time.perf_counter()
+    events = list(agent.run_stream("解释一下量子计算", plan_mode="parallel"))
+    elapsed = time.perf_counter() - started
+
+    types = [event["type"] for event in events]
+    assert llm.plan_requests == 1
+    assert types.count("plan") == 1
+    assert types.index("plan") < types.index("final_answer")
+    assert events[-1] == {"type": "final_answer", "step": 2, "content": "done"}
+    # 计划 0.2s 与两轮各 0.2s 的行动重叠，总耗时约为两轮行动
+    assert elapsed < 0.55
+
+    llm = _ScriptedLLM()
+    started = time.perf_counter()
+    blocking = list(ReActAgent(llm, _Tools()).run_stream("解释一下量子计算", plan_mode="blocking"))
+    assert time.perf_counter() - started >= 0.6
+    assert blocking[0]["type"] == "plan"
+
+
+def test_simple_intents_and_run_skip_the_plan():
+    """Weather queries and the non-streaming ``run`` never request a plan."""
+    llm = _ScriptedLLM()
+    events = list(ReActAgent(llm, _Tools()).run_stream("北京天气怎么样", plan_mode="blocking"))
+    assert llm.plan_requests == 0
+    assert "plan" not in [event["type"] for event in events]
+
+    llm = _ScriptedLLM(turn_delay=0)
+    final_answer, thinking_steps = ReActAgent(llm, _Tools()).run("解释一下量子计算")
+    assert llm.plan_requests == 0
+    assert final_answer == "done"
+    assert [step["type"] for step in thinking_steps] == ["action", "final_answer"]
+    assert thinking_steps[0]["action"] == 'lookup({"query": "x"})'
+    assert thinking_steps[0]["thought"] == "looking up"
+
+
+if __name__ == "__main__":
+    test_parallel_plan_overlaps_first_turn()
+    test_simple_intents_and_run_skip_the_plan()
+    print("All tests passed!")
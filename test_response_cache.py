@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for the semantic response cache.
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+import json
+import zlib
+import asyncio
+from unittest import mock
+import tempfile
+import numpy as np
+from openai.types.chat import ChatCompletionMessageFunctionToolCall
+from openai.types.chat.chat_completion_message_function_tool_call import Function
+from chotbot.core.response_cache import SemanticResponseCache, content_terms
+from chotbot.core.react_agent import ReActAgent
+from chotbot.core.conversation_log import ConversationLog
+from chotbot.mcp.processor import MCPProcessor
+from chotbot.intent import quick_intent
+from chotbot.utils.config import Config
+
+
+def _char_embedding(text):
+    """Bag-of-characters embedding: word order and filler words barely move it."""
+    vector = np.zeros(256)
+    for char in text:
+        if not char.isspace() and char not in "？?。，!！":
+            vector[zlib.crc32(char.encode("utf-8")) % 256] += 1.0
+    return vector
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _make_cache(**kwargs):
+    clock = _Clock()
+    ttls = {intent: 100 for intent in (quick_intent.WEATHER, quick_intent.FUND, quick_intent.STOCK,
+                                       quick_intent.NEWS, quick_intent.GENERAL)}
+    ttls[quick_intent.WEATHER] = 10
+    ttls[quick_intent.DOCS] = 1000
+    kwargs.setdefault("threshold", 0.7)
+    return SemanticResponseCache(_char_embedding, ttls=ttls, clock=clock, **kwargs), clock
+
+
+def test_quick_intent():
+    """Keyword classification picks the most specific intent."""
+    assert quick_intent.classify("今天北京天气怎么样") == quick_intent.WEATHER
+    assert quick_intent.classify("基金161005的最新净值") == quick_intent.FUND
+    assert quick_intent.classify("什么是向量数据库") == quick_intent.DOCS
+    assert quick_intent.classify("帮我写一首诗") == quick_intent.GENERAL
+
+
+def test_paraphrase_hits_and_other_city_misses():
+    """Reworded questions hit; a different city never reuses the answer."""
+    cache, _ = _make_cache()
+    cache.put("今天北京天气怎么样", "北京晴，25度")
+
+    hit = cache.get("北京今天天气如何？")
+    assert hit and hit["answer"] == "北京晴，25度" and hit["intent"] == quick_intent.WEATHER
+    assert cache.get("今天上海天气怎么样") is None
+    assert cache.get("明天北京天气怎么样") is None
+    assert content_terms("基金000001净值") != content_terms("基金000002净值")
+
+
+def test_per_intent_ttl():
+    """Weather answers expire before docs answers."""
+    cache, clock = _make_cache()
+    cache.put("今天北京天气怎么样", "晴")
+    cache.put("什么是向量数据库", "一种存储向量的数据库")
+
+    clock.now = 50
+    assert cache.get("今天北京天气怎么样") is None
+    assert cache.get("向量数据库是什么") is not None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_size_bounded_eviction_and_stats():
+    """The least recently used entry is evicted and counters are reported."""
+    cache, _ = _make_cache(max_entries=2)
+    cache.put("问题一", "答案一")
+    cache.put("问题二", "答案二")
+    assert cache.get("问题一")
+    cache.put("问题三", "答案三")
+
+    assert cache.get("问题二") is None
+    assert cache.get("问题三")["answer"] == "答案三"
+    stats = cache.stats()
+    assert stats["entries"] == 2 and stats["evictions"] == 1
+    assert stats["hits"] == 2 and stats["misses"] == 1
+    assert abs(stats["hit_rate"] - 2 / 3) < 1e-9
+    assert stats["by_intent"][quick_intent.GENERAL]["hits"] == 2
+
+
+def test_zero_ttl_disables_intent():
+    """Intents with a zero TTL are never cached."""
+    cache, _ = _make_cache()
+    cache.ttls[quick_intent.STOCK] = 0
+    cache.put("茅台股价多少", "1700")
+    assert cache.get("茅台股价多少") is None
+
+
+class _ToolLLM:
+    """Asks which city for weather questions and answers everything else via end_tool."""
+
+    def __init__(self):
+        self.turns = 0
+
+    def generate_with_tools(self, messages, tools):
+        self.turns += 1
+        question = messages[-1]["content"]
+        if "天气" in question and "北京" not in question:
+            name, arguments = "ask_clarification", {"question": "哪个城市?"}
+        else:
+            name, arguments = "end_tool", {"final_answer": f"答：{question}"}
+        return None, [ChatCompletionMessageFunctionToolCall(
+            id="c", type="function", function=Function(name=name, arguments=json.dumps(arguments, ensure_ascii=False))
+        )]
+
+
+class _Tools:
+    def get_tool_definitions(self):
+        return []
+
+    def execute_tool_call(self, tool_call):
+        arguments = json.loads(tool_call.function.arguments)
+        if tool_call.function.name == "ask_clarification":
+            return {"tool": "ask_clarification", "status": "clarification", "result": arguments["question"]}
+        return {"tool": "end_tool", "status": "completed", "result": arguments["final_answer"], "citations": []}
+
+
+def _chatbot(tmp):
+    from chotbot.core.chatbot import Chatbot
+
+    cache, _ = _make_cache()
+    llm = _ToolLLM()
+    chatbot = Chatbot.__new__(Chatbot)
+    chatbot.response_cache = cache
+    chatbot.mcp_processor = MCPProcessor(llm)
+    chatbot.react_agent = ReActAgent(llm, _Tools(), response_cache=cache, conversation_log=ConversationLog(tmp))
+    return chatbot, cache, llm
+
+
+def test_only_clean_final_answers_are_cached():
+    """The thinking trace and clarifications never enter the cache."""
+    with tempfile.TemporaryDirectory() as tmp:
+        chatbot, cache, llm = _chatbot(tmp)
+        assert chatbot.chat("天气怎么样").startswith("哪个城市?")
+        assert cache.get("天气怎么样") is None
+
+        chatbot.mcp_processor.context_manager.clear()
+        assert "思考过程" in chatbot.chat("北京天气怎么样")
+        assert cache.get("北京天气怎么样")["answer"] == "答：北京天气怎么样"
+
+
+def test_follow_ups_and_profiles_bypass_the_cache():
+    """Questions asked with earlier turns, or with user profiles, neither hit nor fill the cache."""
+    with tempfile.TemporaryDirectory() as tmp:
+        chatbot, cache, llm = _chatbot(tmp)
+        cache.put("为什么", "另一个对话的答案")
+        # 共享上下文中已有对话，“为什么”依赖上文
+        chatbot.mcp_processor.record_turn("介绍一下向量数据库", "向量数据库是……")
+        assert chatbot.chat("为什么").startswith("答：为什么")
+        assert llm.turns == 1
+
+        agent = chatbot.react_agent
+        events = list(agent.run_stream("那上海呢", history=[{"role": "user", "content": "北京天气"}], stream=False,
+                                       plan_mode="off"))
+        assert events[-1]["content"] == "答：那上海呢"
+        assert cache.get("那上海呢") is None
+
+        agent.rag_manager = type("_Profiles", (), {"query": lambda self, query: "喜欢简洁的回答"})()
+        assert not agent.cache_usable()
+        list(agent.run_stream("什么是向量数据库", stream=False, plan_mode="off"))
+        assert cache.get("什么是向量数据库") is None
+
+
+def test_chat_looks_up_the_cache_once():
+    """An uncached chat records one miss; asking again is one hit and skips the ReAct loop."""
+    with tempfile.TemporaryDirectory() as tmp:
+        chatbot, cache, llm = _chatbot(tmp)
+        chatbot.chat("北京天气")
+        stats = cache.stats()
+        assert stats["hits"] == 0 and stats["misses"] == 1
+
+        chatbot.mcp_processor.context_manager.clear()
+        assert chatbot.chat("北京天气") == "答：北京天气"
+        stats = cache.stats()
+        assert stats["hits"] == 1 and stats["misses"] == 1
+        assert llm.turns == 1
+
+
+def test_stream_replays_cached_answer_in_pieces():
+    """The chat stream replays a cached answer in pieces without running the agent."""
+    with tempfile.TemporaryDirectory() as tmp:
+        chatbot, cache, llm = _chatbot(tmp)
+        cache.put("北京天气", "北京今天晴，气温 20 度")
+
+        async def collect():
+            return [chunk async for chunk in chatbot.achat_stream("北京天气", use_rag=False)]
+
+        with mock.patch.object(Config, "RESPONSE_CACHE_STREAM_CHUNK", 4):
+            chunks = asyncio.run(collect())
+        assert len(chunks) > 1 and "".join(chunks) == "北京今天晴，气温 20 度"
+        assert llm.turns == 0
+
+
+if __name__ == "__main__":
+    test_quick_intent()
+    test_paraphrase_hits_and_other_city_misses()
+    test_per_intent_ttl()
+    test_size_bounded_eviction_and_stats()
+    test_zero_ttl_disables_intent()
+    test_only_clean_final_answers_are_cached()
+    test_follow_ups_and_profiles_bypass_the_cache()
+    test_chat_looks_up_the_cache_once()
+    test_stream_replays_cached_answer_in_pieces()
+    print("All response cache tests passed!")
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for rolling incremental summarization and chunk memoization.
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from chotbot.core.history_compressor import HistoryCompressor
+
+
+class _LLM:
+    """Records prompts and answers with a numbered summary."""
+
+    def __init__(self):
+        self.prompts = []
+
+    def generate(self, messages, **kwargs):
+        self.prompts.append(messages[-1]["content"])
+        return f"summary-{len(self.prompts)}"
+
+
+def _turns(start, count):
+    history = []
+    for i in range(start, start + count):
+        history.append({"role": "user", "content": f"question {i}"})
+        history.append({"role": "assistant", "content": f"answer {i}"})
+    return history
+
+
+def test_rolling_summary_only_sends_new_messages():
+    """Each compression sends the previous summary and the messages added since."""
+    llm = _LLM()
+    compressor = HistoryCompressor(llm)
+    history = compressor.compress(_turns(0, 5), strategy="rolling", keep_last_n=3)
+    assert history[0]["content"] == "[History Summary] summary-1"
+    assert history[0]["original_count"] == 7
+    assert len(history) == 4
+
+    history = compressor.compress(history + _turns(5, 3), strategy="rolling", keep_last_n=3)
+    prompt = llm.prompts[-1]
+    assert "summary-1" in prompt
+    assert "question 0" not in prompt and "answer 4" in prompt and "question 6" in prompt
+    assert "question 7" not in prompt
+    assert history[0]["content"] == "[History Summary] summary-2"
+    assert history[0]["original_count"] == 7 + 6
+    assert [m["content"] for m in history[1:]] == ["answer 6", "question 7", "answer 7"]
+
+    # 相同的摘要和新增消息不再调用 LLM
+    again = compressor.compress(history[:1] + _turns(8, 3), strategy="rolling", keep_last_n=3)
+    same = compressor.compress(history[:1] + _turns(8, 3), strategy="rolling", keep_last_n=3)
+    assert again == same
+    stats = compressor.get_compression_stats()
+    assert stats["llm_calls"] == 3 and stats["memo_hits"] == 1 and stats["compressions"] == 4
+
+
+def test_failed_update_keeps_previous_summary():
+    """A failed LLM call keeps the summary and new messages for the next attempt."""
+    class _Failing:
+        def generate(self, messages, **kwargs):
+            raise RuntimeError("boom")
+
+    compressor = HistoryCompressor(_Failing())
+    summary = {"role": "system", "content": "[History Summary] old", "compressed": True,
+               "original_count": 4, "strategy": "rolling"}
+    history = [summary] + _turns(0, 3)
+    assert compressor.compress(history, strategy="rolling", keep_last_n=3) == history
+
+
+def test_incremental_compress_reuses_summarized_chunks():
+    """Earlier summaries pass through and repeated chunks hit the memo."""
+    llm = _LLM()
+    compressor = HistoryCompressor(llm)
+    history = compressor.incremental_compress(_turns(0, 9), chunk_size=4)
+    calls = len(llm.prompts)
+    assert all(m.get("compressed") for m in history[:-3])
+
+    history = compressor.incremental_compress(history + _turns(10, 4), chunk_size=4)
+    # 只有新增的消息被分块摘要
+    assert len(llm.prompts) - calls == 2
+    assert all("question 0" not in prompt for prompt in llm.prompts[calls:])
+
+    compressor.incremental_compress(_turns(0, 9), chunk_size=4)
+    assert len(llm.prompts) - calls == 2
+
+
+if __name__ == "__main__":
+    test_rolling_summary_only_sends_new_messages()
+    test_failed_update_keeps_previous_summary()
+    test_incremental_compress_reuses_summarized_chunks()
+    print("All tests passed!")
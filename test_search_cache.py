@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for the TTL cache and the cached, coalesced search tool.
+"""
+
+import sys
+import os
+import time
+import threading
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from chotbot.utils.cache import TTLCache
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_ttl_cache_expiry_eviction_and_errors():
+    """Entries expire, the LRU entry is evicted and loader errors are not cached."""
+    clock = _Clock()
+    cache = TTLCache(ttl=10, max_entries=2, clock=clock)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    clock.now = 11
+    assert cache.get("a") is None
+
+    calls = []
+
+    def failing():
+        calls.append(1)
+        raise RuntimeError("down")
+
+    for _ in range(2):
+        try:
+            cache.get_or_load("x", failing)
+        except RuntimeError:
+            pass
+    assert len(calls) == 2
+    assert cache.get_or_load("x", lambda: "ok") == "ok"
+    assert cache.get_or_load("x", failing) == "ok"
+
+    stats = cache.stats()
+    assert stats["evictions"] == 1 and stats["expirations"] == 1
+
+
+def test_concurrent_identical_loads_are_coalesced():
+    """Concurrent misses for one key share a single loader call."""
+    cache = TTLCache(ttl=60)
+    calls = []
+
+    def slow_loader():
+        calls.append(1)
+        time.sleep(0.2)
+        return "value"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_load("k", slow_loader)))
+               for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["value"] * 5
+    assert len(calls) == 1
+    stats = cache.stats()
+    assert stats["misses"] == 1 and stats["coalesced"] == 4
+    assert stats["hit_rate"] == 0.8
+
+
+class _FakeSession:
+    def __init__(self):
+        self.queries = []
+
+    def text(self, query, max_results=3):
+        self.queries.append((query, max_results))
+        return [{"title": query, "body": "b", "href": "https://example.com"}][:max_results]
+
+
+def test_search_tool_caches_normalized_queries():
+    """Near-identical queries hit the cache; max_results is part of the key."""
+    from chotbot.mcp.tools.search import SearchTool
+
+    tool = SearchTool(cache_ttl=60)
+    session = _FakeSession()
+    tool._session = lambda: session
+
+    first = tool.run("Python  GIL?")
+    assert first["result"][0]["title"] == "Python  GIL?"
+    assert tool.run("python gil") == first
+    tool.run("python gil", max_results=5)
+    assert len(session.queries) == 2
+
+    stats = tool.stats()
+    assert stats["cache"]["hits"] == 1
+    assert stats["upstream"]["requests"] == 2
+    assert stats["upstream"]["errors"] == 0
+
+
+if __name__ == "__main__":
+    test_ttl_cache_expiry_eviction_and_errors()
+    test_concurrent_identical_loads_are_coalesced()
+    test_search_tool_caches_normalized_queries()
+    print("All tests passed!")
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for per-session conversation state: isolation, LRU and idle
+eviction, spill to disk and the per-session message cap.
+"""
+
+import sys
+import os
+import time
+import tempfile
+import threading
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from chotbot.mcp.processor import MCPProcessor
+from chotbot.mcp.session_store import SessionStore
+
+
+class _LLM:
+    """Duck-typed LLM client that echoes the last message."""
+
+    def generate(self, messages, **kwargs):
+        return f"echo: {messages[-1]['content']}"
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _store(**kwargs):
+    llm = _LLM()
+    return SessionStore(lambda: MCPProcessor(llm), **kwargs)
+
+
+def test_sessions_are_isolated():
+    """Each session sees only its own turns."""
+    store = _store(max_sessions=10, idle_ttl=0, spill_dir="")
+    store.get("alice").interact("我叫 Alice")
+    store.get("bob").interact("我叫 Bob")
+    assert store.get("alice") is store.get("alice")
+    alice = [m["content"] for m in store.get("alice").context_manager.get_history()]
+    assert alice == ["我叫 Alice", "echo: 我叫 Alice"]
+    assert len(store.get("bob").context_manager.get_history()) == 2
+    assert store.stats()["created"] == 2
+
+
+def test_lru_and_idle_eviction_with_spill():
+    """Evicted sessions are written to disk and restored on their next access."""
+    clock = _Clock()
+    with tempfile.TemporaryDirectory() as tmp:
+        store = _store(max_sessions=2, idle_ttl=100, spill_dir=tmp, clock=clock)
+        store.get("a").record_turn("a1", "r1")
+        store.get("b").record_turn("b1", "r1")
+        store.get("a")
+        store.get("c")
+        # b 最久未使用，被淘汰并写入磁盘
+        assert len(store) == 2
+        assert len(os.listdir(tmp)) == 1
+
+        restored = store.get("b")
+        assert [m["content"] for m in restored.context_manager.get_history()] == ["b1", "r1"]
+        stats = store.stats()
+        assert stats["evicted"] == 2 and stats["spilled"] == 2 and stats["restored"] == 1
+
+        # 空闲超时：除当前会话外全部淘汰
+        clock.now = 500
+        store.get("d")
+        assert len(store) == 1
+
+        store.drop("b")
+        assert store.get("b").context_manager.get_history() == []
+
+
+class _SlowSpillStore(SessionStore):
+    """Signals when a spill starts and holds it until released."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.spill_started = threading.Event()
+        self.release = threading.Event()
+
+    def _spill(self, session_id, processor):
+        self.spill_started.set()
+        self.release.wait(5)
+        super()._spill(session_id, processor)
+
+
+def test_access_during_spill_waits_for_the_file():
+    """Getting a session while it is being spilled restores its history instead of starting empty."""
+    with tempfile.TemporaryDirectory() as tmp:
+        llm = _LLM()
+        store = _SlowSpillStore(lambda: MCPProcessor(llm), max_sessions=1, idle_ttl=0, spill_dir=tmp)
+        store.get("a").record_turn("a1", "r1")
+
+        evicting = threading.Thread(target=store.get, args=("b",))
+        evicting.start()
+        assert store.spill_started.wait(5)
+
+        result = {}
+        reader = threading.Thread(target=lambda: result.update(a=store.get("a")))
+        reader.start()
+        time.sleep(0.1)
+        # a 仍在写入磁盘，读取方等待而不是新建空会话
+        assert "a" not in result
+        store.release.set()
+        evicting.join(5)
+        reader.join(5)
+
+        history = result["a"].context_manager.get_history()
+        assert [m["content"] for m in history] == ["a1", "r1"]
+        assert store.stats()["restored"] == 1
+
+
+class _SlowRestoreStore(SessionStore):
+    """Holds the first restore until released."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.restore_started = threading.Event()
+        self.release = threading.Event()
+        self.restores = 0
+
+    def _restore(self, session_id):
+        self.restores += 1
+        self.restore_started.set()
+        self.release.wait(5)
+        return super()._restore(session_id)
+
+
+def test_concurrent_first_access_restores_once():
+    """Two requests for a spilled session share one restore instead of one starting empty."""
+    with tempfile.TemporaryDirectory() as tmp:
+        llm = _LLM()
+        store = _SlowRestoreStore(lambda: MCPProcessor(llm), max_sessions=1, idle_ttl=0, spill_dir=tmp)
+        store.release.set()
+        store.get("a").record_turn("a1", "r1")
+        store.get("b")
+        store.release.clear()
+        store.restore_started.clear()
+
+        results = []
+        first = threading.Thread(target=lambda: results.append(store.get("a")))
+        first.start()
+        assert store.restore_started.wait(5)
+        second = threading.Thread(target=lambda: results.append(store.get("a")))
+        second.start()
+        time.sleep(0.1)
+        store.release.set()
+        first.join(5)
+        second.join(5)
+
+        assert len(results) == 2 and results[0] is results[1]
+        assert [m["content"] for m in results[0].context_manager.get_history()] == ["a1", "r1"]
+        # 首次访问 b 时恢复过一次
+        assert store.restores == 3 and store.stats()["restored"] == 1
+
+
+def test_message_cap():
+    """A session keeps at most ``max_messages`` messages."""
+    store = _store(max_messages=4, idle_ttl=0, spill_dir="")
+    processor = store.get("s")
+    for i in range(5):
+        processor.record_turn(f"q{i}", f"a{i}")
+    history = store.get("s").context_manager.get_history()
+    assert [m["content"] for m in history] == ["q3", "a3", "q4", "a4"]
+
+
+if __name__ == "__main__":
+    test_sessions_are_isolated()
+    test_lru_and_idle_eviction_with_spill()
+    test_access_during_spill_waits_for_the_file()
+    test_concurrent_first_access_restores_once()
+    test_message_cap()
+    print("All tests passed!")
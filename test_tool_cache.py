@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for the weather/fund result cache: per-endpoint TTLs,
+stale-while-revalidate and persistence.
+"""
+
+import sys
+import os
+import time
+import tempfile
+import threading
+from datetime import datetime, timedelta, timezone
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from chotbot.utils.cache import TTLCache
+from chotbot.mcp.tools.fund import FundTool
+from chotbot.mcp.tools.result_cache import seconds_until_nav_update
+
+CST = timezone(timedelta(hours=8))
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_nav_ttl_lasts_until_next_trading_day_cutoff():
+    """NAV results expire at the next 21:00 Beijing time, skipping weekends."""
+    tuesday_morning = datetime(2024, 6, 4, 10, 0, tzinfo=CST)
+    assert seconds_until_nav_update(tuesday_morning) == 11 * 3600
+    friday_night = datetime(2024, 6, 7, 22, 0, tzinfo=CST)
+    assert seconds_until_nav_update(friday_night) == 71 * 3600
+    # 与时区无关：UTC 周六 02:00 即北京时间周六 10:00
+    saturday_utc = datetime(2024, 6, 8, 2, 0, tzinfo=timezone.utc)
+    assert seconds_until_nav_update(saturday_utc) == 59 * 3600
+
+
+def test_stale_while_revalidate():
+    """An expired entry is served at once while one background refresh replaces it."""
+    clock = _Clock()
+    cache = TTLCache(ttl=10, clock=clock, stale_ttl=100)
+    refreshed = threading.Event()
+    values = iter(["v1", "v2"])
+
+    def loader():
+        value = next(values)
+        if value == "v2":
+            time.sleep(0.1)
+            refreshed.set()
+        return value
+
+    assert cache.get_or_load("k", loader) == "v1"
+    clock.now = 15
+    started = time.perf_counter()
+    assert cache.get_or_load("k", loader) == "v1"
+    assert cache.get_or_load("k", loader) == "v1"
+    assert time.perf_counter() - started < 0.05
+    assert refreshed.wait(1)
+    time.sleep(0.05)
+    assert cache.get_or_load("k", loader) == "v2"
+
+    stats = cache.stats()
+    assert stats["stale_hits"] == 2 and stats["refreshes"] == 1 and stats["misses"] == 1
+
+    # 超出宽限期后不再返回旧值
+    clock.now = 200
+    assert cache.get("k") is None
+
+
+def test_persistence_and_fund_tool_caching():
+    """Entries survive a reload with their remaining lifetime; errors are not cached."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "fund.json")
+        cache = TTLCache(ttl=60, persist_path=path)
+        cache.put(("detail", "000001"), {"基金名称": "华夏成长"})
+        cache.put(("detail", "old"), {"基金名称": "x"}, ttl=0.01)
+        time.sleep(0.02)
+        cache.save()
+
+        reloaded = TTLCache(ttl=60, persist_path=path)
+        assert len(reloaded) == 1
+        assert reloaded.get(("detail", "000001")) == {"基金名称": "华夏成长"}
+
+    class _Response:
+        def __init__(self, body):
+            self.body = body
+
+        def json(self):
+            return self.body
+
+    class _HTTP:
+        def __init__(self):
+            self.urls = []
+
+        def get(self, url):
+            self.urls.append(url)
+            if "bad" in url:
+                return _Response({"code": 1, "message": "not found"})
+            return _Response({"code": 0, "data": {"fundCode": "000001", "name": "华夏成长"}})
+
+    tool = FundTool()
+    tool.http = _HTTP()
+    assert tool.get_fund_basic_info("000001")["基金名称"] == "华夏成长"
+    assert tool.get_fund_basic_info("000001")["基金名称"] == "华夏成长"
+    assert "error" in tool.get_fund_basic_info("bad")
+    assert "error" in tool.get_fund_basic_info("bad")
+    assert len(tool.http.urls) == 3
+
+
+if __name__ == "__main__":
+    test_nav_ttl_lasts_until_next_trading_day_cutoff()
+    test_stale_while_revalidate()
+    test_persistence_and_fund_tool_caching()
+    print("All tests passed!")
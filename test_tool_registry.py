@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for the declarative tool registry and ToolManager dispatch.
+"""
+
+import sys
+import os
+import json
+from typing import List, Optional
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from openai.types.chat import ChatCompletionMessageFunctionToolCall
+from openai.types.chat.chat_completion_message_function_tool_call import Function
+from chotbot.mcp.tools.registry import ToolRegistry, function_definition
+
+
+def lookup(codes: List[str], limit: int = 5, region: Optional[str] = None, verbose: bool = False) -> dict:
+    """
+    Look up several codes.
+
+    Args:
+        codes (List[str]): Codes to look up
+        limit (int): Maximum rows
+            per code
+        region (str): Optional region
+
+    Returns:
+        dict: Rows per code
+    """
+    return {"codes": codes, "limit": limit}
+
+
+def _call(name, arguments):
+    return ChatCompletionMessageFunctionToolCall(
+        id="call", type="function",
+        function=Function(name=name, arguments=json.dumps(arguments, ensure_ascii=False))
+    )
+
+
+def test_schema_is_derived_from_signature_and_docstring():
+    """Types, defaults, required parameters and descriptions come from the function."""
+    function = function_definition("lookup", lookup)["function"]
+    assert function["description"] == "Look up several codes."
+    parameters = function["parameters"]
+    assert parameters["required"] == ["codes"]
+    assert parameters["properties"]["codes"] == {"type": "array", "items": {"type": "string"},
+                                                 "description": "Codes to look up"}
+    assert parameters["properties"]["limit"] == {"type": "integer", "description": "Maximum rows", "default": 5}
+    assert parameters["properties"]["region"] == {"type": "string", "description": "Optional region"}
+    assert parameters["properties"]["verbose"] == {"type": "boolean", "default": False}
+
+
+def test_registry_caches_definitions_and_drops_unknown_arguments():
+    """The definitions list is built once per change; calls ignore unexpected arguments."""
+    registry = ToolRegistry()
+    registry.register("lookup", lookup)
+    definitions = registry.definitions()
+    assert registry.definitions() is definitions
+    assert registry.call("lookup", {"codes": ["a"], "bogus": 1}) == {"codes": ["a"], "limit": 5}
+
+    registry.register("other", lookup, description="Other")
+    assert registry.definitions() is not definitions
+    assert [d["function"]["name"] for d in registry.definitions()] == ["lookup", "other"]
+
+
+def test_tool_manager_dispatches_registered_tools():
+    """Weather and fund tools are callable by name; replaced instances are picked up."""
+    from chotbot.mcp.tools.tool_manager import ToolManager
+
+    class _Weather:
+        def get_weather_by_city(self, city):
+            return {"城市": city}
+
+    manager = ToolManager()
+    names = [d["function"]["name"] for d in manager.get_tool_definitions()]
+    assert {"search", "get_weather", "get_fund_info", "compare_funds", "end_tool", "ask_clarification"} <= set(names)
+    assert manager.get_tool_definitions() is manager.get_tool_definitions()
+
+    manager.tools["查询天气"] = _Weather()
+    result = manager.execute_tool_call(_call("get_weather", {"city": "北京"}))
+    assert result == {"tool": "get_weather", "result": {"城市": "北京"}, "status": "success", "tool_call_id": "call"}
+
+    result = manager.execute_tool_call(_call("end_tool", {"final_answer": "done"}))
+    assert result["status"] == "completed" and result["result"] == "done" and result["citations"] == []
+    assert manager.execute_tool_call(_call("ask_clarification", {"question": "哪只基金？"}))["result"] == "哪只基金？"
+    assert manager.execute_tool_call(_call("nope", {}))["status"] == "error"
+
+
+if __name__ == "__main__":
+    test_schema_is_derived_from_signature_and_docstring()
+    test_registry_caches_definitions_and_drops_unknown_arguments()
+    test_tool_manager_dispatches_registered_tools()
+    print("All tests passed!")
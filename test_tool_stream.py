@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for streamed tool call parsing.
+"""
+
+import sys
+import os
+import json
+import random
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from openai.types.chat.chat_completion_chunk import ChoiceDeltaToolCall, ChoiceDeltaToolCallFunction
+from chotbot.core.tool_stream import ToolCallAccumulator, PartialJSONStringReader
+
+
+def _fragments(text, seed):
+    rng = random.Random(seed)
+    position = 0
+    while position < len(text):
+        size = rng.randint(1, 5)
+        yield text[position:position + size]
+        position += size
+
+
+def test_partial_reader_streams_final_answer():
+    """The decoded value is identical however the JSON is fragmented."""
+    answer = '北京今天晴，"最高" 25°C\n\\ 详情见 https://example.com 😀'
+    arguments = json.dumps({"final_answer": answer, "citations": [{"title": "t", "url": "u"}]})
+    for encoded in (arguments, json.dumps(json.loads(arguments), ensure_ascii=False)):
+        for seed in range(20):
+            reader = PartialJSONStringReader("final_answer")
+            pieces = [reader.feed(fragment) for fragment in _fragments(encoded, seed)]
+            assert "".join(pieces) == answer
+            assert reader.done
+            # 值是逐步输出的，而不是最后一次性返回
+            assert len([piece for piece in pieces if piece]) > 1
+
+
+def test_partial_reader_ignores_other_fields():
+    """Nothing is emitted until the requested key appears."""
+    reader = PartialJSONStringReader("final_answer")
+    assert reader.feed('{"citations": [], ') == ""
+    assert reader.feed('"final_answer": "ok') == "ok"
+    assert reader.feed('"}') == ""
+    assert reader.done
+
+
+def test_accumulator_rebuilds_parallel_calls():
+    """Fragments are merged per index into complete tool calls."""
+    accumulator = ToolCallAccumulator()
+    deltas = [
+        ChoiceDeltaToolCall(index=0, id="call_a", type="function",
+                            function=ChoiceDeltaToolCallFunction(name="search", arguments="")),
+        ChoiceDeltaToolCall(index=1, id="call_b", type="function",
+                            function=ChoiceDeltaToolCallFunction(name="search", arguments='{"query"')),
+        ChoiceDeltaToolCall(index=0, function=ChoiceDeltaToolCallFunction(arguments='{"query": "北京"}')),
+        ChoiceDeltaToolCall(index=1, function=ChoiceDeltaToolCallFunction(arguments=': "上海"}')),
+    ]
+    events = [accumulator.add(delta) for delta in deltas]
+    assert events[3]["arguments_delta"] == ': "上海"}' and events[3]["name"] == "search"
+
+    calls = accumulator.tool_calls()
+    assert [call.id for call in calls] == ["call_a", "call_b"]
+    assert [json.loads(call.function.arguments)["query"] for call in calls] == ["北京", "上海"]
+    assert ToolCallAccumulator().tool_calls() is None
+
+
+if __name__ == "__main__":
+    test_partial_reader_streams_final_answer()
+    test_partial_reader_ignores_other_fields()
+    test_accumulator_rebuilds_parallel_calls()
+    print("All tool stream tests passed!")
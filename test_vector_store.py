@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for SimpleVectorStore.
+"""
+
+import sys
+import os
+import tempfile
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+import numpy as np
+from chotbot.rag.vector_store import SimpleVectorStore
+from chotbot.rag.ann_index import IVFFlatVectorStore, HNSWVectorStore
+
+
+def _brute_force(embeddings, query, k):
+    embeddings = np.asarray(embeddings, dtype=np.float64)
+    scores = embeddings @ query / (np.linalg.norm(embeddings, axis=1) * np.linalg.norm(query))
+    return list(np.argsort(-scores)[:k])
+
+
+def test_similarity_search_matches_brute_force():
+    """Top-k results should match a naive cosine ranking."""
+    rng = np.random.default_rng(0)
+    embeddings = rng.normal(size=(500, 32))
+    documents = ["doc {}".format(i) for i in range(500)]
+
+    store = SimpleVectorStore()
+    store.add_documents(documents, embeddings)
+
+    query = rng.normal(size=32)
+    results = store.similarity_search(query, k=5)
+    expected = _brute_force(embeddings, query, 5)
+
+    assert [r["document"] for r in results] == [documents[i] for i in expected]
+    scores = [r["score"] for r in results]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_incremental_add_grows_capacity():
+    """Appending past the initial capacity keeps every vector."""
+    store = SimpleVectorStore(initial_capacity=4)
+    for i in range(10):
+        vector = np.zeros(8)
+        vector[i % 8] = 1.0
+        store.add_documents(["doc {}".format(i)], [vector])
+
+    assert len(store) == 10
+    assert store.embeddings.shape == (10, 8)
+    assert store.embeddings.dtype == np.float32
+    assert store.similarity_search(np.eye(8)[3], k=1)[0]["document"] == "doc 3"
+
+
+def test_empty_store_and_zero_vectors():
+    """Empty stores return nothing and zero vectors don't produce NaNs."""
+    store = SimpleVectorStore()
+    assert store.similarity_search(np.ones(4), k=3) == []
+
+    store.add_documents(["zero", "one"], [np.zeros(4), np.ones(4)])
+    results = store.similarity_search(np.ones(4), k=5)
+    assert [r["document"] for r in results] == ["one", "zero"]
+    assert all(np.isfinite(r["score"]) for r in results)
+
+
+def test_dimension_mismatch_rejected():
+    """Mixing embedding sizes is an error."""
+    store = SimpleVectorStore()
+    store.add_documents(["a"], [np.ones(4)])
+    try:
+        store.add_documents(["b"], [np.ones(5)])
+    except ValueError:
+        return
+    raise AssertionError("Expected ValueError for mismatched dimensions")
+
+
+def test_save_and_load_roundtrip():
+    """A saved store reopens memory-mapped with identical results."""
+    rng = np.random.default_rng(1)
+    embeddings = rng.normal(size=(50, 16))
+    documents = ["文档 {}\n第二行".format(i) for i in range(50)]
+    metadatas = [{"source": "doc/{}.md".format(i), "offset": i} for i in range(50)]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = SimpleVectorStore()
+        store.add_documents(documents, embeddings, metadatas)
+        store.save(tmp_dir)
+
+        reopened = SimpleVectorStore()
+        assert reopened.load(tmp_dir)
+        assert isinstance(reopened.embeddings, np.memmap)
+        assert reopened.documents == documents
+        assert reopened.metadatas == metadatas
+
+        query = rng.normal(size=16)
+        assert reopened.similarity_search(query, k=5) == store.similarity_search(query, k=5)
+
+
+def test_incremental_save_appends():
+    """Appending after a load only writes the new rows."""
+    rng = np.random.default_rng(2)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = SimpleVectorStore()
+        store.add_documents(["a", "b"], rng.normal(size=(2, 8)))
+        store.save(tmp_dir)
+
+        reopened = SimpleVectorStore()
+        reopened.load(tmp_dir)
+        extra = rng.normal(size=(1, 8))
+        reopened.add_documents(["c"], extra)
+        reopened.save(tmp_dir)
+
+        matrix_size = os.path.getsize(os.path.join(tmp_dir, SimpleVectorStore.MATRIX_FILE))
+        assert matrix_size == 3 * 8 * 4
+
+        final = SimpleVectorStore()
+        final.load(tmp_dir)
+        assert final.documents == ["a", "b", "c"]
+        assert final.similarity_search(extra[0], k=1)[0]["document"] == "c"
+
+
+def test_load_missing_directory():
+    """Loading from an empty directory reports that nothing was loaded."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        assert not SimpleVectorStore().load(tmp_dir)
+
+
+def _chunk_metadatas(source, count):
+    return [{"source": source, "chunk_index": i} for i in range(count)]
+
+
+def test_upsert_replaces_by_id():
+    """Re-adding an ID tombstones the old row and only the new one is found."""
+    store = SimpleVectorStore()
+    store.add_documents(["old"], [np.eye(4)[0]], ids=["profile"])
+    store.upsert(["profile"], ["new"], [np.eye(4)[1]])
+
+    assert len(store) == 1
+    results = store.similarity_search(np.eye(4)[0], k=5)
+    assert [r["document"] for r in results] == ["new"]
+    assert results[0]["id"] == "profile"
+
+
+def test_delete_by_id_and_source():
+    """Deleted documents are excluded from search."""
+    rng = np.random.default_rng(3)
+    store = SimpleVectorStore()
+    store.add_documents(["a0", "a1"], rng.normal(size=(2, 8)), _chunk_metadatas("a.md", 2))
+    store.add_documents(["b0", "b1"], rng.normal(size=(2, 8)), _chunk_metadatas("b.md", 2))
+    assert store.ids[:2] == ["a.md#0", "a.md#1"]
+
+    assert store.delete(source="a.md") == 2
+    assert store.delete(ids=["b.md#1", "missing"]) == 1
+    assert len(store) == 1
+    results = store.similarity_search(rng.normal(size=8), k=10)
+    assert [r["document"] for r in results] == ["b0"]
+
+
+def test_background_compaction():
+    """Crossing the dead-fraction threshold compacts the matrix in the background."""
+    rng = np.random.default_rng(4)
+    store = SimpleVectorStore(compaction_threshold=0.3)
+    embeddings = rng.normal(size=(200, 8))
+    store.add_documents(["doc {}".format(i) for i in range(200)], embeddings,
+                        ids=["id{}".format(i) for i in range(200)])
+
+    store.delete(ids=["id{}".format(i) for i in range(0, 200, 2)])
+    store.wait_for_compaction(timeout=10)
+
+    assert store.embeddings.shape[0] == 100
+    assert store.dead_fraction == 0.0
+    assert store.ids == ["id{}".format(i) for i in range(1, 200, 2)]
+    top = store.similarity_search(embeddings[5], k=1)[0]
+    assert top["id"] == "id5" and top["document"] == "doc 5"
+
+    # 压缩后 ID 查找仍然有效
+    assert store.delete(ids=["id5"]) == 1
+    assert store.similarity_search(embeddings[5], k=1)[0]["id"] != "id5"
+
+
+def test_tombstones_persist():
+    """Deletes survive save/load, and compaction triggers a full rewrite."""
+    rng = np.random.default_rng(5)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = SimpleVectorStore()
+        store.add_documents(["a", "b", "c"], rng.normal(size=(3, 8)), ids=["a", "b", "c"])
+        store.save(tmp_dir)
+        store.delete(ids=["b"])
+        store.save(tmp_dir)
+
+        reopened = SimpleVectorStore()
+        reopened.load(tmp_dir)
+        assert len(reopened) == 2
+        assert sorted(r["id"] for r in reopened.similarity_search(rng.normal(size=8), k=5)) == ["a", "c"]
+
+        reopened.compact()
+        reopened.save(tmp_dir)
+        final = SimpleVectorStore()
+        final.load(tmp_dir)
+        assert final.ids == ["a", "c"] and final.dead_fraction == 0.0
+
+
+def test_ann_stores_skip_deleted_rows():
+    """IVF and HNSW exclude tombstones and survive compaction."""
+    rng = np.random.default_rng(6)
+    embeddings = rng.normal(size=(400, 16))
+    ids = ["id{}".format(i) for i in range(400)]
+    for store in (IVFFlatVectorStore(nlist=8, nprobe=8), HNSWVectorStore(m=8, ef_search=64)):
+        store.add_documents(ids, embeddings, ids=ids)
+        store.delete(ids=ids[:200])
+        store.compact()
+
+        assert store.similarity_search(embeddings[0], k=1)[0]["id"] not in ids[:200]
+        assert store.similarity_search(embeddings[300], k=1)[0]["id"] == "id300"
+
+
+if __name__ == "__main__":
+    test_similarity_search_matches_brute_force()
+    test_incremental_add_grows_capacity()
+    test_empty_store_and_zero_vectors()
+    test_dimension_mismatch_rejected()
+    test_save_and_load_roundtrip()
+    test_incremental_save_appends()
+    test_load_missing_directory()
+    test_upsert_replaces_by_id()
+    test_delete_by_id_and_source()
+    test_background_compaction()
+    test_tombstones_persist()
+    test_ann_stores_skip_deleted_rows()
+    print("All vector store tests passed!")